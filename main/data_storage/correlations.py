@@ -2,10 +2,12 @@
 
 import os
 import sys
+import csv
 import time
 import json
 import datetime as dt
 import MySQLdb as mysql
+import numpy as np
 from math import log
 from math import sqrt
 from itertools import combinations
@@ -553,6 +555,111 @@ def aggregate_group_values(group_ids, lookback, investment_universe_name):
     return values
 
 
+def correlation_cube_path(lookback, volatility_type, use_ew_correlation):
+    """
+    Return path of the correlation cube directory of the lookback and correlation variant passed in
+
+    :param lookback:            lookback window used for calculating the values
+    :param volatility_type:     type of the volatility and correlations (either 'movement' or 'dev'(deviation))
+    :param use_ew_correlation:  boolean value to indicate if EW correlations are in the cube
+    :return:                    string
+    """
+    return './db/market_correlation/%s/%s%s' % (lookback, volatility_type, '_ew' if use_ew_correlation else '')
+
+
+def write_correlation_cube(market_values, lookback, volatility_type, use_ew_correlation, dtype=np.float32):
+    """
+    Write market correlations of one variant (volatility type and EW flag) into dense binary cube
+    of shape date x market x market, which the simulation memory-maps instead of parsing correlation JSON strings
+
+    :param market_values:       list of tuples as returned from 'aggregate_market_values'
+    :param lookback:            lookback window used for calculating the values
+    :param volatility_type:     type of the volatility and correlations to write (either 'movement' or 'dev'(deviation))
+    :param use_ew_correlation:  boolean value to indicate if EW correlations should be written
+    :param dtype:               numpy type of the volatility and correlation values
+    """
+    MARKET_ID, DATE = (0, 3)
+    volatility_column = {'movement': 4, 'dev': 5}[volatility_type]
+    column = {
+        ('movement', False): 6,
+        ('movement', True): 7,
+        ('dev', False): 8,
+        ('dev', True): 9
+    }[(volatility_type, use_ew_correlation)]
+    __write_cube(
+        [(v[MARKET_ID], v[DATE], v[volatility_column], v[column]) for v in market_values],
+        correlation_cube_path(lookback, volatility_type, use_ew_correlation),
+        dtype
+    )
+
+
+def convert_correlation_files(market_ids, lookback, volatility_type, use_ew_correlation, dtype=np.float32):
+    """
+    Write correlation cube from market correlations previously dumped into CSV files
+    './db/market_correlation/<lookback>/<market code>.csv' (rows of date, volatility and correlations JSON).
+    The files don't say which variant they were dumped of, so it has to be passed in.
+
+    :param market_ids:          list of market IDs
+    :param lookback:            lookback window used for calculating the values
+    :param volatility_type:     type of the volatility and correlations in the files (either 'movement' or 'dev'(deviation))
+    :param use_ew_correlation:  boolean value to indicate if the files hold EW correlations
+    :param dtype:               numpy type of the volatility and correlation values
+    """
+    records = []
+    for market_id in market_ids:
+        path = './db/market_correlation/%s/%s.csv' % (lookback, __market_code(market_id))
+        reader = csv.reader(open(path), delimiter=',', quotechar="'")
+        records += [(int(market_id), dt.date(*map(int, r[0].split('-'))), float(r[1]), r[2]) for r in reader]
+
+    __write_cube(records, correlation_cube_path(lookback, volatility_type, use_ew_correlation), dtype)
+
+
+def __write_cube(records, path, dtype):
+    """
+    Write market records into cube files in the directory passed in.
+    Each cube date holds the latest volatility and correlations of every market effective on that date;
+    'row_dates' holds date of the market record each cube row was taken from (0 if there is none yet).
+
+    :param records: list of tuples(market ID, date, volatility, JSON(correlations by other market ID))
+    :param path:    path of the cube directory
+    :param dtype:   numpy type of the volatility and correlation values
+    """
+    MARKET_ID, DATE, VOLATILITY, CORRELATIONS = (0, 1, 2, 3)
+    workdays = range(1, 6)
+    values = [v for v in records if v[DATE].isoweekday() in workdays]
+    market_ids = sorted(set(v[MARKET_ID] for v in values))
+    dates = sorted(set(v[DATE] for v in values))
+    market_indexes = {market_id: i for i, market_id in enumerate(market_ids)}
+    date_indexes = {date: i for i, date in enumerate(dates)}
+
+    correlations = np.full((len(dates), len(market_ids), len(market_ids)), np.nan, dtype=dtype)
+    volatilities = np.full((len(dates), len(market_ids)), np.nan, dtype=dtype)
+    row_dates = np.zeros((len(dates), len(market_ids)), dtype=np.int32)
+    for v in values:
+        index = date_indexes[v[DATE]]
+        market_index = market_indexes[v[MARKET_ID]]
+        row_dates[index, market_index] = v[DATE].toordinal()
+        volatilities[index, market_index] = v[VOLATILITY]
+        for other_id, correlation in json.loads(v[CORRELATIONS]).items():
+            if int(other_id) in market_indexes:
+                correlations[index, market_index, market_indexes[int(other_id)]] = correlation
+
+    # Carry forward the latest record of markets without record on a date
+    for i in xrange(1, len(dates)):
+        missing = row_dates[i] == 0
+        row_dates[i, missing] = row_dates[i-1, missing]
+        volatilities[i, missing] = volatilities[i-1, missing]
+        correlations[i, missing] = correlations[i-1, missing]
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+    np.save('%s/market_ids.npy' % path, np.array(market_ids, dtype=np.int32))
+    np.save('%s/dates.npy' % path, np.array([d.toordinal() for d in dates], dtype=np.int32))
+    np.save('%s/row_dates.npy' % path, row_dates)
+    np.save('%s/volatilities.npy' % path, volatilities)
+    np.save('%s/correlations.npy' % path, correlations)
+
+
 def delete_values(table, lookback):
     connection.cursor().execute('DELETE FROM `%s` WHERE lookback = %s' % (table, lookback))
 
@@ -628,6 +735,11 @@ def calculate_markets(market_ids, start_date, end_date, lookback, persist=False)
             insert_market_values(market_values[i*block:(i+1)*block])
         __log(msg, index=10, length=10.0, complete=True)
 
+        for volatility_type in ['movement', 'dev']:
+            for use_ew_correlation in [False, True]:
+                print 'Writing correlation cube with lookback', lookback, volatility_type, 'EW' if use_ew_correlation else ''
+                write_correlation_cube(market_values, lookback, volatility_type, use_ew_correlation)
+
 
 def calculate_groups(market_ids, investment_universe_name, lookback, persist=False):
     groups = {market_id: str(__group_id(market_id)[0]) for market_id in market_ids}
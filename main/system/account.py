@@ -6,20 +6,35 @@ from enum import AccountAction
 from enum import AccountRecord
 from collections import defaultdict
 from decimal import Decimal
+from bisect import bisect_left, bisect_right
+from transaction_columns import TransactionColumns
 
 
 class Account(object):
+    """
+    Account balances kept on a ledger of transactions ordered by date.
 
-    def __init__(self, initial_balance, start_data_date, base_currency, currency_pairs):
+    Balances are recorded once per date, after all the date's transactions are added
+    (lazily, when first requested or when transaction of other date comes in),
+    and records effective on any date are found by bisection.
+    Amounts of transactions are also summed by type and currency into running totals by date,
+    so aggregate of any period is looked up rather than summed over the period's transactions.
+    """
+
+    def __init__(self, initial_balance, start_data_date, base_currency, currency_pairs, number_type=Decimal):
         self.__base_currency = base_currency
         self.__currency_pairs = currency_pairs
+        self.__number_type = number_type
 
         self.__initial_balance = initial_balance
-        self.__fx_balances = defaultdict(Decimal)
+        self.__fx_balances = defaultdict(number_type)
         self.__margin_loan_balances = defaultdict(float)
-        self.__transactions = []
-        self.__transaction_indexes = defaultdict(list)
-        self.__records = {}
+        self.__transactions = TransactionColumns(number_type)
+        self.__record_dates = []
+        self.__records = []
+        self.__unrecorded_date = None
+        self.__total_dates = []
+        self.__running_totals = []
         self.__rates = {}
 
         self.__fx_balances[base_currency] = initial_balance
@@ -29,10 +44,18 @@ class Account(object):
         """
         Find and return initial equity balance
         
-        :return:    Decimal
+        :return:    number of the account's number type
         """
         return self.__initial_balance
 
+    def number_type(self):
+        """
+        Return type of the account's amounts (Decimal, float or FixedPoint)
+
+        :return:    type, also used as conversion function of other numbers into the amounts
+        """
+        return self.__number_type
+
     def base_currency(self):
         """
         Returns account's base currency
@@ -65,7 +88,7 @@ class Account(object):
         :return:            Converted amount in the account-base-currency
         """
         rate = self.base_rate(currency, date)
-        return amount / (Decimal(rate) if isinstance(amount, Decimal) else rate)
+        return amount / (self.__number_type(rate) if isinstance(amount, self.__number_type) else rate)
 
     def equity(self, date):
         """
@@ -85,7 +108,7 @@ class Account(object):
         """
         record = self.__record(date)
         margins = record[AccountRecord.MARGIN_LOANS]
-        return record[AccountRecord.EQUITY] - Decimal(sum(self.base_value(margins[k], k, date) for k in margins.keys()))
+        return record[AccountRecord.EQUITY] - self.__number_type(sum(self.base_value(margins[k], k, date) for k in margins.keys()))
 
     def margin_loan_currencies(self):
         """
@@ -129,10 +152,10 @@ class Account(object):
 
         :param currency:    String - the currency symbol of requested Fx balance
         :param date:        Date of the final balance
-        :return:            Decimal number representing the Fx balance
+        :return:            number representing the Fx balance
         """
         balances = self.__record(date)[AccountRecord.FX_BALANCE]
-        return balances[currency] if currency in balances else Decimal(0)
+        return balances[currency] if currency in balances else self.__number_type(0)
 
     def fx_balances(self, date):
         """
@@ -150,42 +173,40 @@ class Account(object):
         :param transaction:     Transaction object to be added
         """
         transaction_date = transaction.date()
-        self.__transactions.append(transaction)
-        self.__transaction_indexes[transaction_date].append(len(self.__transactions) - 1)
+        if self.__unrecorded_date is not None and self.__unrecorded_date != transaction_date:
+            self.__record_balances(self.__unrecorded_date)
+        self.__unrecorded_date = transaction_date
+
+        self.__transactions.insert(transaction)
 
         {AccountAction.CREDIT: self.__credit, AccountAction.DEBIT: self.__debit}[transaction.account_action()](
             {TransactionType.MARGIN_LOAN: self.__margin_loan_balances}.get(transaction.type(), self.__fx_balances),
             transaction.currency(),
             transaction.amount()
         )
-
-        self.__record_balances(transaction_date)
-
-    def transactions(self, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31), strict=False):
-        """
-        Find and return transaction within the dates specified (included)
-
-        :param start_date:  Start date to search from
-        :param end_date:    End date to search until
-        :param strict:      Boolean flag indicating 'strict' mode -- if dates are not in dict, return empty list
-        :return:            list of Transaction objects
-        """
-        contains_start = start_date in self.__transaction_indexes
-        contains_end = end_date in self.__transaction_indexes
-        start_indexes = self.__transaction_indexes[start_date] if contains_start \
-            else self.__transaction_indexes[sorted(self.__transaction_indexes)[0]] if len(self.__transaction_indexes) \
-            else []
-
-        end_indexes = start_indexes if start_date == end_date \
-            else self.__transaction_indexes[end_date] if contains_end \
-            else self.__transaction_indexes[sorted(self.__transaction_indexes)[-1]] if len(self.__transaction_indexes) \
-            else []
-
-        start_index = sorted(start_indexes)[0] if len(start_indexes) else 0
-        end_index = sorted(end_indexes)[-1] if len(end_indexes) else len(self.__transactions) - 1
-
-        return self.__transactions[start_index:end_index+1] if not strict else \
-            self.__transactions[start_index:end_index+1] if contains_start and contains_end else []
+        self.__add_to_totals(transaction)
+
+    def transactions(self,
+                     start_date=dt.date(1900, 1, 1),
+                     end_date=dt.date(9999, 12, 31),
+                     strict=False,
+                     transaction_types=None,
+                     currencies=None,
+                     market_id=None):
+        """
+        Find and return transaction within the dates specified (included),
+        optionally only of the types, currencies and market passed in
+
+        :param start_date:          Start date to search from
+        :param end_date:            End date to search until
+        :param strict:              Boolean flag indicating 'strict' mode -- if there are no transactions
+                                    on the start and end dates, return empty list
+        :param transaction_types:   optional list of transaction types
+        :param currencies:          optional list of currency symbols
+        :param market_id:           optional ID of the market the transactions relate to
+        :return:                    list of Transaction objects
+        """
+        return self.__transactions.select(start_date, end_date, strict, transaction_types, currencies, market_id)
 
     def aggregate(self, transactions, transaction_types):
         """
@@ -196,11 +217,49 @@ class Account(object):
         :param transaction_types:   types of transactions to aggregate
         :return:                    dict(currency: amount)
         """
-        result = defaultdict(Decimal)
+        result = defaultdict(self.__number_type)
         for t in [tr for tr in transactions if tr.type() in transaction_types]:
             result[t.currency()] += t.amount() * (1 if t.account_action() == AccountAction.CREDIT else -1)
         return result
 
+    def aggregate_range(self, start_date, end_date, transaction_types):
+        """
+        Aggregate transactions of specified type within the dates passed in (included)
+        into currency: amount map; transactions of a single date are summed directly,
+        longer periods are looked up as difference of running totals at their ends
+
+        :param start_date:          Start date of the period
+        :param end_date:            End date of the period
+        :param transaction_types:   types of transactions to aggregate
+        :return:                    dict(currency: amount)
+        """
+        start_index = bisect_left(self.__total_dates, start_date)
+        end_index = bisect_right(self.__total_dates, end_date)
+        if end_index - start_index < 2:
+            return self.__transactions.aggregate(start_date, end_date, transaction_types)
+
+        result = defaultdict(self.__number_type)
+        totals = self.__running_totals[end_index - 1]
+        prior_totals = self.__running_totals[start_index - 1] if start_index else {}
+        for key, total in totals.items():
+            if key[0] in transaction_types:
+                prior_count, prior_amount = prior_totals.get(key, (0, 0))
+                if total[0] > prior_count:
+                    result[key[1]] += total[1] - prior_amount
+        return result
+
+    def market_aggregates(self, start_date, end_date, transaction_types):
+        """
+        Aggregate transactions of specified type within the dates passed in (included)
+        into market ID: (currency: amount) map, leaving out transactions not related to any market
+
+        :param start_date:          Start date of the period
+        :param end_date:            End date of the period
+        :param transaction_types:   types of transactions to aggregate
+        :return:                    dict(market ID: dict(currency: amount))
+        """
+        return self.__transactions.market_aggregates(start_date, end_date, transaction_types)
+
     def rates(self, date):
         """
         Return rates at a date passed in
@@ -241,7 +300,12 @@ class Account(object):
         fx_balances = {c: self.__fx_balances[c] for c in fx_currencies if self.__fx_balances[c]}
         margins = {c: self.__margin_loan_balances[c] for c in self.margin_loan_currencies() if self.__margin_loan_balances[c]}
 
-        self.__records[date] = equity, fx_balances, margins
+        index = bisect_left(self.__record_dates, date)
+        if index < len(self.__record_dates) and self.__record_dates[index] == date:
+            self.__records[index] = equity, fx_balances, margins
+        else:
+            self.__record_dates.insert(index, date)
+            self.__records.insert(index, (equity, fx_balances, margins))
 
     def __record(self, date):
         """
@@ -250,8 +314,33 @@ class Account(object):
         :param date:    the date of the record
         :return:        tuple (equity, fx balances, margin loans) representing the record on the requested date
         """
-        return self.__records[date] if date in self.__records \
-            else [r for r in sorted(self.__records.items()) if r[0] <= date][-1][1]
+        if self.__unrecorded_date is not None:
+            self.__record_balances(self.__unrecorded_date)
+            self.__unrecorded_date = None
+
+        index = bisect_right(self.__record_dates, date) - 1
+        if index < 0:
+            raise IndexError('No account record on or before %s' % date)
+        return self.__records[index]
+
+    def __add_to_totals(self, transaction):
+        """
+        Add amount of the transaction passed in to the running totals of its type and currency
+        on the transaction's date and all later dates
+
+        :param transaction: Transaction object
+        """
+        date = transaction.date()
+        key = transaction.type(), transaction.currency()
+        amount = transaction.amount() * (1 if transaction.account_action() == AccountAction.CREDIT else -1)
+        index = bisect_left(self.__total_dates, date)
+        if index == len(self.__total_dates) or self.__total_dates[index] != date:
+            self.__total_dates.insert(index, date)
+            self.__running_totals.insert(index, dict(self.__running_totals[index - 1]) if index else {})
+
+        for totals in self.__running_totals[index:]:
+            count, total = totals.get(key, (0, 0))
+            totals[key] = count + 1, total + amount
 
     def __record_rates(self, date):
         """
@@ -0,0 +1,25 @@
+#!/usr/bin/python
+
+from bisect import bisect_right
+
+
+class AsOfIndex(object):
+    """
+    Sorted dates of records, resolving any date into the latest record effective on it (dated on or before it)
+    """
+
+    def __init__(self, dates=()):
+        self.__dates = list(dates)
+
+    def __len__(self):
+        return len(self.__dates)
+
+    def index(self, date):
+        """
+        Return index of the latest record dated on or before the date passed in
+
+        :param date:    date to resolve
+        :return:        int index of the record, or None if there is no record on or before the date
+        """
+        index = bisect_right(self.__dates, date) - 1
+        return index if index > -1 else None
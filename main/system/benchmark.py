@@ -0,0 +1,22 @@
+#!/usr/bin/python
+
+import sys
+from operations.benchmark import Benchmark
+from options import option
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--help' in args:
+        print 'Options: --markets=N, --years=N, --roll=norgate|standard_roll_1|optimal_roll_1, ' \
+              '--models=name,name, --sizings=name,name, --profile, --equivalence'
+    else:
+        Benchmark(
+            int(option('markets', args, 10)),
+            int(option('years', args, 5)),
+            option('roll', args, 'standard_roll_1'),
+            option('models', args, '').split(',') if option('models', args) else None,
+            option('sizings', args, '').split(',') if option('sizings', args) else None,
+            '--profile' in args,
+            equivalence='--equivalence' in args
+        )
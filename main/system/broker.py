@@ -1,6 +1,5 @@
 #!/usr/bin/python
 
-from enum import OrderType
 from enum import OrderResultType
 from enum import TransactionType
 from enum import Table
@@ -9,25 +8,27 @@ from enum import SweepFxRule
 from trade import Trade
 from order_result import OrderResult
 from transaction import Transaction
+from position_book import PositionBook
 from collections import defaultdict
-from decimal import Decimal
 import operator as op
 import datetime as dt
 
 
 class Broker(object):
 
-    def __init__(self, account, commission, interest_rates, minimums, sweep_fx_rule, markets):
+    def __init__(self, account, commission, interest_rates, minimums, sweep_fx_rule, markets, detailed_ledger=True):
         self.__account = account
+        self.__number = account.number_type()
         self.__commission = commission[0]
         self.__commission_currency = commission[1]
         self.__interest_rates = interest_rates
         self.__minimums = minimums
         self.__sweep_fx_rule = sweep_fx_rule
         self.__markets = markets
+        self.__detailed_ledger = detailed_ledger
         self.__trade_records = []
         self.__trade_indexes = defaultdict(list)
-        self.__position_records = {}
+        self.__position_book = PositionBook()
         self.__days_in_year = {
             365: 'AUD,CAD,CNH,CNY,GBP,HKD,KRW,ILS,INR,NZD,RUB,SGD'.split(','),
             360: 'USD,EUR,CHF,CZK,JPY,SEK,NOK,DKK,HUF,MXN'.split(',')
@@ -74,7 +75,7 @@ class Broker(object):
             added = abs(open_position) < abs(target_position_size)
             market_data, previous_data = market.data(date)
             previous_date = previous_data[Table.Market.PRICE_DATE]
-            commissions = Decimal(self.__commission * abs(quantity))
+            commissions = self.__number(self.__commission * abs(quantity))
             margin = market.margin() * abs(quantity) * (1 if added else -1)
             price = self.__slipped_price(market_data, market, order.price(), previous_date, quantity)
             result_type = OrderResultType.FILLED if quantity == order.quantity() else OrderResultType.PARTIALLY_FILLED
@@ -124,24 +125,26 @@ class Broker(object):
         :param date:            date of the record
         :param previous_date:   previous date
         """
-        previous_record = self.__position_records[previous_date] if previous_date in self.__position_records else {}
-        open_positions = previous_record.copy()
-        for t in self.trades(date, date, True):
-            order = t.order()
-            key = '%s_%s' % (order.market().id(), order.contract())
-            quantity = t.result().quantity()
-            open_positions[key] = previous_record[key] + quantity if key in previous_record else quantity
-
-        self.__position_records[date] = {k: open_positions[k] for k in open_positions.keys() if open_positions[k]}
+        fills = [(t.order().market().id(), t.order().contract(), t.result().quantity()) for t in self.trades(date, date, True)]
+        self.__position_book.record(date, previous_date, fills)
 
     def positions(self, date):
         """
         Return positions for the date passed in, if any
         
         :param datetime date:   date of the positions
-        :return dict:           {<'market ID'_'contract'>: <number of positions>}
+        :return dict:           {(market ID, contract): <number of positions>}
+        """
+        return self.__position_book.positions(date)
+
+    def position_snapshots(self, dates):
         """
-        return self.__position_records[date] if date in self.__position_records else {}
+        Iterate over positions of the dates passed in
+
+        :param list dates:  sorted list of dates
+        :return generator:  tuples(date, {(market ID, contract): <number of positions>})
+        """
+        return self.__position_book.snapshots(dates)
 
     def __slipped_price(self, market_data, market, price, date, quantity):
         """
@@ -187,51 +190,70 @@ class Broker(object):
         :param previous_date:   previous trading date
         """
         open_positions = self.positions(previous_date)
-        order_results = {'%s_%s' % (t.order().market().id(), t.order().contract()): t.result()
+        order_results = {(t.order().market().id(), t.order().contract()): t.result()
                          for t in self.trades(date, date, True)}
-        not_traded_positions = {k: open_positions[k] + (order_results[k].quantity() if k in order_results else 0)
-                                for k in open_positions.keys()}
-        # MTM transactions
-        for k in order_results.keys():
-            market = self.__markets[int(k.split('_')[0])]
-            market_data, previous_data = market.data(date)
-            contract = k.split('_')[1]
-            order_result = order_results[k]
+        settle_prices = self.__settle_prices(date, set(k[0] for k in open_positions) | set(k[0] for k in order_results))
+
+        # MTM transactions -- closing trades are marked from previous settle price, opening trades to settle price
+        marks = []
+        for (market_id, contract), order_result in order_results.items():
+            market, settle_price, previous_settle_price = settle_prices[market_id]
             price = order_result.price()
             quantity = order_result.quantity()
-            settle_price = market_data[Table.Market.SETTLE_PRICE]
-            previous_settle_price = previous_data[Table.Market.SETTLE_PRICE]
-            order_type = {
-                1: {1: {1: OrderType.BTO, 0: OrderType.STC}, 0: {1: OrderType.BTC, 0: OrderType.STO}},
-                0: {0: {1: OrderType.BTO, 0: OrderType.STO}}
-            }[int(k in open_positions)][int(k in open_positions and open_positions[k] > 0)][int(quantity > 0)]
-            pnl = {
-                OrderType.BTO: settle_price - price,
-                OrderType.STO: price - settle_price,
-                OrderType.BTC: previous_settle_price - price,
-                OrderType.STC: price - previous_settle_price
-            }[order_type]
-            context = {
-                OrderType.BTO: (market, contract, settle_price, quantity),
-                OrderType.STO: (market, contract, settle_price, quantity),
-                OrderType.BTC: (market, contract, price, quantity),
-                OrderType.STC: (market, contract, price, quantity)
-            }[order_type]
-            pnl = Decimal(pnl * abs(quantity) * market.point_value())
-            self.__add_transaction(TransactionType.MTM_TRANSACTION, date, pnl, market.currency(), context)
+            position = open_positions.get((market_id, contract))
+            closing = position is not None and (position > 0) != (quantity > 0)
+            reference_price = previous_settle_price if closing else settle_price
+            marks.append((market, contract, quantity, price, reference_price, price if closing else settle_price))
+        self.__add_mtm_transactions(TransactionType.MTM_TRANSACTION, date, marks)
 
         # MTM Positions
-        for k in not_traded_positions.keys():
-            market = self.__markets[int(k.split('_')[0])]
+        marks = []
+        for key, position in open_positions.items():
+            order_result = order_results.get(key)
+            quantity = position + (order_result.quantity() if order_result else 0)
+            market, price, previous_settle_price = settle_prices[key[0]]
+            if price is not None and quantity:
+                marks.append((market, key[1], quantity, previous_settle_price, price, price))
+        self.__add_mtm_transactions(TransactionType.MTM_POSITION, date, marks)
+
+    def __settle_prices(self, date, market_ids):
+        """
+        Look up settle prices of the markets passed in, once for each market
+
+        :param date:        date of the prices
+        :param market_ids:  set of market IDs
+        :return:            dict of market ID and tuple(market, settle price, previous settle price),
+                            prices are None if the market has no data on the date
+        """
+        settle_prices = {}
+        for market_id in market_ids:
+            market = self.__markets[market_id]
             market_data, previous_data = market.data(date)
-            quantity = not_traded_positions[k]
-            if market_data and quantity:
-                price = market_data[Table.Market.SETTLE_PRICE]
-                previous_settle_price = previous_data[Table.Market.SETTLE_PRICE]
-                pnl = price - previous_settle_price if quantity > 0 else previous_settle_price - price
-                context = (market, k.split('_')[1], price, quantity)
-                pnl = Decimal(pnl * abs(quantity) * market.point_value())
-                self.__add_transaction(TransactionType.MTM_POSITION, date, pnl, market.currency(), context)
+            settle_prices[market_id] = (market, market_data[Table.Market.SETTLE_PRICE], previous_data[Table.Market.SETTLE_PRICE]) \
+                if market_data else (market, None, None)
+        return settle_prices
+
+    def __add_mtm_transactions(self, transaction_type, date, marks):
+        """
+        Calculate PnL of the marks and add their MTM transactions --
+        one for each mark, or one for each currency if the detailed ledger is disabled
+
+        :param transaction_type:    type of the MTM transactions
+        :param date:                date of the transactions
+        :param marks:               list of tuples(market, contract, quantity, price, price marked to, context price)
+        """
+        totals = defaultdict(float)
+        for market, contract, quantity, price, reference_price, context_price in marks:
+            pnl = reference_price - price if quantity > 0 else price - reference_price
+            amount = pnl * abs(quantity) * market.point_value()
+            if self.__detailed_ledger:
+                context = (market, contract, context_price, quantity)
+                self.__add_transaction(transaction_type, date, self.__number(amount), market.currency(), context)
+            else:
+                totals[market.currency()] += amount
+
+        for currency in sorted(totals.keys()):
+            self.__add_transaction(transaction_type, date, self.__number(totals[currency]), currency)
 
     def __translate_fx_balances(self, date, previous_date):
         """
@@ -242,8 +264,8 @@ class Broker(object):
         """
         base_currency = self.__account.base_currency()
         for currency in [c for c in self.__account.fx_balance_currencies() if c != base_currency]:
-            rate = Decimal(self.__account.base_rate(currency, date))
-            prior_rate = Decimal(self.__account.base_rate(currency, previous_date))
+            rate = self.__number(self.__account.base_rate(currency, date))
+            prior_rate = self.__number(self.__account.base_rate(currency, previous_date))
             balance = self.__account.fx_balance(currency, previous_date)
 
             if rate != prior_rate and balance:
@@ -300,13 +322,13 @@ class Broker(object):
         days = 365 if currency in self.__days_in_year[365] else 360
         transaction_type = TransactionType.BALANCE_INTEREST if target == 'balance' else TransactionType.MARGIN_INTEREST
         fn = self.__account.fx_balance if target == 'balance' else self.__account.margin_loan_balance
-        balance = Decimal(fn(currency, previous_date) - minimum)
+        balance = self.__number(fn(currency, previous_date) - minimum)
 
         if condition(balance, 0):
             currency_rates = [r for r in self.__interest_rates if r.code() == currency]
             benchmark_interest = currency_rates[0] if len(currency_rates) else None
             immediate_rate = benchmark_interest.immediate_rate(previous_date) if benchmark_interest else 0
-            rate = Decimal(spread_op(immediate_rate, spread) / 100)
+            rate = self.__number(spread_op(immediate_rate, spread) / 100)
             amount = balance * rate / days
             context = (balance, benchmark_interest, rate, target)
             self.__add_transaction(transaction_type, date, amount * sign, currency, context)
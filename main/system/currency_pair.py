@@ -1,19 +1,28 @@
 #!/usr/bin/python
 
 import datetime as dt
-from enum import Table
-from operator import itemgetter
+from series.columns import RateColumns
+from series.series_cache import SeriesCache
 
 
 class CurrencyPair(object):
 
-    def __init__(self, start_data_date, currency_pair_id, code, name, first_data_date):
+    def __init__(self, start_data_date, currency_pair_id, code, name, first_data_date, cache=None):
         self.__start_data_date = start_data_date
         self.__currency_pair_id = currency_pair_id
         self.__code = code
         self.__name = name
         self.__first_data_date = first_data_date
-        self.__data = []
+        self.__cache = cache
+        self.__rates = RateColumns()
+
+    def id(self):
+        """
+        Return currency pair ID
+
+        :return: int representing the pair's ID
+        """
+        return self.__currency_pair_id
 
     def code(self):
         """
@@ -30,41 +39,26 @@ class CurrencyPair(object):
         :param date:    date to return rate on
         :return:        Number representing the rate on the date
         """
-        pair_data = [d for d in self.__data if d[Table.CurrencyPair.PRICE_DATE] <= date]
-        return pair_data[-1][Table.CurrencyPair.LAST_PRICE] if len(pair_data) else 1.0
+        index = self.__rates.as_of_index(date)
+        return self.__rates.rate(index) if index is not None else 1.0
 
-    def load_data(self, connection, end_date):
+    def load_data(self, data_source, end_date):
         """
-        Load pair's data
+        Load pair's data, from the cache if it's there
 
-        :param connection:  MySQLdb connection instance
+        :param data_source: DataSource instance
         :param end_date:    Last date to fetch data to
         """
-        cursor = connection.cursor()
-        sql = """
-            SELECT %s
-            FROM currency
-            WHERE currency_pair_id = '%s'
-            AND DATE(price_date) >= '%s'
-            AND DATE(price_date) <= '%s';
-        """
-
-        cursor.execute(sql % (
-            self.__column_names(),
-            self.__currency_pair_id,
-            self.__start_data_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        ))
-        self.__data = cursor.fetchall()
+        name = 'currency_pair_%s' % self.__currency_pair_id
+        source_version = data_source.version() if self.__cache else None
+        data = None if source_version else data_source.currency_rates(self.__currency_pair_id, self.__start_data_date, end_date)
+        version = SeriesCache.version(self.__start_data_date, end_date, source_version or data) if self.__cache else None
 
-    def __column_names(self):
-        """
-        Construct and return column names sorted by their index in ENUM
+        self.__rates = RateColumns()
+        if not self.__cache or not self.__cache.open_rates(name, version, self.__rates):
+            self.__rates.extend(data if data is not None
+                                else data_source.currency_rates(self.__currency_pair_id, self.__start_data_date, end_date))
 
-        :return:    string
-        """
-        columns = {
-            'price_date': Table.CurrencyPair.PRICE_DATE,
-            'last_price': Table.CurrencyPair.LAST_PRICE
-        }
-        return ', '.join([i[0] for i in sorted(columns.items(), key=itemgetter(1))])
+            if self.__cache:
+                self.__cache.save_rates(name, version, self.__rates)
+                self.__cache.open_rates(name, version, self.__rates)
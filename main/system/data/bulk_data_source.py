@@ -0,0 +1,130 @@
+#!/usr/bin/python
+
+from data.data_source import DataSource
+
+
+class BulkDataSource(DataSource):
+    """
+    Data source serving price series of the markets, currency pairs and interest rates passed in
+    from data fetched in bulk from the wrapped source. Each kind of series is fetched for all the items
+    at once, on first request of any of them; requests the bulk data doesn't cover go to the wrapped source.
+    """
+
+    def __init__(self, data_source, markets, currency_pair_ids, currency_ids):
+        """
+        :param data_source:         DataSource to fetch the data from
+        :param markets:             list of tuples(market ID, market instrument code)
+        :param currency_pair_ids:   list of currency pair IDs
+        :param currency_ids:        list of currency IDs
+        """
+        self.__data_source = data_source
+        self.__markets = markets
+        self.__currency_pair_ids = currency_pair_ids
+        self.__currency_ids = currency_ids
+        self.__data = {}
+
+    def holidays(self, market_ids, start_date, end_date):
+        return self.__data_source.holidays(market_ids, start_date, end_date)
+
+    def version(self):
+        return self.__data_source.version()
+
+    def connection(self):
+        return self.__data_source.connection()
+
+    def simulation_names(self):
+        return self.__data_source.simulation_names()
+
+    def simulation(self, name):
+        return self.__data_source.simulation(name)
+
+    def roll_strategy(self, roll_strategy_id):
+        return self.__data_source.roll_strategy(roll_strategy_id)
+
+    def investment_universe(self, name):
+        return self.__data_source.investment_universe(name)
+
+    def market(self, market_id):
+        return self.__data_source.market(market_id)
+
+    def delivery_months(self):
+        return self.__data_source.delivery_months()
+
+    def currency_pairs(self):
+        return self.__data_source.currency_pairs()
+
+    def currencies(self):
+        return self.__data_source.currencies()
+
+    def continuous_prices(self, market_id, market_code, roll_strategy_id, start_date, end_date):
+        return self.__records(
+            ('continuous_prices', roll_strategy_id, start_date, end_date),
+            (int(market_id), market_code),
+            lambda: self.__data_source.continuous_prices_by_market(self.__markets, roll_strategy_id, start_date, end_date),
+            lambda: self.__data_source.continuous_prices(market_id, market_code, roll_strategy_id, start_date, end_date)
+        )
+
+    def contract_prices(self, market_id, market_code, start_date, end_date):
+        return self.__records(
+            ('contract_prices', start_date, end_date),
+            (int(market_id), market_code),
+            lambda: self.__data_source.contract_prices_by_market(self.__markets, start_date, end_date),
+            lambda: self.__data_source.contract_prices(market_id, market_code, start_date, end_date)
+        )
+
+    def roll_schedule(self, market_id):
+        return self.__records(
+            ('roll_schedule',),
+            int(market_id),
+            lambda: self.__data_source.roll_schedules([m[0] for m in self.__markets]),
+            lambda: self.__data_source.roll_schedule(market_id)
+        )
+
+    def currency_rates(self, currency_pair_id, start_date, end_date):
+        return self.__records(
+            ('currency_rates', start_date, end_date),
+            int(currency_pair_id),
+            lambda: self.__data_source.currency_rates_by_pair(self.__currency_pair_ids, start_date, end_date),
+            lambda: self.__data_source.currency_rates(currency_pair_id, start_date, end_date)
+        )
+
+    def interest_rates(self, currency_id, start_date, end_date):
+        return self.__records(
+            ('interest_rates', start_date, end_date),
+            int(currency_id),
+            lambda: self.__data_source.interest_rates_by_currency(self.__currency_ids, start_date, end_date),
+            lambda: self.__data_source.interest_rates(currency_id, start_date, end_date)
+        )
+
+    def __records(self, key, item, fetch_bulk, fetch_one):
+        """
+        Return records of the item from bulk data under the key passed in, fetching the bulk data if needed.
+        Records are handed over only once, so the bulk data are released as the items load them.
+
+        :param key:         tuple identifying kind of the series and arguments of the bulk request
+        :param item:        market tuple(ID, instrument code), or ID of currency pair or currency
+        :param fetch_bulk:  function fetching dict of records of all items
+        :param fetch_one:   function fetching records of the single item, if not covered by the bulk data
+        :return:            list of tuples
+        """
+        if key not in self.__data:
+            self.__data[key] = fetch_bulk()
+
+        item_id = item[0] if isinstance(item, tuple) else item
+        data = self.__data[key]
+        return data.pop(item_id) if item in self.__items(key) and item_id in data else fetch_one()
+
+    def __items(self, key):
+        """
+        Return items the bulk data under the key passed in are fetched for
+
+        :param key: tuple identifying kind of the series
+        :return:    list of items
+        """
+        return {
+            'continuous_prices': self.__markets,
+            'contract_prices': self.__markets,
+            'roll_schedule': [m[0] for m in self.__markets],
+            'currency_rates': self.__currency_pair_ids,
+            'interest_rates': self.__currency_ids
+        }[key[0]]
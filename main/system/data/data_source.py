@@ -0,0 +1,243 @@
+#!/usr/bin/python
+
+from abc import ABCMeta, abstractmethod
+
+
+class DataSource(object):
+    """
+    Abstract Base Class for sources of simulation data -- simulations and their settings,
+    markets with their price series, currency pairs and interest rates.
+    Records are tuples with the same columns (and order) as rows of their DB tables.
+    Bulk methods ('*_by_*', 'markets', 'roll_schedules') by default query the items one by one,
+    sources able to fetch them in fewer round trips override them.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def simulation_names(self):
+        """
+        Return names of all simulations
+
+        :return:    list of strings
+        """
+        raise NotImplementedError("Should implement 'simulation_names()'")
+
+    @abstractmethod
+    def simulation(self, name):
+        """
+        Return simulation record by name passed in
+
+        :param name:    name of the simulation
+        :return:        tuple representing simulation record, or None if there is no such simulation
+        """
+        raise NotImplementedError("Should implement 'simulation(name)'")
+
+    @abstractmethod
+    def roll_strategy(self, roll_strategy_id):
+        """
+        Return roll strategy record by ID passed in
+
+        :param roll_strategy_id:    ID of the roll strategy
+        :return:                    tuple(id, name, type, params)
+        """
+        raise NotImplementedError("Should implement 'roll_strategy(roll_strategy_id)'")
+
+    @abstractmethod
+    def investment_universe(self, name):
+        """
+        Return investment universe record by name passed in
+
+        :param name:    name of the investment universe
+        :return:        tuple(contract start date, data start date, comma-separated market IDs)
+        """
+        raise NotImplementedError("Should implement 'investment_universe(name)'")
+
+    @abstractmethod
+    def market(self, market_id):
+        """
+        Return market record by ID passed in
+
+        :param market_id:   ID of the market
+        :return:            tuple(name, code, data codes, currency, tick value, point value, overnight initial margin)
+        """
+        raise NotImplementedError("Should implement 'market(market_id)'")
+
+    @abstractmethod
+    def delivery_months(self):
+        """
+        Return delivery month records
+
+        :return:    list of tuples(code, short name)
+        """
+        raise NotImplementedError("Should implement 'delivery_months()'")
+
+    @abstractmethod
+    def currency_pairs(self):
+        """
+        Return records of currency pairs in the 'Primary' group
+
+        :return:    list of tuples(id, code, name, first data date)
+        """
+        raise NotImplementedError("Should implement 'currency_pairs()'")
+
+    @abstractmethod
+    def currencies(self):
+        """
+        Return records of currencies in the 'Majors' group
+
+        :return:    list of tuples(id, code)
+        """
+        raise NotImplementedError("Should implement 'currencies()'")
+
+    @abstractmethod
+    def continuous_prices(self, market_id, market_code, roll_strategy_id, start_date, end_date):
+        """
+        Return adjusted continuous price records of the market, sorted by date
+
+        :param market_id:           ID of the market
+        :param market_code:         code of the market instrument
+        :param roll_strategy_id:    ID of the roll strategy the series is constructed with
+        :param start_date:          date of the first record
+        :param end_date:            date of the last record
+        :return:                    list of tuples(code, date, open, high, low, settle, volume)
+        """
+        raise NotImplementedError("Should implement 'continuous_prices(market_id, market_code, roll_strategy_id, start_date, end_date)'")
+
+    @abstractmethod
+    def contract_prices(self, market_id, market_code, start_date, end_date):
+        """
+        Return price records of all contracts of the market instrument, sorted by date
+
+        :param market_id:   ID of the market
+        :param market_code: code of the market instrument
+        :param start_date:  date of the first record
+        :param end_date:    date of the last record
+        :return:            list of tuples(code, date, open, high, low, settle, volume, last trading day)
+        """
+        raise NotImplementedError("Should implement 'contract_prices(market_id, market_code, start_date, end_date)'")
+
+    @abstractmethod
+    def roll_schedule(self, market_id):
+        """
+        Return standard roll schedule of the market
+
+        :param market_id:   ID of the market
+        :return:            list of tuples(roll-out month, roll-in month, month, day)
+        """
+        raise NotImplementedError("Should implement 'roll_schedule(market_id)'")
+
+    @abstractmethod
+    def currency_rates(self, currency_pair_id, start_date, end_date):
+        """
+        Return rates of the currency pair, sorted by date
+
+        :param currency_pair_id:    ID of the currency pair
+        :param start_date:          date of the first record
+        :param end_date:            date of the last record
+        :return:                    list of tuples(date, last price)
+        """
+        raise NotImplementedError("Should implement 'currency_rates(currency_pair_id, start_date, end_date)'")
+
+    @abstractmethod
+    def interest_rates(self, currency_id, start_date, end_date):
+        """
+        Return interest rates of the currency, sorted by date
+
+        :param currency_id: ID of the currency
+        :param start_date:  date of the first record
+        :param end_date:    date of the last record
+        :return:            list of tuples(date, immediate rate, three-months rate)
+        """
+        raise NotImplementedError("Should implement 'interest_rates(currency_id, start_date, end_date)'")
+
+    def markets(self, market_ids):
+        """
+        Return records of all markets passed in
+
+        :param market_ids:  list of market IDs
+        :return:            dict of market ID and tuple representing the market record
+        """
+        return {int(i): self.market(i) for i in market_ids}
+
+    def continuous_prices_by_market(self, markets, roll_strategy_id, start_date, end_date):
+        """
+        Return adjusted continuous price records of all markets passed in
+
+        :param markets:             list of tuples(market ID, market instrument code)
+        :param roll_strategy_id:    ID of the roll strategy the series are constructed with
+        :param start_date:          date of the first record
+        :param end_date:            date of the last record
+        :return:                    dict of market ID and list of records as in 'continuous_prices'
+        """
+        return {m[0]: self.continuous_prices(m[0], m[1], roll_strategy_id, start_date, end_date) for m in markets}
+
+    def contract_prices_by_market(self, markets, start_date, end_date):
+        """
+        Return contract price records of all markets passed in
+
+        :param markets:     list of tuples(market ID, market instrument code)
+        :param start_date:  date of the first record
+        :param end_date:    date of the last record
+        :return:            dict of market ID and list of records as in 'contract_prices'
+        """
+        return {m[0]: self.contract_prices(m[0], m[1], start_date, end_date) for m in markets}
+
+    def roll_schedules(self, market_ids):
+        """
+        Return standard roll schedules of all markets passed in
+
+        :param market_ids:  list of market IDs
+        :return:            dict of market ID and list of records as in 'roll_schedule'
+        """
+        return {i: self.roll_schedule(i) for i in market_ids}
+
+    def currency_rates_by_pair(self, currency_pair_ids, start_date, end_date):
+        """
+        Return rates of all currency pairs passed in
+
+        :param currency_pair_ids:   list of currency pair IDs
+        :param start_date:          date of the first record
+        :param end_date:            date of the last record
+        :return:                    dict of currency pair ID and list of records as in 'currency_rates'
+        """
+        return {i: self.currency_rates(i, start_date, end_date) for i in currency_pair_ids}
+
+    def interest_rates_by_currency(self, currency_ids, start_date, end_date):
+        """
+        Return interest rates of all currencies passed in
+
+        :param currency_ids:    list of currency IDs
+        :param start_date:      date of the first record
+        :param end_date:        date of the last record
+        :return:                dict of currency ID and list of records as in 'interest_rates'
+        """
+        return {i: self.interest_rates(i, start_date, end_date) for i in currency_ids}
+
+    def holidays(self, market_ids, start_date, end_date):
+        """
+        Return dates of holidays of the exchanges the markets passed in trade on;
+        holidays not listing any exchange are holidays of every market
+
+        :param market_ids:  list of market IDs
+        :param start_date:  date of the first holiday
+        :param end_date:    date of the last holiday
+        :return:            dict of market ID and list of dates, empty if the source has no holidays data
+        """
+        return {}
+
+    def version(self):
+        """
+        Return version of the source's data, changing whenever the data change
+
+        :return:    string, or None if the source can't tell without reading all the data
+        """
+        return None
+
+    def connection(self):
+        """
+        Return DB connection to persist simulation results into
+
+        :return:    DB connection, or None if the source doesn't persist results
+        """
+        return None
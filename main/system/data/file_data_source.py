@@ -0,0 +1,375 @@
+#!/usr/bin/python
+
+import os
+import sys
+import sqlite3
+import datetime as dt
+from enum import Table
+from market import Market
+from data.data_source import DataSource
+
+
+class FileDataSource(DataSource):
+    """
+    Simulation data read from local SQLite snapshot file, exported from DB by 'FileDataSource.export'.
+    Snapshot tables hold only the columns the simulation reads, in the order the loaders expect them.
+    """
+
+    TABLES = [
+        """CREATE TABLE simulation(
+            id integer, name text, params text, trading_model text, trading_params text,
+            studies text, roll_strategy_id integer, investment_universe text, PRIMARY KEY (name))""",
+        """CREATE TABLE roll_strategy(id integer, name text, type text, params text, PRIMARY KEY (id))""",
+        """CREATE TABLE investment_universe(
+            name text, contract_start_date date, data_start_date date, market_ids text, PRIMARY KEY (name))""",
+        """CREATE TABLE market(
+            id integer, name text, code text, data_codes text, currency text,
+            tick_value real, point_value real, overnight_initial_margin real, PRIMARY KEY (id))""",
+        """CREATE TABLE delivery_month(code text, short_name text)""",
+        """CREATE TABLE currency_pairs(id integer, code text, name text, first_data_date date, PRIMARY KEY (id))""",
+        """CREATE TABLE currencies(id integer, code text, PRIMARY KEY (id))""",
+        """CREATE TABLE continuous_adjusted(
+            market_id integer, roll_strategy_id integer, code text, price_date date,
+            open_price real, high_price real, low_price real, settle_price real, volume integer)""",
+        """CREATE INDEX continuous_adjusted_market ON continuous_adjusted(market_id, roll_strategy_id, price_date)""",
+        """CREATE TABLE contract(
+            market_id integer, code text, price_date date,
+            open_price real, high_price real, low_price real, settle_price real, volume integer, last_trading_day date)""",
+        """CREATE INDEX contract_market ON contract(market_id, price_date)""",
+        """CREATE TABLE standard_roll_schedule(market_id integer, roll_out_month text, roll_in_month text, month text, day integer)""",
+        """CREATE TABLE currency(currency_pair_id integer, price_date date, last_price real)""",
+        """CREATE INDEX currency_pair ON currency(currency_pair_id, price_date)""",
+        """CREATE TABLE interest_rate(currency_id integer, price_date date, immediate_rate real, three_months_rate real)""",
+        """CREATE INDEX interest_rate_currency ON interest_rate(currency_id, price_date)""",
+        """CREATE TABLE holidays(market_id integer, date date)"""
+    ]
+
+    def __init__(self, path):
+        """
+        :param path:    path to the snapshot file
+        """
+        self.__path = path
+        self.__connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.__connection.text_factory = str
+
+    def version(self):
+        stat = os.stat(self.__path)
+        return '%s:%s:%s' % (os.path.abspath(self.__path), stat.st_size, stat.st_mtime)
+
+    def simulation_names(self):
+        return [r[0] for r in self.__fetch("SELECT name FROM simulation ORDER BY rowid")]
+
+    def simulation(self, name):
+        return self.__fetch_one("SELECT * FROM simulation WHERE name = ?", name)
+
+    def roll_strategy(self, roll_strategy_id):
+        return self.__fetch_one("SELECT * FROM roll_strategy WHERE id = ?", int(roll_strategy_id))
+
+    def investment_universe(self, name):
+        return self.__fetch_one("""
+            SELECT contract_start_date, data_start_date, market_ids
+            FROM investment_universe
+            WHERE name = ?
+        """, name)
+
+    def market(self, market_id):
+        return self.__fetch_one("""
+            SELECT name, code, data_codes, currency, tick_value, point_value, overnight_initial_margin
+            FROM market
+            WHERE id = ?
+        """, int(market_id))
+
+    def delivery_months(self):
+        return self.__fetch("SELECT code, short_name FROM delivery_month ORDER BY rowid")
+
+    def currency_pairs(self):
+        return self.__fetch("SELECT id, code, name, first_data_date FROM currency_pairs ORDER BY rowid")
+
+    def currencies(self):
+        return self.__fetch("SELECT id, code FROM currencies ORDER BY rowid")
+
+    def continuous_prices(self, market_id, market_code, roll_strategy_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT code, price_date, open_price, high_price, low_price, settle_price, volume
+            FROM continuous_adjusted
+            WHERE market_id = ?
+            AND code = ?
+            AND roll_strategy_id = ?
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY price_date, rowid
+        """, int(market_id), market_code, int(roll_strategy_id), start_date, end_date)
+
+    def contract_prices(self, market_id, market_code, start_date, end_date):
+        return self.__fetch("""
+            SELECT code, price_date, open_price, high_price, low_price, settle_price, volume, last_trading_day
+            FROM contract
+            WHERE market_id = ?
+            AND substr(code, 1, length(code) - 5) = ?
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY price_date, rowid
+        """, int(market_id), market_code, start_date, end_date)
+
+    def roll_schedule(self, market_id):
+        return self.__fetch("""
+            SELECT roll_out_month, roll_in_month, month, day
+            FROM standard_roll_schedule
+            WHERE market_id = ?
+            ORDER BY rowid
+        """, int(market_id))
+
+    def currency_rates(self, currency_pair_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT price_date, last_price
+            FROM currency
+            WHERE currency_pair_id = ?
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY price_date, rowid
+        """, int(currency_pair_id), start_date, end_date)
+
+    def interest_rates(self, currency_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT price_date, immediate_rate, three_months_rate
+            FROM interest_rate
+            WHERE currency_id = ?
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY price_date, rowid
+        """, int(currency_id), start_date, end_date)
+
+    def holidays(self, market_ids, start_date, end_date):
+        # Snapshots exported before holidays were added don't have the table
+        if not self.__fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'holidays'"):
+            return {}
+
+        # Snapshots exported before holidays were mapped to exchanges have the dates only, of every market
+        if 'market_id' not in [r[1] for r in self.__fetch("PRAGMA table_info(holidays)")]:
+            dates = [r[0] for r in self.__fetch(
+                "SELECT DISTINCT date FROM holidays WHERE date >= ? AND date <= ? ORDER BY date",
+                start_date,
+                end_date
+            )]
+            return {market_id: dates for market_id in market_ids}
+
+        holidays = {}
+        for market_id, date in self.__fetch("""
+            SELECT market_id, date
+            FROM holidays
+            WHERE market_id IN (%s)
+            AND date >= ?
+            AND date <= ?
+            ORDER BY market_id, date
+        """ % self.__placeholders(market_ids), *(map(int, market_ids) + [start_date, end_date])):
+            holidays.setdefault(market_id, []).append(date)
+        return holidays
+
+    def markets(self, market_ids):
+        return {r[0]: r[1:] for r in self.__fetch("""
+            SELECT id, name, code, data_codes, currency, tick_value, point_value, overnight_initial_margin
+            FROM market
+            WHERE id IN (%s)
+        """ % self.__placeholders(market_ids), *map(int, market_ids))}
+
+    def continuous_prices_by_market(self, markets, roll_strategy_id, start_date, end_date):
+        codes = {int(m[0]): m[1] for m in markets}
+        return self.__partition(codes, self.__fetch("""
+            SELECT market_id, code, price_date, open_price, high_price, low_price, settle_price, volume
+            FROM continuous_adjusted
+            WHERE market_id IN (%s)
+            AND roll_strategy_id = ?
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY market_id, price_date, rowid
+        """ % self.__placeholders(codes), *(codes.keys() + [int(roll_strategy_id), start_date, end_date])),
+            lambda market_id, p: p[Table.Market.CODE] == codes[market_id])
+
+    def contract_prices_by_market(self, markets, start_date, end_date):
+        codes = {int(m[0]): m[1] for m in markets}
+        return self.__partition(codes, self.__fetch("""
+            SELECT market_id, code, price_date, open_price, high_price, low_price, settle_price, volume, last_trading_day
+            FROM contract
+            WHERE market_id IN (%s)
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY market_id, price_date, rowid
+        """ % self.__placeholders(codes), *(codes.keys() + [start_date, end_date])),
+            lambda market_id, c: c[Table.Market.CODE][:-5] == codes[market_id])
+
+    def roll_schedules(self, market_ids):
+        return self.__partition(market_ids, self.__fetch("""
+            SELECT market_id, roll_out_month, roll_in_month, month, day
+            FROM standard_roll_schedule
+            WHERE market_id IN (%s)
+            ORDER BY market_id, rowid
+        """ % self.__placeholders(market_ids), *map(int, market_ids)))
+
+    def currency_rates_by_pair(self, currency_pair_ids, start_date, end_date):
+        return self.__partition(currency_pair_ids, self.__fetch("""
+            SELECT currency_pair_id, price_date, last_price
+            FROM currency
+            WHERE currency_pair_id IN (%s)
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY currency_pair_id, price_date, rowid
+        """ % self.__placeholders(currency_pair_ids), *(map(int, currency_pair_ids) + [start_date, end_date])))
+
+    def interest_rates_by_currency(self, currency_ids, start_date, end_date):
+        return self.__partition(currency_ids, self.__fetch("""
+            SELECT currency_id, price_date, immediate_rate, three_months_rate
+            FROM interest_rate
+            WHERE currency_id IN (%s)
+            AND price_date >= ?
+            AND price_date <= ?
+            ORDER BY currency_id, price_date, rowid
+        """ % self.__placeholders(currency_ids), *(map(int, currency_ids) + [start_date, end_date])))
+
+    def __placeholders(self, values):
+        """
+        Return list of '?' placeholders for each value passed in
+
+        :param values:  list of values
+        :return:        string
+        """
+        return ', '.join('?' * len(values))
+
+    def __partition(self, keys, rows, accept=None):
+        """
+        Split rows by their first column into lists of records without the column
+
+        :param keys:    list of keys (first column values) to create (possibly empty) partitions of
+        :param rows:    list of tuples, keyed by their first column
+        :param accept:  optional function(key, record) filtering the records
+        :return:        dict of key and list of tuples
+        """
+        partitions = {int(k): [] for k in keys}
+        for row in rows:
+            record = row[1:]
+            if accept is None or accept(row[0], record):
+                partitions[row[0]].append(record)
+        return partitions
+
+    def __fetch(self, query, *params):
+        """
+        Execute query and return all its records
+
+        :param query:   SQL query with '?' placeholders
+        :param params:  values of the placeholders
+        :return:        tuple of tuples
+        """
+        return tuple(self.__connection.execute(query, params).fetchall())
+
+    def __fetch_one(self, query, *params):
+        """
+        Execute query and return its first record
+
+        :param query:   SQL query with '?' placeholders
+        :param params:  values of the placeholders
+        :return:        tuple or None
+        """
+        return self.__connection.execute(query, params).fetchone()
+
+    @staticmethod
+    def export(data_source, path, simulation_names):
+        """
+        Export all data of the simulations passed in from the data source into new snapshot file
+
+        :param data_source:         DataSource to export the data from (e.g. MySQLDataSource)
+        :param path:                path of the snapshot file to create
+        :param simulation_names:    list of names of simulations to export
+        """
+        start_date = dt.date(1900, 1, 1)
+        end_date = dt.date(9999, 12, 31)
+        connection = sqlite3.connect(path)
+        connection.text_factory = str
+        map(connection.execute, FileDataSource.TABLES)
+
+        roll_strategies = {}
+        universes = {}
+        markets = {}
+
+        for name in simulation_names:
+            FileDataSource.__log('Exporting simulation %s' % name)
+            simulation = data_source.simulation(name)
+            roll_strategy_id = simulation[Table.Simulation.ROLL_STRATEGY_ID]
+            universe_name = simulation[Table.Simulation.INVESTMENT_UNIVERSE]
+            FileDataSource.__insert(connection, 'simulation', (), [simulation])
+
+            if roll_strategy_id not in roll_strategies:
+                roll_strategies[roll_strategy_id] = data_source.roll_strategy(roll_strategy_id)
+                FileDataSource.__insert(connection, 'roll_strategy', (), [roll_strategies[roll_strategy_id]])
+            norgate = roll_strategies[roll_strategy_id][Table.RollStrategy.NAME] == 'norgate'
+
+            if universe_name not in universes:
+                universes[universe_name] = data_source.investment_universe(universe_name)
+                FileDataSource.__insert(connection, 'investment_universe', (universe_name,), [universes[universe_name]])
+
+            for market_id in map(int, universes[universe_name][2].split(',')):
+                if market_id not in markets:
+                    markets[market_id] = data_source.market(market_id)
+                    FileDataSource.__insert(connection, 'market', (market_id,), [markets[market_id]])
+
+                # Norgate series are read from continuous prices, all other roll strategies roll contracts
+                key = (market_id, roll_strategy_id) if norgate else (market_id,)
+                if key not in markets:
+                    FileDataSource.__log('Exporting prices of market %s' % market_id)
+                    markets[key] = True
+                    code = Market.instrument_code(markets[market_id][1], markets[market_id][2])
+                    if norgate:
+                        prices = data_source.continuous_prices(market_id, code, roll_strategy_id, start_date, end_date)
+                        FileDataSource.__insert(connection, 'continuous_adjusted', key, prices)
+                    else:
+                        prices = data_source.contract_prices(market_id, code, start_date, end_date)
+                        FileDataSource.__insert(connection, 'contract', key, prices)
+                        FileDataSource.__insert(connection, 'standard_roll_schedule', key, data_source.roll_schedule(market_id))
+
+        FileDataSource.__insert(connection, 'delivery_month', (), data_source.delivery_months())
+
+        currency_pairs = data_source.currency_pairs()
+        FileDataSource.__insert(connection, 'currency_pairs', (), currency_pairs)
+        for currency_pair in currency_pairs:
+            FileDataSource.__log('Exporting currency pair %s' % currency_pair[1])
+            rates = data_source.currency_rates(currency_pair[0], start_date, end_date)
+            FileDataSource.__insert(connection, 'currency', (currency_pair[0],), rates)
+
+        currencies = data_source.currencies()
+        FileDataSource.__insert(connection, 'currencies', (), currencies)
+        for currency in currencies:
+            FileDataSource.__log('Exporting interest rates of %s' % currency[1])
+            rates = data_source.interest_rates(currency[0], start_date, end_date)
+            FileDataSource.__insert(connection, 'interest_rate', (currency[0],), rates)
+
+        market_ids = sorted(k for k in markets.keys() if not isinstance(k, tuple))
+        holidays = data_source.holidays(market_ids, start_date, end_date) if market_ids else {}
+        for market_id in sorted(holidays.keys()):
+            FileDataSource.__insert(connection, 'holidays', (market_id,), [(d,) for d in holidays[market_id]])
+
+        connection.commit()
+        connection.close()
+        FileDataSource.__log('Exporting complete\n')
+
+    @staticmethod
+    def __insert(connection, table, key, records):
+        """
+        Insert records into the snapshot table passed in
+
+        :param connection:  SQLite connection of the snapshot
+        :param table:       name of the table
+        :param key:         tuple of values preceding each record's values (e.g. market ID)
+        :param records:     list of tuples
+        """
+        rows = [key + tuple(r) for r in records]
+        if len(rows):
+            connection.executemany('INSERT INTO %s VALUES (%s)' % (table, ', '.join('?' * len(rows[0]))), rows)
+
+    @staticmethod
+    def __log(message):
+        """
+        Print message to console
+
+        :param message: message to print
+        """
+        sys.stdout.write('%s\r' % (' ' * 80))
+        sys.stdout.write('%s\r' % message)
+        sys.stdout.flush()
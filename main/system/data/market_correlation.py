@@ -1,14 +1,99 @@
 #!/usr/bin/python
 
-import csv
+import os
+import numpy as np
 import datetime as dt
+from as_of_index import AsOfIndex
+
+
+class CorrelationCube(object):
+    """
+    Dense date x market x market correlation cube, memory-mapped from binary files
+    written by 'data_storage/correlations.py'. Each cube date holds the latest volatility
+    and correlations of every market effective on that date.
+    """
+
+    def __init__(self, path):
+        self.__index = AsOfIndex(np.load('%s/dates.npy' % path).tolist())
+        self.__row_dates = np.load('%s/row_dates.npy' % path, mmap_mode='r')
+        self.__volatilities = np.load('%s/volatilities.npy' % path, mmap_mode='r')
+        self.__correlations = np.load('%s/correlations.npy' % path, mmap_mode='r')
+        self.__market_indexes = {m: i for i, m in enumerate(np.load('%s/market_ids.npy' % path).tolist())}
+
+    def market_index(self, market_id):
+        """
+        Return index of the market in the cube
+
+        :param market_id:   ID of the market
+        :return:            int index, or None if the market is not in the cube
+        """
+        return self.__market_indexes.get(int(market_id))
+
+    def record(self, market_id, date, start_date):
+        """
+        Return market record effective on the date passed in -- volatility and correlations with every market in the cube
+
+        :param market_id:   ID of the market
+        :param date:        date of the correlations
+        :param start_date:  date of the earliest market record to use
+        :return:            tuple(date of the record, volatility, numpy array of correlations indexed by market indexes),
+                            or None if there is no record yet
+        """
+        index = self.__index.index(date.toordinal())
+        market_index = self.market_index(market_id)
+        row_date = self.__row_dates[index, market_index] if index is not None and market_index is not None else 0
+        return (
+            dt.date.fromordinal(int(row_date)),
+            float(self.__volatilities[index, market_index]),
+            self.__correlations[index, market_index]
+        ) if row_date and row_date >= start_date.toordinal() else None
 
 
 class MarketCorrelationProxy:
 
+    __cubes = {}
+
     def __init__(self):
         pass
 
+    @staticmethod
+    def cube_path(lookback, volatility_type, use_ew_correlation, directory='.'):
+        """
+        Return path of the correlation cube of the lookback and correlation variant passed in
+
+        :param lookback:            lookback constant used in computing the data
+        :param volatility_type:     type of the volatility (either 'movement' or 'dev'(deviation))
+        :param use_ew_correlation:  boolean value to indicate if EW correlations are in the cube
+        :param directory:           root directory of the 'db' directory
+        :return:                    string
+        """
+        return os.path.join(
+            directory,
+            'db',
+            'market_correlation',
+            str(lookback),
+            '%s%s' % (volatility_type, '_ew' if use_ew_correlation else '')
+        )
+
+    @staticmethod
+    def from_cube(lookback, volatility_type, use_ew_correlation):
+        """
+        Open and return correlation cube of the variant passed in, shared by all markets in the process
+
+        :param lookback:            lookback constant used in computing the data
+        :param volatility_type:     type of the volatility (either 'movement' or 'dev'(deviation))
+        :param use_ew_correlation:  boolean value to indicate if EW correlations should be used
+        :return:                    CorrelationCube
+        """
+        path = MarketCorrelationProxy.cube_path(lookback, volatility_type, use_ew_correlation)
+        if path not in MarketCorrelationProxy.__cubes:
+            if not os.path.isfile(os.path.join(path, 'correlations.npy')):
+                raise IOError("Correlation cube of lookback %s, '%s' volatility and %s correlations is missing in '%s'"
+                              " (written by 'data_storage/correlations.py')" % (
+                                  lookback, volatility_type, 'EW' if use_ew_correlation else 'non-EW', path))
+            MarketCorrelationProxy.__cubes[path] = CorrelationCube(path)
+        return MarketCorrelationProxy.__cubes[path]
+
     @staticmethod
     def from_db(connection, market_id, market_code, start_date, end_date, volatility_type, volatility_lookback, use_ew_correlation):
         """
@@ -24,58 +109,25 @@ class MarketCorrelationProxy:
         :param use_ew_correlation:  boolean value to indicate if EW series should be used or not
         :return:                    tuple of
                                         list of correlation data and
-                                        dict of indexes with dates as keys
+                                        as-of index of the correlation dates
         """
         cursor = connection.cursor()
         correlation_query = """
-            SELECT date, %s_volatility, %s_correlations%s
+            SELECT date, {volatility_type}_volatility, {volatility_type}_correlations{ew}
             FROM market_correlation
-            WHERE market_id = '%s'
-            AND market_code = '%s'
-            AND lookback = '%s'
-            AND DATE(date) >= '%s'
-            AND DATE(date) <= '%s'
+            WHERE market_id = %s
+            AND market_code = %s
+            AND lookback = %s
+            AND DATE(date) >= %s
+            AND DATE(date) <= %s
             ORDER BY date;
-        """
-        cursor.execute(correlation_query % (
-            volatility_type,
-            volatility_type,
-            '_ew' if use_ew_correlation else '',
-            market_id,
-            market_code,
-            str(volatility_lookback),
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        ))
+        """.format(volatility_type=volatility_type, ew='_ew' if use_ew_correlation else '')
+        cursor.execute(correlation_query, (market_id, market_code, volatility_lookback, start_date, end_date))
         correlation_data = cursor.fetchall()
 
         workdays = range(1, 6)
         correlations = [p for p in correlation_data if p[0].isoweekday() in workdays]
-        correlation_indexes = {i[1][0]: i[0] for i in enumerate(correlations)}
-
-        return correlations, correlation_indexes
-
-    @staticmethod
-    def from_files(market_code, lookback, start_date, end_date):
-        """
-        Load and return correlation data from files
-        
-        :param market_code:     Code of the market to load
-        :param lookback:        lookback constant used in computing the data
-        :param start_date:      start date if the data
-        :param end_date:        end date of the data
-        :return:                tuple of
-                                    list of correlation data and
-                                    dict of indexes with dates as keys
-        """
-        reader = csv.reader(open('./db/market_correlation/%s/%s.csv' % (lookback, market_code)), delimiter=',', quotechar="'")
-        rows = [(dt.date(*map(int, r[0].split('-'))), float(r[1]), r[2]) for r in reader]
-
-        workdays = range(1, 6)
-        correlations = sorted([p for p in rows if start_date <= p[0] <= end_date and p[0].isoweekday() in workdays])
-        correlation_indexes = {i[1][0]: i[0] for i in enumerate(correlations)}
-
-        return correlations, correlation_indexes
+        return correlations, AsOfIndex(c[0] for c in correlations)
 
     @staticmethod
     def dump(market_code, lookback, correlations):
@@ -0,0 +1,333 @@
+#!/usr/bin/python
+
+from enum import Table
+from operator import itemgetter
+from data.data_source import DataSource
+
+
+class MySQLDataSource(DataSource):
+    """
+    Simulation data queried from MySQL DB
+    """
+
+    def __init__(self, connection):
+        """
+        :param connection:  MySQLdb connection instance
+        """
+        self.__connection = connection
+        self.__version = None
+
+    def connection(self):
+        return self.__connection
+
+    def version(self):
+        """
+        Return version of the price data, made of row count, latest price date and latest update
+        of each table the series, currency and interest rates are loaded from.
+        It's queried once per instance, so data changed while loading are only seen by a new instance.
+
+        :return:    string
+        """
+        if self.__version is None:
+            self.__version = repr(self.__fetch("""
+                SELECT 'contract', COUNT(*), MAX(price_date), MAX(last_updated_date) FROM contract
+                UNION ALL
+                SELECT 'continuous_adjusted', COUNT(*), MAX(price_date), MAX(last_updated_date) FROM continuous_adjusted
+                UNION ALL
+                SELECT 'currency', COUNT(*), MAX(price_date), MAX(last_updated_date) FROM currency
+                UNION ALL
+                SELECT 'interest_rate', COUNT(*), MAX(price_date), MAX(last_updated_date) FROM interest_rate
+                UNION ALL
+                SELECT 'standard_roll_schedule', COUNT(*), MAX(id), NULL FROM standard_roll_schedule;
+            """))
+        return self.__version
+
+    def simulation_names(self):
+        return [r[0] for r in self.__fetch("SELECT name FROM `simulation`;")]
+
+    def simulation(self, name):
+        return self.__fetch_one("SELECT * FROM `simulation` WHERE name = %s", name)
+
+    def roll_strategy(self, roll_strategy_id):
+        return self.__fetch_one("SELECT * FROM `roll_strategy` WHERE id = %s", roll_strategy_id)
+
+    def investment_universe(self, name):
+        return self.__fetch_one("""
+            SELECT contract_start_date, data_start_date, market_ids
+            FROM investment_universe
+            WHERE name = %s;
+        """, name)
+
+    def market(self, market_id):
+        return self.__fetch_one("""
+            SELECT
+              name,
+              code,
+              data_codes,
+              currency,
+              tick_value,
+              point_value,
+              overnight_initial_margin
+            FROM market
+            WHERE id = %s;
+        """, market_id)
+
+    def delivery_months(self):
+        return self.__fetch("SELECT code, short_name FROM `delivery_month`;")
+
+    def currency_pairs(self):
+        return self.__fetch("""
+            SELECT c.id, c.code, c.name, c.first_data_date
+            FROM currency_pairs as c INNER JOIN `group` as g ON c.group_id = g.id
+            WHERE g.name = 'Primary';
+        """)
+
+    def currencies(self):
+        return self.__fetch("""
+            SELECT c.id, c.code
+            FROM `currencies` as c INNER JOIN `group` as g ON c.group_id = g.id
+            WHERE g.name = 'Majors'
+        """)
+
+    def continuous_prices(self, market_id, market_code, roll_strategy_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT {columns}
+            FROM continuous_adjusted
+            WHERE market_id = %s
+            AND code = %s
+            AND roll_strategy_id = %s
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY price_date;
+        """.format(columns=self.__market_columns()), market_id, market_code, roll_strategy_id, start_date, end_date)
+
+    def contract_prices(self, market_id, market_code, start_date, end_date):
+        contracts = self.__fetch("""
+            SELECT {columns}, last_trading_day
+            FROM contract
+            WHERE market_id = %s
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY price_date;
+        """.format(columns=self.__market_columns()), market_id, start_date, end_date)
+        return [c for c in contracts if c[Table.Market.CODE][:-5] == market_code]
+
+    def roll_schedule(self, market_id):
+        return self.__fetch("""
+            SELECT roll_out_month, roll_in_month, month, day
+            FROM standard_roll_schedule
+            WHERE market_id = %s;
+        """, market_id)
+
+    def currency_rates(self, currency_pair_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT {columns}
+            FROM currency
+            WHERE currency_pair_id = %s
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY price_date ASC;
+        """.format(columns=self.__currency_columns()), currency_pair_id, start_date, end_date)
+
+    def interest_rates(self, currency_id, start_date, end_date):
+        return self.__fetch("""
+            SELECT {columns}
+            FROM interest_rate
+            WHERE currency_id = %s
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY price_date ASC;
+        """.format(columns=self.__interest_rate_columns()), currency_id, start_date, end_date)
+
+    def holidays(self, market_ids, start_date, end_date):
+        holidays = {}
+        for market_id, date in self.__fetch("""
+            SELECT DISTINCT m.id, h.date
+            FROM market as m
+            INNER JOIN exchange as e ON e.id = m.exchange_id
+            INNER JOIN holidays as h ON h.exchanges IS NULL
+              OR FIND_IN_SET(e.code, h.exchanges)
+              OR FIND_IN_SET(e.ex_code, h.exchanges)
+            WHERE m.id IN ({ids})
+            AND h.date >= %s
+            AND h.date <= %s
+            ORDER BY m.id, h.date;
+        """.format(ids=self.__placeholders(market_ids)), *(map(int, market_ids) + [start_date, end_date])):
+            holidays.setdefault(market_id, []).append(date)
+        return holidays
+
+    def markets(self, market_ids):
+        return {r[0]: r[1:] for r in self.__fetch("""
+            SELECT
+              id,
+              name,
+              code,
+              data_codes,
+              currency,
+              tick_value,
+              point_value,
+              overnight_initial_margin
+            FROM market
+            WHERE id IN ({ids});
+        """.format(ids=self.__placeholders(market_ids)), *map(int, market_ids))}
+
+    def continuous_prices_by_market(self, markets, roll_strategy_id, start_date, end_date):
+        codes = {int(m[0]): m[1] for m in markets}
+        return self.__partition(codes, self.__fetch("""
+            SELECT market_id, {columns}
+            FROM continuous_adjusted
+            WHERE market_id IN ({ids})
+            AND roll_strategy_id = %s
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY market_id, price_date;
+        """.format(
+            columns=self.__market_columns(),
+            ids=self.__placeholders(codes)
+        ), *(codes.keys() + [roll_strategy_id, start_date, end_date])),
+            lambda market_id, p: p[Table.Market.CODE] == codes[market_id])
+
+    def contract_prices_by_market(self, markets, start_date, end_date):
+        codes = {int(m[0]): m[1] for m in markets}
+        return self.__partition(codes, self.__fetch("""
+            SELECT market_id, {columns}, last_trading_day
+            FROM contract
+            WHERE market_id IN ({ids})
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY market_id, price_date;
+        """.format(
+            columns=self.__market_columns(),
+            ids=self.__placeholders(codes)
+        ), *(codes.keys() + [start_date, end_date])),
+            lambda market_id, c: c[Table.Market.CODE][:-5] == codes[market_id])
+
+    def roll_schedules(self, market_ids):
+        return self.__partition(market_ids, self.__fetch("""
+            SELECT market_id, roll_out_month, roll_in_month, month, day
+            FROM standard_roll_schedule
+            WHERE market_id IN ({ids});
+        """.format(ids=self.__placeholders(market_ids)), *map(int, market_ids)))
+
+    def currency_rates_by_pair(self, currency_pair_ids, start_date, end_date):
+        return self.__partition(currency_pair_ids, self.__fetch("""
+            SELECT currency_pair_id, {columns}
+            FROM currency
+            WHERE currency_pair_id IN ({ids})
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY currency_pair_id, price_date ASC;
+        """.format(
+            columns=self.__currency_columns(),
+            ids=self.__placeholders(currency_pair_ids)
+        ), *(map(int, currency_pair_ids) + [start_date, end_date])))
+
+    def interest_rates_by_currency(self, currency_ids, start_date, end_date):
+        return self.__partition(currency_ids, self.__fetch("""
+            SELECT currency_id, {columns}
+            FROM interest_rate
+            WHERE currency_id IN ({ids})
+            AND DATE(price_date) >= %s
+            AND DATE(price_date) <= %s
+            ORDER BY currency_id, price_date ASC;
+        """.format(
+            columns=self.__interest_rate_columns(),
+            ids=self.__placeholders(currency_ids)
+        ), *(map(int, currency_ids) + [start_date, end_date])))
+
+    def __fetch(self, query, *params):
+        """
+        Execute query with the parameters passed in and return all its records
+
+        :param query:   SQL query with '%s' placeholders
+        :param params:  values of the placeholders
+        :return:        tuple of tuples
+        """
+        cursor = self.__connection.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def __fetch_one(self, query, *params):
+        """
+        Execute query with the parameters passed in and return its first record
+
+        :param query:   SQL query with '%s' placeholders
+        :param params:  values of the placeholders
+        :return:        tuple or None
+        """
+        cursor = self.__connection.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+    def __placeholders(self, values):
+        """
+        Return list of '%s' placeholders for each value passed in
+
+        :param values:  list of values
+        :return:        string
+        """
+        return ', '.join(['%s'] * len(values))
+
+    def __partition(self, keys, rows, accept=None):
+        """
+        Split rows by their first column into lists of records without the column
+
+        :param keys:    list of keys (first column values) to create (possibly empty) partitions of
+        :param rows:    list of tuples, keyed by their first column
+        :param accept:  optional function(key, record) filtering the records
+        :return:        dict of key and list of tuples
+        """
+        partitions = {int(k): [] for k in keys}
+        for row in rows:
+            record = row[1:]
+            if accept is None or accept(row[0], record):
+                partitions[row[0]].append(record)
+        return partitions
+
+    def __market_columns(self):
+        """
+        Return price columns of market series
+
+        :return:    string
+        """
+        return self.__column_names({
+            'code': Table.Market.CODE,
+            'price_date': Table.Market.PRICE_DATE,
+            'open_price': Table.Market.OPEN_PRICE,
+            'high_price': Table.Market.HIGH_PRICE,
+            'low_price': Table.Market.LOW_PRICE,
+            'settle_price': Table.Market.SETTLE_PRICE,
+            'volume': Table.Market.VOLUME
+        })
+
+    def __currency_columns(self):
+        """
+        Return columns of currency rates
+
+        :return:    string
+        """
+        return self.__column_names({
+            'price_date': Table.CurrencyPair.PRICE_DATE,
+            'last_price': Table.CurrencyPair.LAST_PRICE
+        })
+
+    def __interest_rate_columns(self):
+        """
+        Return columns of interest rates
+
+        :return:    string
+        """
+        return self.__column_names({
+            'price_date': Table.InterestRate.PRICE_DATE,
+            'immediate_rate': Table.InterestRate.IMMEDIATE_RATE,
+            'three_months_rate': Table.InterestRate.THREE_MONTHS_RATE
+        })
+
+    def __column_names(self, columns):
+        """
+        Construct and return column names sorted by their index in ENUM
+
+        :param columns: dict of column names and their indexes
+        :return:        string
+        """
+        return ', '.join([i[0] for i in sorted(columns.items(), key=itemgetter(1))])
@@ -104,6 +104,12 @@ class SweepFxRule:
     NO_POSITIONS = 'no_positions'
 
 
+class NumericMode:
+    DECIMAL = 'decimal'
+    FLOAT = 'float'
+    FIXED_POINT = 'fixed_point'
+
+
 class Table:
     class Market:
         CODE = 0
@@ -1,16 +1,90 @@
 #!/usr/bin/python
 
+import time
+from bisect import insort
+from itertools import count
+from collections import defaultdict
+
 
 class EventDispatcher(object):
+    """
+    Dispatch events to listeners registered by event type. Listeners of each type are kept in tuple
+    ordered by their priority (higher first) and order of registration, so dispatch only iterates them.
+    Optionally, time spent in each listener and number of its calls can be measured.
+    """
 
     def __init__(self):
-        self._listeners = []
+        self._listeners = {}
+        self.__registrations = defaultdict(list)
+        self.__sequence = count()
+        self.__calls = None
+        self.__times = None
+
+    def on(self, event_type, listener, priority=0):
+        """
+        Register listener of the event type
 
-    def on(self, event_type, listener):
-        self._listeners.append((event_type, listener))
+        :param event_type:  type of the event to listen to
+        :param listener:    function to call with the event's data
+        :param priority:    listeners with higher priority are called first,
+                            listeners with the same priority in order of registration
+        """
+        registrations = self.__registrations[event_type]
+        insort(registrations, (-priority, next(self.__sequence), listener))
+        self._listeners[event_type] = tuple(r[2] for r in registrations)
 
     def off(self, event_type):
-        self._listeners = [l for l in self._listeners if l[0] != event_type]
+        """
+        Remove all listeners of the event type
+
+        :param event_type:  type of the event
+        """
+        self.__registrations.pop(event_type, None)
+        self._listeners.pop(event_type, None)
 
     def dispatch(self, event_type, *data):
-        map(lambda l: l[1](*data), [l for l in self._listeners if l[0] == event_type])
+        """
+        Call all listeners of the event type with the data passed in
+
+        :param event_type:  type of the event
+        :param data:        data of the event
+        """
+        calls, times = self.__calls, self.__times
+        if times is None:
+            for listener in self._listeners.get(event_type, ()):
+                listener(*data)
+        else:
+            for listener in self._listeners.get(event_type, ()):
+                start = time.time()
+                listener(*data)
+                times[(event_type, listener)] += time.time() - start
+                calls[(event_type, listener)] += 1
+
+    def time_listeners(self, enabled=True):
+        """
+        Start (and reset) or stop measuring time and calls of the listeners
+
+        :param enabled: flag indicating if the listeners should be measured
+        """
+        self.__calls = defaultdict(int) if enabled else None
+        self.__times = defaultdict(float) if enabled else None
+
+    def listener_timings(self):
+        """
+        Return measured calls and time of the listeners, sorted by their time
+
+        :return:    list of tuples(event type, listener name, number of calls, time in seconds)
+        """
+        return sorted([(k[0], self.__name(k[1]), self.__calls[k], t) for k, t in (self.__times or {}).items()],
+                      key=lambda t: -t[3])
+
+    def __name(self, listener):
+        """
+        Return readable name of the listener passed in
+
+        :param listener:    function or bound method
+        :return:            string
+        """
+        owner = getattr(listener, 'im_self', None)
+        name = getattr(listener, '__name__', repr(listener))
+        return '%s.%s' % (owner.__class__.__name__, name) if owner is not None else name
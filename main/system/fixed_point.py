@@ -0,0 +1,139 @@
+#!/usr/bin/python
+
+from decimal import Decimal
+
+
+class FixedPoint(object):
+    """
+    Fixed-point number -- integer count of units of the smallest represented fraction (1 / SCALE).
+    Additions and subtractions are exact integer operations, multiplications and divisions
+    round the result half away from zero to the nearest unit.
+
+    Mixes with ints, floats and Decimals (which are converted into FixedPoint first),
+    so it can replace Decimal amounts of the account without changing the arithmetic around them.
+    Equality with other numbers is exact, as is Decimal's, so equal numbers hash equal.
+    """
+
+    __slots__ = ('_units',)
+
+    SCALE = 10 ** 10
+
+    def __init__(self, value=0):
+        """
+        :param value:   FixedPoint, int, float, Decimal or numeric string
+        """
+        if isinstance(value, FixedPoint):
+            self._units = value._units
+        elif isinstance(value, (int, long)):
+            self._units = value * FixedPoint.SCALE
+        elif isinstance(value, float):
+            self._units = int(round(value * FixedPoint.SCALE))
+        else:
+            self._units = int((Decimal(value) * FixedPoint.SCALE).to_integral_value())
+
+    @staticmethod
+    def from_units(units):
+        """
+        Create FixedPoint number of the units passed in
+
+        :param units:   int number of units
+        :return:        FixedPoint
+        """
+        number = FixedPoint()
+        number._units = units
+        return number
+
+    @staticmethod
+    def __divide(numerator, denominator):
+        """
+        Divide integers, rounding half away from zero
+
+        :param numerator:   int numerator
+        :param denominator: int denominator
+        :return:            int
+        """
+        quotient, remainder = divmod(abs(numerator), abs(denominator))
+        quotient += 1 if remainder * 2 >= abs(denominator) else 0
+        return quotient if (numerator < 0) == (denominator < 0) else -quotient
+
+    def decimal(self):
+        """
+        Return exact Decimal value of the number
+
+        :return:    Decimal
+        """
+        return Decimal(self._units) / FixedPoint.SCALE
+
+    def __add__(self, other):
+        return FixedPoint.from_units(self._units + FixedPoint(other)._units)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return FixedPoint.from_units(self._units - FixedPoint(other)._units)
+
+    def __rsub__(self, other):
+        return FixedPoint.from_units(FixedPoint(other)._units - self._units)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, long)):
+            return FixedPoint.from_units(self._units * other)
+        return FixedPoint.from_units(FixedPoint.__divide(self._units * FixedPoint(other)._units, FixedPoint.SCALE))
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        if isinstance(other, (int, long)):
+            return FixedPoint.from_units(FixedPoint.__divide(self._units, other))
+        return FixedPoint.from_units(FixedPoint.__divide(self._units * FixedPoint.SCALE, FixedPoint(other)._units))
+
+    __truediv__ = __div__
+
+    def __rdiv__(self, other):
+        return FixedPoint(other).__div__(self)
+
+    __rtruediv__ = __rdiv__
+
+    def __neg__(self):
+        return FixedPoint.from_units(-self._units)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return FixedPoint.from_units(abs(self._units))
+
+    def __cmp__(self, other):
+        return cmp(self._units, FixedPoint(other)._units)
+
+    def __eq__(self, other):
+        if isinstance(other, FixedPoint):
+            return self._units == other._units
+        elif isinstance(other, float):
+            return self.decimal() == Decimal.from_float(other)
+        return isinstance(other, (int, long, Decimal)) and self.decimal() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.decimal())
+
+    def __nonzero__(self):
+        return self._units != 0
+
+    def __float__(self):
+        return float(self._units) / FixedPoint.SCALE
+
+    def __int__(self):
+        units = abs(self._units) // FixedPoint.SCALE
+        return int(units if self._units >= 0 else -units)
+
+    def __format__(self, format_spec):
+        return format(float(self), format_spec)
+
+    def __str__(self):
+        return str(self.decimal())
+
+    def __repr__(self):
+        return "FixedPoint('%s')" % self
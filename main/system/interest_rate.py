@@ -1,17 +1,29 @@
 #!/usr/bin/python
 
+import numpy as np
 import datetime as dt
-from enum import Table
-from operator import itemgetter
+from series.columns import RateColumns
+from series.series_cache import SeriesCache
 
 
 class InterestRate(object):
 
-    def __init__(self, start_data_date, currency_id, currency_code):
+    def __init__(self, start_data_date, currency_id, currency_code, cache=None):
         self.__start_data_date = start_data_date
         self.__currency_id = currency_id
         self.__currency_code = currency_code
-        self.__data = []
+        self.__cache = cache
+        self.__rates = RateColumns(has_second_rate=True)
+        self.__immediate_rates = self.__three_months_rates = np.zeros(0, dtype=np.float64)
+        self.__immediate_rate_dates = self.__three_months_rate_dates = np.zeros(0, dtype=np.int32)
+
+    def id(self):
+        """
+        Return ID of the currency
+
+        :return:    int - ID of the currency
+        """
+        return self.__currency_id
 
     def code(self):
         """
@@ -21,43 +33,39 @@ class InterestRate(object):
         """
         return self.__currency_code
 
-    def load_data(self, connection, end_date):
+    def load_data(self, data_source, end_date):
         """
-        Load data from DB
+        Load data from data source, or from the cache if they are there
 
-        :param connection:  MySQLdb connection
+        :param data_source: DataSource instance
         :param end_date:    Last date to fetch data to
         """
-        cursor = connection.cursor()
-        sql = """
-            SELECT %s
-            FROM interest_rate
-            WHERE currency_id = '%s'
-            AND DATE(price_date) >= '%s'
-            AND DATE(price_date) <= '%s'
-            ORDER BY price_date ASC;
-        """
+        name = 'interest_rate_%s' % self.__currency_id
+        source_version = data_source.version() if self.__cache else None
+        data = None if source_version else data_source.interest_rates(self.__currency_id, self.__start_data_date, end_date)
+        version = SeriesCache.version(self.__start_data_date, end_date, source_version or data) if self.__cache else None
+
+        self.__rates = RateColumns(has_second_rate=True)
+        if not self.__cache or not self.__cache.open_rates(name, version, self.__rates):
+            self.__rates.extend(data if data is not None
+                                else data_source.interest_rates(self.__currency_id, self.__start_data_date, end_date))
+
+            if self.__cache:
+                self.__cache.save_rates(name, version, self.__rates)
+                self.__cache.open_rates(name, version, self.__rates)
 
-        cursor.execute(sql % (
-            self.__column_names(),
-            self.__currency_id,
-            self.__start_data_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        ))
-        self.__data = cursor.fetchall()
+        self.__immediate_rates, self.__immediate_rate_dates = self.__present(self.__rates.rates())
+        self.__three_months_rates, self.__three_months_rate_dates = self.__present(self.__rates.second_rates())
 
-    def __column_names(self):
+    def __present(self, rates):
         """
-        Construct and return column names sorted by their index in ENUM
+        Collect non-empty rates of the column passed in with their dates
 
-        :return:    string
+        :param rates:   numpy array of the rate column
+        :return:        tuple(numpy array of rates, numpy array of the rate dates as day ordinals)
         """
-        columns = {
-            'price_date': Table.InterestRate.PRICE_DATE,
-            'immediate_rate': Table.InterestRate.IMMEDIATE_RATE,
-            'three_months_rate': Table.InterestRate.THREE_MONTHS_RATE
-        }
-        return ', '.join([i[0] for i in sorted(columns.items(), key=itemgetter(1))])
+        present = rates == rates
+        return rates[present], self.__rates.date_ordinals()[present]
 
     def data(self, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31)):
         """
@@ -67,7 +75,7 @@ class InterestRate(object):
         :param end_date:    Date, end of the data range
         :return:            List of data
         """
-        return [d for d in self.__data if start_date <= d[Table.InterestRate.PRICE_DATE] <= end_date]
+        return self.__rates.range(start_date, end_date)
 
     def immediate_rate(self, date):
         """
@@ -76,9 +84,8 @@ class InterestRate(object):
         :param date:    Date of the rate
         :return:        Immediate Rate effective on the date
         """
-        rate = [d[Table.InterestRate.IMMEDIATE_RATE] for d in self.__data
-                if d[Table.InterestRate.PRICE_DATE] <= date and d[Table.InterestRate.IMMEDIATE_RATE] is not None]
-        return rate[-1] if len(rate) else self.three_month_rate(date)
+        index = int(np.searchsorted(self.__immediate_rate_dates, date.toordinal(), 'right')) - 1
+        return float(self.__immediate_rates[index]) if index > -1 else self.three_month_rate(date)
 
     def three_month_rate(self, date):
         """
@@ -87,9 +94,8 @@ class InterestRate(object):
         :param date:    Date of the rate
         :return:        Three-Month Rate effective on the date
         """
-        rate = [d[Table.InterestRate.THREE_MONTHS_RATE] for d in self.__data
-                if d[Table.InterestRate.PRICE_DATE] <= date and d[Table.InterestRate.THREE_MONTHS_RATE] is not None]
-        return rate[-1] if len(rate) else 0.0
+        index = int(np.searchsorted(self.__three_months_rate_dates, date.toordinal(), 'right')) - 1
+        return float(self.__three_months_rates[index]) if index > -1 else 0.0
 
     def __str__(self):
         return '%s, %s' % (self.__currency_code, self.__currency_id)
@@ -3,10 +3,10 @@
 
 class InvestmentUniverse(object):
 
-    def __init__(self, name, connection):
+    def __init__(self, name, data_source):
 
         self.__name = name
-        self.__connection = connection
+        self.__data_source = data_source
         self.__start_contract_date = None
         self.__start_data_date = None
         self.__market_ids = []
@@ -39,13 +39,7 @@ class InvestmentUniverse(object):
         """
         Load data
         """
-        cursor = self.__connection.cursor()
-        cursor.execute("""
-            SELECT contract_start_date, data_start_date, market_ids
-            FROM investment_universe
-            WHERE name = '%s';
-        """ % self.__name)
-        data = cursor.fetchone()
+        data = self.__data_source.investment_universe(self.__name)
         self.__start_contract_date = data[0]
         self.__start_data_date = data[1]
         self.__market_ids = data[2].split(',')
@@ -2,9 +2,38 @@
 
 import sys
 from operations.initialize import Initialize
+from options import option
+from options import date_option
+from profiler import Profiler
+from progress import Progress
+
+
+def profiler_option(name, args):
+    """
+    Create Profiler if '--profile' or '--profile=cprofile|collapsed' option is in arguments passed in
+
+    :param name:    name of the simulation
+    :param args:    list of command-line arguments
+    :return:        Profiler or None
+    """
+    values = [a.split('=', 1)[1] if '=' in a else None for a in args if a == '--profile' or a.startswith('--profile=')]
+    return Profiler(name, values[-1]) if values else None
+
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2 and len(sys.argv[1]):
-        Initialize(sys.argv[1])
+    names = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(names) == 1 and len(names[0]):
+        Progress.mode = option('progress', sys.argv[1:], Progress.CONSOLE)
+        Initialize(
+            names[0],
+            end_date=date_option('end', sys.argv[1:]),
+            checkpoint_date=date_option('checkpoint', sys.argv[1:]),
+            resume='--resume' in sys.argv[1:],
+            profiler=profiler_option(names[0], sys.argv[1:]),
+            data_source=Initialize.data_source(option('data', sys.argv[1:])),
+            cache_path=option('cache', sys.argv[1:])
+        )
     else:
-        print 'Expected one argument - name of the simulation'
+        print 'Expected one argument - name of the simulation ' \
+              '(options: --end=YYYY-MM-DD, --checkpoint=YYYY-MM-DD, --resume, --profile[=cprofile|collapsed], ' \
+              '--data=<snapshot file>, --cache=<series cache directory>, --progress=quiet|machine)'
@@ -14,13 +14,24 @@ class Market:
         self.__slippage_map = slippage_map
         self.__name = name
         self.__market_code = code
-        self.__instrument_code = ''.join([code, '2']) if 'C' in data_codes else code
+        self.__instrument_code = Market.instrument_code(code, data_codes)
         self.__currency = currency
         self.__tick_value = tick_value
         self.__point_value = point_value
         self.__margin = margin
         self.__series = series
 
+    @staticmethod
+    def instrument_code(code, data_codes):
+        """
+        Return code of the instrument the market's series is loaded with
+
+        :param code:        code of the market
+        :param data_codes:  string of data codes available for the market
+        :return:            string
+        """
+        return ''.join([code, '2']) if 'C' in data_codes else code
+
     def id(self):
         return self.__id
 
@@ -39,6 +50,9 @@ class Market:
     def correlation(self, date):
         return self.__series.correlation(date)
 
+    def correlation_index(self):
+        return self.__series.correlation_index()
+
     def data_range(self, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31)):
         return self.__series.data_range(start_date, end_date)
 
@@ -48,6 +62,9 @@ class Market:
     def study_range(self, study_name, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31)):
         return self.__series.study_range(study_name, start_date, end_date)
 
+    def date_ordinals(self):
+        return self.__series.date_ordinals()
+
     def update_data(self, date):
         self.__series.update_data(date)
 
@@ -57,8 +74,8 @@ class Market:
     def has_study_data(self):
         return self.__series.has_study_data()
 
-    def load_data(self, connection, end_date, delivery_months, roll_strategy_id):
-        self.__series.load(connection, end_date, delivery_months, self.__id, self.__instrument_code, roll_strategy_id)
+    def load_data(self, data_source, end_date, delivery_months, roll_strategy_id):
+        self.__series.load(data_source, end_date, delivery_months, self.__id, self.__instrument_code, roll_strategy_id)
 
         if self.__margin == 0:
             self.__margin = self.__series.margin(end_date, self.__point_value)
@@ -86,9 +103,20 @@ class Market:
     def scheduled_roll(self, date):
         return self.__series.scheduled_roll(date)
 
+    def next_scheduled_roll(self, date, days):
+        return self.__series.next_scheduled_roll(date, days)
+
     def margin(self):
         return self.__margin
 
+    def pin_margin(self, margin):
+        """
+        Set margin of the market, instead of the one loaded or computed at the end date of the data
+
+        :param margin:  margin per contract
+        """
+        self.__margin = margin
+
     def slippage(self, date, quantity):
         """
         Calculates and returns 'slippage' in points
@@ -0,0 +1,272 @@
+#!/usr/bin/python
+
+import os
+import sys
+import json
+import time
+import resource
+import traceback
+from multiprocessing import Pool
+from enum import Table
+from enum import NumericMode
+from enum import TransactionType
+from account import Account
+from initialize import Initialize
+from profiler import Profiler
+from synthetic.universe import SyntheticUniverse
+from synthetic.data_source import SyntheticDataSource
+from synthetic import simulations
+
+# Synthetic data created by the parent process, shared with forked workers as copy-on-write memory
+universe = None
+data_source = None
+
+
+def simulate(args):
+    """
+    Run simulation in a worker process and measure its phases
+
+    :param args:    tuple(tuple representing simulation record, flag indicating if the simulation should be profiled,
+                    flag indicating if daily equity of the simulation should be returned)
+    :return:        tuple(simulation name, dict of phase times in seconds, peak RSS in kB, error traceback or None,
+                    list of daily equity values as floats or None)
+    """
+    simulation, profile, equity = args
+    name = simulation[Table.Simulation.NAME]
+    phases = {}
+    error = None
+    daily_equity = None
+    stdout = sys.stdout
+    sys.stdout = open('%s.log' % name, 'w')
+    try:
+        start_time = time.time()
+        data = Initialize.data(simulation, data_source)
+        data[0].load(universe.end_date(), simulation[Table.Simulation.ROLL_STRATEGY_ID])
+        phases['load'] = time.time() - start_time
+
+        start_time = time.time()
+        initialize = Initialize(name, data, universe.end_date(), profiler=Profiler(name) if profile else None, data_source=data_source)
+        phases['simulate'] = time.time() - start_time
+
+        if equity:
+            account = initialize.account()
+            days = data[0].trading_calendar().days(data[0].start_date(), universe.end_date())
+            recorded_equity = [account.equity(d) for d in days]
+            replay(account, data[0].start_date(), data[2], days, recorded_equity)
+            numeric_mode = json.loads(simulation[Table.Simulation.PARAMS]).get('numeric_mode', NumericMode.DECIMAL)
+            aggregates(account, days, Benchmark.AGGREGATE_TOLERANCES[numeric_mode])
+            daily_equity = [float(e) for e in recorded_equity]
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return name, phases, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, error, daily_equity
+
+
+def replay(account, start_date, currency_pairs, days, recorded_equity):
+    """
+    Add all transactions of the account passed in to a fresh account, without querying it in between,
+    and check its daily equity is the same as equity recorded by the simulation
+
+    :param account:         Account of the simulation run
+    :param start_date:      date the simulation data start at
+    :param currency_pairs:  list of currency pairs of the simulation
+    :param days:            list of the simulation days
+    :param recorded_equity: list of the account's equity on the days
+    """
+    replayed = Account(account.initial_balance(), start_date, account.base_currency(), currency_pairs, account.number_type())
+    for transaction in account.transactions():
+        replayed.add_transaction(transaction)
+
+    for day, equity in zip(days, recorded_equity):
+        if replayed.equity(day) != equity:
+            raise ValueError('Replayed equity %s differs from recorded %s on %s' % (replayed.equity(day), equity, day))
+
+
+def aggregates(account, days, tolerance):
+    """
+    Check aggregates of the account's transactions over every month, every year and the whole simulation,
+    which are looked up as differences of running totals, are the same as sums of the transactions
+
+    :param account:     Account of the simulation run
+    :param days:        list of the simulation days
+    :param tolerance:   maximum difference relative to the account's initial balance
+    """
+    months = {}
+    years = {}
+    for day in days:
+        months.setdefault((day.year, day.month), []).append(day)
+        years.setdefault(day.year, []).append(day)
+    periods = [(p[0], p[-1]) for p in sorted(months.values()) + sorted(years.values())] + [(days[0], days[-1])]
+
+    maximum = tolerance * abs(float(account.initial_balance()))
+    for start_date, end_date in periods:
+        for transaction_types in Benchmark.AGGREGATED_TYPES:
+            ranged = account.aggregate_range(start_date, end_date, transaction_types)
+            summed = account.aggregate(account.transactions(start_date, end_date, transaction_types=transaction_types),
+                                       transaction_types)
+            for currency in set(ranged.keys()) | set(summed.keys()):
+                difference = abs(float(ranged.get(currency, 0) - summed.get(currency, 0)))
+                if difference > maximum:
+                    raise ValueError('Aggregate of %s in %s from %s to %s differs by %g from sum of the transactions' % (
+                        ', '.join(transaction_types), currency, start_date, end_date, difference))
+
+
+class Benchmark:
+
+    # Numeric modes compared in equivalence run, the first one is the reference
+    NUMERIC_MODES = [NumericMode.DECIMAL, NumericMode.FLOAT, NumericMode.FIXED_POINT]
+    # Maximum relative difference of daily equity from the reference for each mode to be equivalent;
+    # fixed-point rounds FX rates to 10 decimal places, which accumulates through daily FX translations
+    EQUIVALENCE_TOLERANCES = {NumericMode.FLOAT: 1e-8, NumericMode.FIXED_POINT: 1e-5}
+    # Transaction types aggregated over periods by Report and Persist
+    AGGREGATED_TYPES = [
+        [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION],
+        [TransactionType.COMMISSION],
+        [TransactionType.FX_BALANCE_TRANSLATION],
+        [TransactionType.MARGIN_INTEREST],
+        [TransactionType.BALANCE_INTEREST]
+    ]
+    # Maximum difference between aggregates looked up from running totals and sums of the transactions, relative
+    # to initial balance; fixed-point sums are exact, Decimal and float ones round to their precision in other order
+    AGGREGATE_TOLERANCES = {NumericMode.DECIMAL: 1e-18, NumericMode.FLOAT: 1e-12, NumericMode.FIXED_POINT: 0}
+
+    def __init__(self,
+                 markets=10,
+                 years=5,
+                 roll_strategy='standard_roll_1',
+                 trading_models=None,
+                 position_sizings=None,
+                 profile=False,
+                 directory='benchmark',
+                 equivalence=False):
+        """
+        Generate synthetic futures universe and run simulation of each trading model and position sizing on it,
+        each in freshly forked worker process, one after another.
+        In equivalence run every simulation runs in each numeric mode and their daily equity is compared;
+        each simulation's account transactions are also replayed and must give the same daily equity,
+        and its aggregates over periods must match sums of the transactions within its mode's tolerance.
+
+        :param markets:             number of markets in the universe
+        :param years:               number of years of the data
+        :param roll_strategy:       name of the roll strategy ('norgate', 'standard_roll_1' or 'optimal_roll_1')
+        :param trading_models:      list of trading model names, defaults to all models
+        :param position_sizings:    list of position sizing methods, defaults to all methods
+        :param profile:             flag indicating if the simulations should be profiled
+        :param directory:           working directory for data, logs and profiles
+        :param equivalence:         flag indicating if the simulations should run in every numeric mode
+                                    and fail unless their daily equity agrees within the modes' tolerances
+                                    and with equity of their replayed transactions
+        """
+        global universe, data_source
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        os.chdir(directory)
+
+        start_time = time.time()
+        universe = SyntheticUniverse(markets, years)
+        universe.write_correlations(25)
+        roll_strategy_id = [r for r in simulations.ROLL_STRATEGIES if r[Table.RollStrategy.NAME] == roll_strategy][0][0]
+        records = simulations.simulations(
+            roll_strategy_id,
+            trading_models,
+            position_sizings,
+            Benchmark.NUMERIC_MODES if equivalence else None
+        )
+        data_source = SyntheticDataSource(universe, records, simulations.ROLL_STRATEGIES)
+        generate_time = time.time() - start_time
+
+        pool = Pool(1, maxtasksperchild=1)
+        results = pool.map(simulate, [(r, profile, equivalence) for r in records], chunksize=1)
+        pool.close()
+        pool.join()
+
+        self.__report(results, markets, years, roll_strategy, generate_time)
+        if equivalence:
+            self.__compare(results, markets, years, roll_strategy)
+
+    def __report(self, results, markets, years, roll_strategy, generate_time):
+        """
+        Print and write down phase times, simulated days per second and peak memory of each simulation
+
+        :param results:         list of tuples(simulation name, dict of phase times, peak RSS in kB,
+                                error traceback or None, daily equity or None)
+        :param markets:         number of markets in the universe
+        :param years:           number of years of the data
+        :param roll_strategy:   name of the roll strategy
+        :param generate_time:   time of the data generation in seconds
+        """
+        days = universe.days()
+        lines = [
+            'Markets: %d, years: %d, days: %d, roll strategy: %s, data generation: %.1fs' % (
+                markets, years, days, roll_strategy, generate_time),
+            '%-72s %9s %9s %9s %9s %s' % ('Simulation', 'Load (s)', 'Sim. (s)', 'Days/s', 'RSS (MB)', 'Status')
+        ]
+        for name, phases, rss, error, _ in results:
+            simulate_time = phases.get('simulate')
+            lines.append('%-72s %9.2f %9.2f %9.1f %9.1f %s' % (
+                name,
+                phases.get('load', 0.0),
+                simulate_time or 0.0,
+                days / simulate_time if simulate_time else 0.0,
+                rss / 1024.0,
+                'ERROR' if error else 'OK'
+            ))
+            if error:
+                sys.stderr.write(error)
+
+        report = '\n'.join(lines)
+        print report
+
+        f = open('benchmark_%dx%d_%s.txt' % (markets, years, roll_strategy), 'w')
+        f.write(report + '\n')
+        f.close()
+
+    def __compare(self, results, markets, years, roll_strategy):
+        """
+        Compare daily equity of each simulation in every numeric mode with its equity in the reference mode,
+        print and write down the largest relative differences and fail if any exceeds its mode's tolerance
+
+        :param results:         list of tuples(simulation name, dict of phase times, peak RSS in kB,
+                                error traceback or None, daily equity or None)
+        :param markets:         number of markets in the universe
+        :param years:           number of years of the data
+        :param roll_strategy:   name of the roll strategy
+        """
+        reference_mode = Benchmark.NUMERIC_MODES[0]
+        equity = {name: daily_equity for name, _, _, _, daily_equity in results}
+        lines = [
+            'Max. relative difference of daily equity from %s mode' % reference_mode,
+            '%-72s %-12s %15s %15s %s' % ('Simulation', 'Mode', 'Difference', 'Tolerance', 'Status')
+        ]
+        failures = []
+        for name, _, _, _, _ in results:
+            if not name.endswith('_%s' % reference_mode):
+                continue
+
+            simulation_name = name[:-len(reference_mode) - 1]
+            reference = equity[name]
+            for mode in Benchmark.NUMERIC_MODES[1:]:
+                compared = equity['%s_%s' % (simulation_name, mode)]
+                tolerance = Benchmark.EQUIVALENCE_TOLERANCES[mode]
+                difference = max(abs(c - r) / abs(r) for r, c in zip(reference, compared)) \
+                    if reference and compared and len(reference) == len(compared) else float('inf')
+                equivalent = difference <= tolerance
+                lines.append('%-72s %-12s %15g %15g %s' % (
+                    simulation_name, mode, difference, tolerance, 'OK' if equivalent else 'FAIL'))
+                if not equivalent:
+                    failures.append('%s (%s)' % (simulation_name, mode))
+
+        report = '\n'.join(lines)
+        print report
+
+        f = open('equivalence_%dx%d_%s.txt' % (markets, years, roll_strategy), 'w')
+        f.write(report + '\n')
+        f.close()
+
+        if failures:
+            raise ValueError('Daily equity differs from %s mode beyond tolerance in: %s' % (
+                reference_mode, ', '.join(failures)))
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+import os
+import cPickle as pickle
+from market import Market
+from currency_pair import CurrencyPair
+from interest_rate import InterestRate
+
+
+class Checkpoint:
+    """
+    Simulation state saved at the end of a date, from which a later simulation can continue.
+
+    Loaded markets, currency pairs and interest rates are not saved -- they are referenced
+    by their IDs and codes and restored as the freshly loaded data, which may reach further.
+    """
+
+    directory = 'checkpoints'
+
+    def __init__(self, simulation_name):
+        self.__path = os.path.join(Checkpoint.directory, '%s.pkl' % simulation_name)
+
+    def path(self):
+        """
+        Return path of the checkpoint file
+
+        :return:    string
+        """
+        return self.__path
+
+    def exists(self):
+        """
+        Return flag indicating if the checkpoint file exists
+
+        :return:    boolean
+        """
+        return os.path.isfile(self.__path)
+
+    def save(self, date, settings, state):
+        """
+        Serialize state passed in into the checkpoint file
+
+        :param date:        date of the state (last processed date)
+        :param settings:    dict of settings the simulation runs with, to verify when continuing
+        :param state:       tuple of objects holding the simulation state
+        """
+        if not os.path.isdir(Checkpoint.directory):
+            os.makedirs(Checkpoint.directory)
+
+        f = open(self.__path, 'wb')
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self.__persistent_id
+        pickler.dump((date, settings, state))
+        f.close()
+
+    def load(self, futures, currency_pairs, interest_rates):
+        """
+        Deserialize and return state from the checkpoint file, linked with loaded data passed in
+
+        :param futures:         list of loaded Market objects
+        :param currency_pairs:  list of loaded CurrencyPair objects
+        :param interest_rates:  list of loaded InterestRate objects
+        :return:                tuple(date of the state, dict of settings the simulation ran with,
+                                tuple of objects holding the simulation state)
+        """
+        loaded_data = dict(
+            [(('market', f.id()), f) for f in futures] +
+            [(('currency_pair', c.code()), c) for c in currency_pairs] +
+            [(('interest_rate', r.code()), r) for r in interest_rates]
+        )
+
+        f = open(self.__path, 'rb')
+        unpickler = pickle.Unpickler(f)
+        unpickler.persistent_load = lambda key: loaded_data[key]
+        saved = unpickler.load()
+        f.close()
+
+        if len(saved) != 3:
+            raise ValueError("Checkpoint '%s' has no record of the settings it was saved with, "
+                             "run the simulation again to save new one" % self.__path)
+
+        return saved
+
+    def __persistent_id(self, obj):
+        """
+        Return key referencing loaded data object passed in, or None for any other object
+
+        :param obj: object to reference
+        :return:    tuple(type, ID or code) or None
+        """
+        if isinstance(obj, Market):
+            return 'market', obj.id()
+        elif isinstance(obj, CurrencyPair):
+            return 'currency_pair', obj.code()
+        elif isinstance(obj, InterestRate):
+            return 'interest_rate', obj.code()
+        return None
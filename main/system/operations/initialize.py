@@ -7,9 +7,13 @@ import MySQLdb as mysql
 from decimal import Decimal
 from enum import Table
 from enum import CapitalCorrection
+from enum import NumericMode
+from fixed_point import FixedPoint
 from account import Account
 from broker import Broker
 from series.data_series import DataSeries
+from data.mysql_data_source import MySQLDataSource
+from data.file_data_source import FileDataSource
 from investment_universe import InvestmentUniverse
 from risk import Risk
 from simulate import Simulate
@@ -24,35 +28,46 @@ from trading_models.carry import CARRY
 
 class Initialize:
 
-    def __init__(self, simulation_name):
+    def __init__(self, simulation_name, loaded_data=None, end_date=None, checkpoint_date=None, resume=False, profiler=None, data_source=None, cache_path=None):
+        """
+        Initialize and run simulation
+
+        :param simulation_name: name of the simulation to run
+        :param loaded_data:     optional tuple(DataSeries, futures, currency pairs, interest rates) already loaded
+                                for the simulation (e.g. shared by other simulations in a sweep)
+        :param end_date:        optional end date of the simulation
+        :param checkpoint_date: optional date to save simulation state at
+        :param resume:          flag indicating if the simulation should continue from its saved checkpoint
+        :param profiler:        optional Profiler instrumenting the simulation loop
+        :param data_source:     optional DataSource to load the simulation data from, defaults to MySQL DB
+        :param cache_path:      optional path to directory caching constructed continuous series
+        """
         start_time = time.time()
-        connection = mysql.connect(
-            os.environ['DB_HOST'],
-            os.environ['DB_USER'],
-            os.environ['DB_PASS'],
-            os.environ['DB_NAME']
-        )
-        simulation = self.__simulation(simulation_name, connection)
+        data_source = data_source or Initialize.data_source()
+        simulation = Initialize.simulation(simulation_name, data_source)
         params = json.loads(simulation[Table.Simulation.PARAMS])
-        roll_strategy = self.__roll_strategy(simulation[Table.Simulation.ROLL_STRATEGY_ID], connection)
+        roll_strategy = Initialize.roll_strategy(simulation[Table.Simulation.ROLL_STRATEGY_ID], data_source)
 
         base_currency = params['base_currency']
         commission_currency = params['commission_currency']
         commission = (params['commission'], commission_currency)
         interest_minimums = params['interest_minimums']
 
-        investment_universe = InvestmentUniverse(simulation[Table.Simulation.INVESTMENT_UNIVERSE], connection)
-        investment_universe.load_data()
+        data_series, futures, currency_pairs, interest_rates = loaded_data or Initialize.data(simulation, data_source, cache_path)
 
         position_sizing = params['position_sizing']
-        data_series = DataSeries(investment_universe, connection, json.loads(simulation[Table.Simulation.STUDIES]))
-        futures = data_series.futures(params['slippage_map'], roll_strategy, position_sizing, *self.__correlation_data_params(params))
-        currency_pairs = data_series.currency_pairs(base_currency, commission_currency)
-        interest_rates = data_series.interest_rates(base_currency, commission_currency)
-
-        start_data_date = investment_universe.start_data_date()
-        account = Account(Decimal(params['initial_balance']), start_data_date, base_currency, currency_pairs)
-        broker = Broker(account, commission, interest_rates, interest_minimums, params['sweep_fx_rule'], {f.id(): f for f in futures})
+        start_data_date = data_series.start_date()
+        number_type = self.__number_type(params)
+        account = Account(number_type(params['initial_balance']), start_data_date, base_currency, currency_pairs, number_type)
+        broker = Broker(
+            account,
+            commission,
+            interest_rates,
+            interest_minimums,
+            params['sweep_fx_rule'],
+            {f.id(): f for f in futures},
+            params.get('detailed_ledger', True)
+        )
         trading_params = self.__trading_params(params, simulation[Table.Simulation.TRADING_PARAMS])
         trading_model = self.__trading_model(simulation[Table.Simulation.TRADING_MODEL])(
             simulation[Table.Simulation.NAME],
@@ -60,7 +75,7 @@ class Initialize:
             trading_params
         )
 
-        Simulate(
+        self.__simulate = Simulate(
             simulation,
             roll_strategy,
             data_series,
@@ -69,34 +84,126 @@ class Initialize:
             broker,
             trading_model,
             params['position_inertia'],
-            params['use_position_inertia']
+            params['use_position_inertia'],
+            end_date,
+            checkpoint_date,
+            resume,
+            profiler,
+            data_source.connection(),
+            data_source.version()
         )
 
         print 'Time:', time.time() - start_time, (time.time() - start_time) / 60
 
-    def __simulation(self, name, connection):
+    def account(self):
+        """
+        Return account of the simulation run, the one restored from checkpoint if resumed
+
+        :return:    Account instance
+        """
+        return self.__simulate.account()
+
+    @staticmethod
+    def connect():
+        """
+        Open and return DB connection
+
+        :return:    MySQLdb connection instance
+        """
+        return mysql.connect(
+            os.environ['DB_HOST'],
+            os.environ['DB_USER'],
+            os.environ['DB_PASS'],
+            os.environ['DB_NAME']
+        )
+
+    @staticmethod
+    def data_source(path=None):
+        """
+        Create and return data source of the simulation data
+
+        :param path:    optional path to snapshot file exported from DB, defaults to MySQL DB
+        :return:        DataSource
+        """
+        return FileDataSource(path) if path else MySQLDataSource(Initialize.connect())
+
+    @staticmethod
+    def data(simulation, data_source, cache_path=None):
+        """
+        Create data series, futures, currency pairs and interest rates of the simulation passed in
+
+        :param simulation:  tuple representing simulation record
+        :param data_source: DataSource instance
+        :param cache_path:  optional path to directory caching constructed continuous series
+        :return:            tuple(DataSeries, list of futures, list of currency pairs, list of interest rates)
+        """
+        params = json.loads(simulation[Table.Simulation.PARAMS])
+        roll_strategy = Initialize.roll_strategy(simulation[Table.Simulation.ROLL_STRATEGY_ID], data_source)
+
+        investment_universe = InvestmentUniverse(simulation[Table.Simulation.INVESTMENT_UNIVERSE], data_source)
+        investment_universe.load_data()
+
+        data_series = DataSeries(
+            investment_universe,
+            data_source,
+            json.loads(simulation[Table.Simulation.STUDIES]),
+            cache_path=cache_path
+        )
+        futures = data_series.futures(
+            params['slippage_map'],
+            roll_strategy,
+            params['position_sizing'],
+            *Initialize.__correlation_data_params(params)
+        )
+        currency_pairs = data_series.currency_pairs(params['base_currency'], params['commission_currency'])
+        interest_rates = data_series.interest_rates(params['base_currency'], params['commission_currency'])
+
+        return data_series, futures, currency_pairs, interest_rates
+
+    @staticmethod
+    def data_key(simulation):
+        """
+        Return key identifying data the simulation passed in needs --
+        simulations with the same key can run on the same loaded data
+
+        :param simulation:  tuple representing simulation record
+        :return:            tuple
+        """
+        params = json.loads(simulation[Table.Simulation.PARAMS])
+        return (
+            simulation[Table.Simulation.INVESTMENT_UNIVERSE],
+            simulation[Table.Simulation.STUDIES],
+            simulation[Table.Simulation.ROLL_STRATEGY_ID],
+            json.dumps(params['slippage_map'], sort_keys=True),
+            params['position_sizing'],
+            params['base_currency'],
+            params['commission_currency']
+        ) + Initialize.__correlation_data_params(params)
+
+    @staticmethod
+    def simulation(name, data_source):
         """
         Fetches simulation data based on simulation name passed in
         
-        :param name:    name of simulation data to return
-        :return:        tuple representing record of requested simulation data
+        :param name:        name of simulation data to return
+        :param data_source: DataSource instance
+        :return:            tuple representing record of requested simulation data
         """
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM `simulation` WHERE name = '%s'" % name)
-        return cursor.fetchone()
+        return data_source.simulation(name)
 
-    def __roll_strategy(self, roll_strategy_id, connection):
+    @staticmethod
+    def roll_strategy(roll_strategy_id, data_source):
         """
         Fetch and return roll strategy by ID passed in
         
         :param roll_strategy_id:    ID of the strategy to return
+        :param data_source:         DataSource instance
         :return:                    tuple(name, type, params)
         """
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM `roll_strategy` WHERE id = '%s'" % roll_strategy_id)
-        return cursor.fetchone()
+        return data_source.roll_strategy(roll_strategy_id)
 
-    def __correlation_data_params(self, params):
+    @staticmethod
+    def __correlation_data_params(params):
         """
         Construct and return dict with correlation data pulled from params passed in, 
         optionally defaulted to hard-coded values
@@ -110,6 +217,19 @@ class Initialize:
             params.get('use_ew_correlation', True),
         )
 
+    def __number_type(self, params):
+        """
+        Return type of account amounts by 'numeric_mode' param -- exact Decimal (default), float or fixed-point
+
+        :param params:  dict with loaded params
+        :return:        type
+        """
+        return {
+            NumericMode.DECIMAL: Decimal,
+            NumericMode.FLOAT: float,
+            NumericMode.FIXED_POINT: FixedPoint
+        }[params.get('numeric_mode', NumericMode.DECIMAL)]
+
     def __position_sizing_params(self, params, trading_params):
         """
         Construct and return tuple with position sizing data pulled from params passed in, 
@@ -1,25 +1,27 @@
 #!/usr/bin/python
 
-import os
-import sys
 import json
 import datetime as dt
-import MySQLdb as mysql
-from timer import Timer
 from enum import Table
 from enum import TransactionType
 from decimal import Decimal, InvalidOperation
+from fixed_point import FixedPoint
+from progress import Progress
 
 
 class Persist:
 
-    def __init__(self, simulation_id, roll_strategy, start_date, end_date, account, broker, data_series):
-        self.__connection = mysql.connect(
-            os.environ['DB_HOST'],
-            os.environ['DB_USER'],
-            os.environ['DB_PASS'],
-            os.environ['DB_NAME']
-        )
+    def __init__(self, simulation_id, roll_strategy, start_date, end_date, account, broker, data_series, connection=None):
+        """
+        Persist results of the simulation; nothing is persisted without DB connection (e.g. with snapshot data source)
+
+        :param connection:  DB connection opened in the process running the simulation, or None
+        """
+        if connection is None:
+            return
+
+        self.__connection = connection
+        self.__calendar = data_series.trading_calendar()
         roll_strategy_id = roll_strategy[Table.RollStrategy.ID]
         roll_strategy_name = roll_strategy[Table.RollStrategy.NAME]
         futures = data_series.futures(None, None, None, None, None, None)
@@ -40,7 +42,7 @@ class Persist:
         :param int simulation_id:   ID of the simulation
         :param list trades:         list of Trade objects
         """
-        self.__log('Saving trades')
+        progress = Progress('Saving trades')
 
         values = []
         for trade in trades:
@@ -76,6 +78,8 @@ class Persist:
             ], values
         )
 
+        progress.complete()
+
     def __save_transactions(self, simulation_id, transactions):
         """
         Serialize and insert Transaction instances into DB
@@ -83,7 +87,7 @@ class Persist:
         :param simulation_id:   ID of the simulation
         :param transactions:    list of Transaction objects
         """
-        self.__log('Saving transactions')
+        progress = Progress('Saving transactions')
 
         precision = 28
         self.__insert_values(
@@ -96,11 +100,13 @@ class Persist:
                 t.type(),
                 t.account_action(),
                 t.date(),
-                self.__round(t.amount(), precision) if isinstance(t.amount(), Decimal) else t.amount(),
+                self.__round(t.amount(), precision) if isinstance(t.amount(), (Decimal, FixedPoint)) else t.amount(),
                 t.currency(),
                 t.context_json()) for t in transactions]
         )
 
+        progress.complete()
+
     def __save_positions(self, simulation_id, broker, start_date, end_date):
         """
         Save market positions into DB
@@ -110,20 +116,18 @@ class Persist:
         :param date start_date:     starting date of the simulation
         :param date end_date:       end date of the simulation
         """
-        self.__log('Saving positions')
-
         columns = ['simulation_id', 'date', 'positions']
         values = []
-        date_range = Timer.daily_date_range(start_date, end_date)
-        length = float(len(date_range))
+        date_range = self.__calendar.days(start_date, end_date)
+        progress = Progress('Saving positions', len(date_range))
 
-        for i, date in enumerate(date_range):
-            self.__log('Saving positions', i, length)
-            values.append((simulation_id, date, self.__json(broker.positions(date))))
+        for i, (date, positions) in enumerate(broker.position_snapshots(date_range)):
+            progress.update(i, date)
+            values.append((simulation_id, date, self.__json({'%s_%s' % k: v for k, v in positions.items()})))
 
         self.__insert_values('positions', 'simulation_id', simulation_id, columns, values)
 
-        self.__log('Saving positions', complete=True)
+        progress.complete()
 
         # TODO also save individual positions in time?
         # precision = 10
@@ -169,8 +173,6 @@ class Persist:
         :param roll_strategy_name:  name of the roll strategy
         :param markets:             markets of which price series to persist
         """
-        self.__log('Saving price series')
-
         if roll_strategy_name != 'norgate':
             now = dt.datetime.now()
             price_columns = [
@@ -196,11 +198,11 @@ class Persist:
                 'roll_out_contract',
                 'roll_in_contract'
             ]
-            length = float(len(markets))
+            progress = Progress('Saving price series', len(markets))
             price_values = []
             roll_values = []
             for i, m in enumerate(markets):
-                self.__log('Saving price series', i, length)
+                progress.update(i, m.code())
 
                 market_id = m.id()
                 market_code = m.code()
@@ -232,6 +234,8 @@ class Persist:
             self.__insert_values('continuous_adjusted', 'roll_strategy_id', roll_strategy_id, price_columns, price_values)
             self.__insert_values('contract_roll', 'roll_strategy_id', roll_strategy_id, roll_columns, roll_values)
 
+            progress.complete()
+
     def __save_studies(self, simulation_id, markets, study_parameters):
         """
         Insert Study data into DB
@@ -240,12 +244,10 @@ class Persist:
         :param markets:             list of Market objects
         :param study_parameters:    list of Study parameters
         """
-        self.__log('Saving studies')
-
-        length = float(len(markets))
+        progress = Progress('Saving studies', len(markets))
         values = []
         for i, m in enumerate(markets):
-            self.__log('Saving studies', i, length)
+            progress.update(i, m.code())
 
             for p in study_parameters:
                 study_name = p['name']
@@ -274,6 +276,8 @@ class Persist:
             values
         )
 
+        progress.complete()
+
     def __save_equity(self, simulation_id, account, start_date, end_date):
         """
         Calculates equity, balances and margins and insert the values into DB
@@ -283,8 +287,6 @@ class Persist:
         :param start_date:      start date to calculate from
         :param end_date:        end date to calculate to
         """
-        self.__log('Saving equity')
-
         columns = [
             'simulation_id',
             'date',
@@ -301,23 +303,22 @@ class Persist:
             'margin_ratio'
         ]
         values = []
-        date_range = Timer.daily_date_range(start_date, end_date)
-        length = float(len(date_range))
+        date_range = self.__calendar.days(start_date, end_date)
+        progress = Progress('Saving equity', len(date_range))
 
         for i, date in enumerate(date_range):
-            self.__log('Saving equity', i, length)
+            progress.update(i, date)
 
             equity = account.equity(date)
             funds = account.available_funds(date)
             margins = account.margin_loan_balances(date)
             total_margin = sum(account.base_value(v, k, date) for k, v in margins.items())
 
-            transactions = account.transactions(date, date, True)
-            marked_to_market = account.aggregate(transactions, [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION])
-            commissions = account.aggregate(transactions, [TransactionType.COMMISSION])
-            fx_translations = account.aggregate(transactions, [TransactionType.FX_BALANCE_TRANSLATION])
-            margin_interest = account.aggregate(transactions, [TransactionType.MARGIN_INTEREST])
-            balance_interest = account.aggregate(transactions, [TransactionType.BALANCE_INTEREST])
+            marked_to_market = account.aggregate_range(date, date, [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION])
+            commissions = account.aggregate_range(date, date, [TransactionType.COMMISSION])
+            fx_translations = account.aggregate_range(date, date, [TransactionType.FX_BALANCE_TRANSLATION])
+            margin_interest = account.aggregate_range(date, date, [TransactionType.MARGIN_INTEREST])
+            balance_interest = account.aggregate_range(date, date, [TransactionType.BALANCE_INTEREST])
 
             values.append((
                 simulation_id,
@@ -337,7 +338,7 @@ class Persist:
 
         self.__insert_values('equity', 'simulation_id', simulation_id, columns, values)
 
-        self.__log('Saving equity', complete=True)
+        progress.complete()
 
     def __save_market_equity(self, simulation_id, account, broker, markets, start_date, end_date):
         """
@@ -350,8 +351,6 @@ class Persist:
         :param date start_date:     start date to calculate from
         :param date end_date:       end date to calculate to
         """
-        self.__log('Saving market equity')
-
         mtm_types = [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION]
         comm_types = [TransactionType.COMMISSION]
         columns = [
@@ -365,30 +364,26 @@ class Persist:
             'positions'
         ]
         values = []
-        date_range = Timer.daily_date_range(start_date, end_date)
-        length = float(len(date_range))
+        date_range = self.__calendar.days(start_date, end_date)
+        progress = Progress('Saving market equity', len(date_range))
 
-        for i, date in enumerate(date_range):
-            self.__log('Saving market positions', i, length)
+        for i, (date, positions) in enumerate(broker.position_snapshots(date_range)):
+            progress.update(i, date)
 
-            transactions = account.transactions(date, date, True)
-            mtm_transactions = [t for t in transactions if t.type() in mtm_types]
-            comm_transactions = [t for t in transactions if t.type() in comm_types]
-            positions = broker.positions(date)
+            market_positions = {}
+            for (market_id, contract), quantity in positions.items():
+                market_positions.setdefault(market_id, (contract, quantity))
 
+            market_mtm = account.market_aggregates(date, date, mtm_types)
+            market_commissions = account.market_aggregates(date, date, comm_types)
             for market in markets:
                 market_data, _ = market.data(date)
                 if market_data:
                     market_id = market.id()
-                    market_positions = {k.split('_')[1]: positions[k] for k in positions.keys() if k.split('_')[0] == str(market_id)}
-                    market_position = market_positions.items()[0] if len(market_positions) else None
-                    position_contract = market_position[0] if market_position and market_position[0] != 'None' else None
-                    position_quantity = market_position[1] if market_position else 0
-                    market_mtm_transactions = [t for t in mtm_transactions if t.context()[0].id() == market_id]
-                    market_comm_transactions = [t for t in comm_transactions if t.context()[0].id() == market_id]
-                    mtm = account.aggregate(market_mtm_transactions, mtm_types)
+                    position_contract, position_quantity = market_positions.get(market_id, (None, 0))
+                    mtm = market_mtm.get(market_id, {})
                     mtm = sum(account.base_value(mtm[c], c, date) for c in mtm.keys())
-                    commissions = account.aggregate(market_comm_transactions, comm_types)
+                    commissions = market_commissions.get(market_id, {})
                     commissions = sum(account.base_value(commissions[c], c, date) for c in commissions.keys())
                     equity = mtm + commissions
 
@@ -397,15 +392,15 @@ class Persist:
                         market_id,
                         position_contract,
                         date,
-                        equity,
-                        mtm,
-                        commissions,
+                        self.__decimal(equity),
+                        self.__decimal(mtm),
+                        self.__decimal(commissions),
                         position_quantity
                     ))
 
         self.__insert_values('market_equity', 'simulation_id', simulation_id, columns, values)
 
-        self.__log('Saving market equity', complete=True)
+        progress.complete()
 
     def __json(self, dictionary):
         """
@@ -436,35 +431,24 @@ class Persist:
 
     def __round(self, value, precision):
         """
-        Round Decimal value to specific precision
+        Round Decimal (or fixed-point) value to specific precision
 
         :param value:       Decimal to round
         :param precision:   number of places in exponent
         :return:            rounded Decimal
         """
+        value = self.__decimal(value)
         try:
-            result = value.quantize(Decimal('1.' + ('0' * precision))) if value else value
+            result = value.quantize(Decimal('1.' + ('0' * precision))) if value and isinstance(value, Decimal) else value
         except InvalidOperation:
             result = value
         return result
 
-    def __log(self, message, index=1, length=1.0, complete=False):
+    def __decimal(self, value):
         """
-        Print message and percentage progress to console
+        Convert fixed-point value into Decimal, so it can be inserted into DB; other values are returned unchanged
 
-        :param index:       Index of the item being processed
-        :param length:      Length of the whole range
-        :param complete:    Flag indicating if the progress is complete
+        :param value:   number to convert
+        :return:        Decimal or the original value
         """
-        sys.stdout.write('%s\r' % (' ' * 80))
-        if complete:
-            sys.stdout.write('%s complete\r\n' % message)
-        else:
-            sys.stdout.write('%s ... (%d of %d) [%s]\r' % (
-                message,
-                index,
-                length,
-                '{:.2%}'.format(index / length)
-            ))
-        sys.stdout.flush()
-        return True
+        return value.decimal() if isinstance(value, FixedPoint) else value
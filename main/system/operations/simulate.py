@@ -1,5 +1,6 @@
 #!/usr/bin/python
 
+import sys
 import datetime as dt
 from enum import EventType
 from enum import Interval
@@ -11,10 +12,16 @@ from order import Order
 from timer import Timer
 from order_result import OrderResult
 from persist import Persist
+from checkpoint import Checkpoint
+from event_dispatcher import EventDispatcher
+from market import Market
+from series.data_series import DataSeries
 
 
 class Simulate:
 
+    end_date = dt.date(1992, 12, 31)
+
     def __init__(self,
                  simulation,
                  roll_strategy,
@@ -24,7 +31,13 @@ class Simulate:
                  broker,
                  trading_model,
                  position_inertia,
-                 use_position_inertia):
+                 use_position_inertia,
+                 end_date=None,
+                 checkpoint_date=None,
+                 resume=False,
+                 profiler=None,
+                 connection=None,
+                 data_version=None):
         self.__simulation = simulation
         self.__roll_strategy = roll_strategy
         self.__data_series = data_series
@@ -37,13 +50,30 @@ class Simulate:
         self.__trading_signals = []
         self.__position_sizes = {}
         self.__timer = Timer()
-
-        end_date = dt.date(1992, 12, 31)
+        self.__checkpoint = Checkpoint(simulation[Table.Simulation.NAME])
+        self.__checkpoint_date = checkpoint_date
+        self.__profiler = profiler
+        self.__connection = connection
+        self.__data_version = data_version
+        end_date = end_date or Simulate.end_date
+        self.__end_date = end_date
 
         self.__data_series.load(end_date, roll_strategy[Table.RollStrategy.ID])
         self.__subscribe()
 
-        self.__start(data_series.start_date(), end_date)
+        if resume and self.__checkpoint.exists():
+            checkpoint_date = self.__restore()
+            self.__start(checkpoint_date + dt.timedelta(days=1), end_date, checkpoint_date)
+        else:
+            self.__start(data_series.start_date(), end_date)
+
+    def account(self):
+        """
+        Return account of the simulation, the one restored from checkpoint if resumed
+
+        :return:    Account instance
+        """
+        return self.__account
 
     def __subscribe(self):
         """
@@ -52,16 +82,132 @@ class Simulate:
         self.__timer.on(EventType.MARKET_OPEN, self.__on_market_open)
         # self.__timer.on(EventType.MARKET_CLOSE, self.__on_market_close)
         self.__timer.on(EventType.EOD_DATA, self.__on_eod_data)
+        self.__timer.on(EventType.EOD_DATA, self.__on_checkpoint)
 
-    def __start(self, start_date, end_date):
+    def __start(self, start_date, end_date, previous_date=None):
         """
         Start the simulation
         
-        :param start_date:  start date fo the simulation
-        :param end_date:    end date of the simulation
+        :param start_date:      start date fo the simulation
+        :param end_date:        end date of the simulation
+        :param previous_date:   last date already simulated, when continuing from checkpoint
         """
         self.__timer.on(EventType.COMPLETE, self.__on_timer_complete)
-        self.__timer.start(start_date, end_date)
+        try:
+            if self.__profiler:
+                self.__instrument()
+                self.__timer.time_listeners()
+                self.__profiler.start()
+            self.__timer.start(start_date, end_date, previous_date, self.__data_series.trading_calendar())
+        finally:
+            # Instrumented methods are patched on their classes, so restore them even if the run fails
+            if self.__profiler:
+                self.__profiler.stop()
+
+    def __instrument(self):
+        """
+        Instrument timer's event dispatches and hot calls of the simulation loop
+        """
+        profiler = self.__profiler
+        profiler.instrument(EventDispatcher, 'dispatch', lambda dispatcher, event_type, *data: event_type)
+        profiler.instrument(DataSeries, 'update_futures_data')
+        profiler.instrument(DataSeries, 'update_futures_studies')
+        profiler.instrument(Market, 'update_data', lambda market, date: market.code())
+        profiler.instrument(Market, 'update_studies', lambda market, date: market.code())
+        profiler.instrument(self.__broker.__class__, 'update_account')
+        profiler.instrument(self.__broker.__class__, 'transfer', lambda broker, order, *args: order.market().code())
+        profiler.instrument(self.__account.__class__, 'add_transaction', lambda account, transaction: transaction.type())
+        profiler.instrument(self.__trading_model.__class__, 'signals')
+        profiler.instrument(self.__risk.__class__, 'position_sizes')
+
+    def __restore(self):
+        """
+        Restore simulation state from checkpoint and bring data series and their studies
+        to the checkpoint date, the same as they were when the checkpoint was saved
+
+        :return:    date of the checkpoint
+        """
+        futures = self.__data_series.futures(None, None, None, None, None, None)
+        date, settings, state = self.__checkpoint.load(
+            futures,
+            self.__data_series.currency_pairs(None, None),
+            self.__data_series.interest_rates(None, None)
+        )
+        self.__verify(date, settings)
+        self.__account, self.__broker, self.__risk, self.__trading_model, self.__trading_signals, self.__position_sizes = state
+
+        # Margins computed from prices at the end date would change with it, so keep the ones the history ran with
+        margins = settings['margins']
+        for future in futures:
+            future.pin_margin(margins[future.id()])
+
+        for day in self.__data_series.trading_calendar().days(self.__data_series.start_date(), date):
+            self.__data_series.update_futures_data(day)
+            self.__data_series.update_futures_studies(day)
+
+        if self.__checkpoint_date and self.__checkpoint_date <= date:
+            self.__checkpoint_date = None
+
+        return date
+
+    def __on_checkpoint(self, date, previous_date):
+        """
+        End-of-Day event handler saving simulation state at the end of the checkpoint date
+        (or the first simulated date after it)
+
+        :param date:            date for the market open
+        :param previous_date:   previous market date
+        """
+        if self.__checkpoint_date and date >= self.__checkpoint_date:
+            self.__checkpoint.save(date, self.__settings(), (
+                self.__account,
+                self.__broker,
+                self.__risk,
+                self.__trading_model,
+                self.__trading_signals,
+                self.__position_sizes
+            ))
+            self.__checkpoint_date = None
+
+    def __settings(self):
+        """
+        Return settings the simulation runs with -- simulation and roll strategy records,
+        data start and end date, version of the data and margins of the markets
+
+        :return:    dict
+        """
+        return {
+            'simulation': tuple(self.__simulation),
+            'roll_strategy': tuple(self.__roll_strategy),
+            'start_date': self.__data_series.start_date(),
+            'end_date': self.__end_date,
+            'data_version': self.__data_version,
+            'margins': {f.id(): f.margin() for f in self.__data_series.futures(None, None, None, None, None, None)}
+        }
+
+    def __verify(self, date, settings):
+        """
+        Verify the simulation can continue from checkpoint saved with the settings passed in.
+        Simulation, roll strategy and data start date have to be the same; other data version only
+        warns, as new data are expected when extending the end date, but they may change history before the checkpoint.
+
+        :param date:        date of the checkpoint
+        :param settings:    dict of settings the checkpoint was saved with
+        """
+        current = self.__settings()
+        mismatches = [k for k in ('simulation', 'roll_strategy', 'start_date') if settings[k] != current[k]]
+        if mismatches:
+            raise ValueError("Checkpoint '%s' was saved with other %s than the simulation runs with" % (
+                self.__checkpoint.path(), ', '.join(k.replace('_', ' ') for k in mismatches)))
+
+        if self.__end_date < date:
+            raise ValueError("Checkpoint '%s' is saved on %s, after the end date %s" % (
+                self.__checkpoint.path(), date, self.__end_date))
+
+        if settings['data_version'] != current['data_version']:
+            sys.stderr.write("Warning: data changed since checkpoint '%s' was saved (loaded to %s); "
+                             "history before %s is kept as it was\n" % (
+                                 self.__checkpoint.path(), settings['end_date'], date))
 
     def __on_timer_complete(self, date):
         """
@@ -69,8 +215,15 @@ class Simulate:
 
         :param date:    date of the complete event
         """
+        if self.__profiler:
+            self.__profiler.stop()
+            for event_type, name, calls, seconds in self.__timer.listener_timings():
+                self.__profiler.record('Listener', '%s %s' % (event_type, name), calls, seconds)
+            self.__timer.time_listeners(False)
+            self.__profiler.write()
+
         start_date = self.__data_series.start_date()
-        report = Report(self.__account)
+        report = Report(self.__account, self.__data_series.trading_calendar())
         # print '\n'.join(report.transactions(start_date, date))
         # print '\n'.join(report.to_lists(start_date, date, Interval.YEARLY))
         # report.to_lists(start_date, date, Interval.MONTHLY)
@@ -86,7 +239,8 @@ class Simulate:
             date,
             self.__account,
             self.__broker,
-            self.__data_series
+            self.__data_series,
+            self.__connection
         )
 
         # self.__log(report, full_report, start_date, date, Interval.MONTHLY)
@@ -131,7 +285,7 @@ class Simulate:
         # Trading signals and position sizing
         self.__trading_signals += self.__trading_model.signals(date, open_positions)
         markets = {s.market().id(): s.market() for s in self.__trading_signals}
-        forecasts = {'%s_%s' % (s.market().id(), s.contract()): s.forecast() for s in self.__trading_signals}
+        forecasts = {(s.market().id(), s.contract()): s.forecast() for s in self.__trading_signals}
         self.__position_sizes = self.__risk.position_sizes(date, markets, forecasts)
 
     def __transfer_orders(self, orders, open_positions):
@@ -141,7 +295,7 @@ class Simulate:
         :param orders:  list of order objects
         """
         for order in orders:
-            key = '%s_%s' % (order.market().id(), order.contract())
+            key = order.market().id(), order.contract()
             position_size = self.__position_sizes[key]
             open_position = open_positions[key] if key in open_positions else 0
             order_result = order.quantity() \
@@ -164,7 +318,7 @@ class Simulate:
             market_data, previous_data = market.data(date)
 
             if market_data:
-                key = '%s_%s' % (market.id(), signal.contract())
+                key = market.id(), signal.contract()
                 open_position = open_positions[key] if key in open_positions else None
                 position_size = self.__liquid_position_size(market, self.__position_sizes[key])
                 if open_position is None or open_position != position_size:
@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+import sys
+import time
+import traceback
+from fnmatch import fnmatch
+from multiprocessing import Pool
+from multiprocessing import cpu_count
+from enum import Table
+from initialize import Initialize
+from simulate import Simulate
+from progress import Progress
+
+# Data loaded by the parent process, shared with forked workers as copy-on-write memory
+loaded_data = {}
+# Path to snapshot file the data are loaded from, each worker opens its own data source
+data_path = None
+# End date the data are loaded to and the simulations run until
+end_date = None
+
+
+def simulate(simulation):
+    """
+    Run simulation in a worker process on data loaded by the parent process
+
+    :param simulation:  tuple representing simulation record
+    :return:            tuple(simulation name, time in seconds, final equity, total return,
+                        error traceback or None); equity and return are floats, or None if the simulation failed
+    """
+    start_time = time.time()
+    equity = None
+    total_return = None
+    error = None
+    Progress.mode = Progress.QUIET
+    try:
+        account = Initialize(
+            simulation[Table.Simulation.NAME],
+            loaded_data[Initialize.data_key(simulation)],
+            end_date,
+            data_source=Initialize.data_source(data_path)
+        ).account()
+        equity = float(account.equity(end_date))
+        total_return = equity / float(account.initial_balance()) - 1
+    except Exception:
+        error = traceback.format_exc()
+
+    return simulation[Table.Simulation.NAME], time.time() - start_time, equity, total_return, error
+
+
+class Sweep:
+
+    def __init__(self, patterns, processes=None, path=None, cache_path=None, end=None):
+        """
+        Run all simulations matching the names or patterns passed in, in a pool of worker processes
+
+        Data of the simulations are loaded once in this process, each distinct data only once,
+        and every simulation runs in freshly forked worker, so it starts from unchanged loaded data.
+
+        :param patterns:    list of simulation names or shell-style patterns (e.g. 'ewmac_*')
+        :param processes:   number of worker processes, defaults to number of CPUs
+        :param path:        optional path to snapshot file to load the data from, defaults to MySQL DB
+        :param cache_path:  optional path to directory caching constructed continuous series
+        :param end:         optional end date of the simulations
+        """
+        global data_path, end_date
+
+        start_time = time.time()
+        data_path = path
+        end_date = end or Simulate.end_date
+        data_source = Initialize.data_source(data_path)
+        simulations = self.__simulations(patterns, data_source)
+
+        for simulation in simulations:
+            key = Initialize.data_key(simulation)
+            if key not in loaded_data:
+                data = Initialize.data(simulation, data_source, cache_path)
+                data[0].load(end_date, simulation[Table.Simulation.ROLL_STRATEGY_ID])
+                loaded_data[key] = data
+
+        pool = Pool(processes or cpu_count(), maxtasksperchild=1)
+        results = pool.map(simulate, simulations, chunksize=1)
+        pool.close()
+        pool.join()
+
+        self.__report(results, time.time() - start_time)
+
+    def __simulations(self, patterns, data_source):
+        """
+        Fetch simulations with names matching any of the patterns passed in
+
+        :param patterns:    list of simulation names or shell-style patterns
+        :param data_source: DataSource instance
+        :return:            list of tuples representing simulation records
+        """
+        names = [n for n in data_source.simulation_names() if any(fnmatch(n, p) for p in patterns)]
+        return [Initialize.simulation(name, data_source) for name in names]
+
+    def __report(self, results, elapsed):
+        """
+        Print time, final equity, total return and status of each simulation, and the sweep throughput
+
+        :param results: list of tuples(simulation name, time in seconds, final equity, total return,
+                        error traceback or None)
+        :param elapsed: time of the whole sweep in seconds
+        """
+        print '%-80s %9s %16s %9s %s' % ('Simulation (until %s)' % end_date, 'Time', 'Equity', 'Return', 'Status')
+        for name, seconds, equity, total_return, error in results:
+            if error:
+                print '%-80s %8.1fs %16s %9s ERROR' % (name, seconds, '-', '-')
+                sys.stderr.write(error)
+            else:
+                print '%-80s %8.1fs %16.2f %8.2f%% OK' % (name, seconds, equity, total_return * 100)
+
+        print 'Simulations: %d, errors: %d' % (len(results), len([r for r in results if r[4]]))
+        print 'Time:', elapsed, elapsed / 60, '(%.1f simulations per minute)' % (len(results) / elapsed * 60 if elapsed else 0)
@@ -0,0 +1,29 @@
+#!/usr/bin/python
+
+import datetime as dt
+
+
+def option(name, args, default=None):
+    """
+    Find option '--name=value' in arguments passed in and return its value;
+    if the option is repeated, the last value is returned
+
+    :param name:    name of the option
+    :param args:    list of command-line arguments
+    :param default: value to return if the option is not present
+    :return:        string, or the default if the option is not present
+    """
+    values = [a.split('=', 1)[1] for a in args if a.startswith('--%s=' % name)]
+    return values[-1] if values else default
+
+
+def date_option(name, args):
+    """
+    Find option '--name=YYYY-MM-DD' in arguments passed in and return its date
+
+    :param name:    name of the option
+    :param args:    list of command-line arguments
+    :return:        date or None if the option is not present
+    """
+    value = option(name, args)
+    return dt.datetime.strptime(value, '%Y-%m-%d').date() if value else None
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+
+from bisect import bisect_left, bisect_right
+
+
+class PositionBook(object):
+    """
+    Open positions recorded daily, stored only as changes on the dates positions changed,
+    keyed by tuples of market ID and contract. Every 'keyframe_interval' changes
+    the whole open positions are stored too, so positions on any date are restored
+    from the nearest preceding keyframe by applying at most that many changes.
+
+    Open positions of each recorded date are a new dict only if they changed and are never modified after,
+    so the last two recorded dates, which the simulation asks for, are returned without copying.
+    """
+
+    def __init__(self, keyframe_interval=32):
+        self.__keyframe_interval = keyframe_interval
+        self.__dates = []
+        self.__change_dates = []
+        self.__changes = []
+        self.__keyframes = []
+        self.__latest = None, {}
+        self.__prior = None, {}
+
+    def record(self, date, previous_date, fills):
+        """
+        Record positions on the date passed in -- positions of the previous date changed by the fills.
+        Changes are stored relative to the latest record, so the previous date has to be the latest recorded date.
+
+        :param date:            date of the record
+        :param previous_date:   previous date, the latest recorded date (any date before the first record)
+        :param fills:           list of tuples(market ID, contract, filled quantity)
+        """
+        if self.__dates and previous_date != self.__latest[0]:
+            raise ValueError('Positions on %s must follow the latest record on %s, not %s' % (
+                date, self.__latest[0], previous_date))
+
+        previous_positions = self.__latest[1]
+        # As in the broker's marking, the last fill of a position on the date is the one in effect
+        positions = {(m, c): previous_positions.get((m, c), 0) + q for m, c, q in fills}
+
+        changes = {k: q for k, q in positions.items() if q != previous_positions.get(k, 0)}
+        open_positions = previous_positions
+        if changes:
+            open_positions = dict(previous_positions)
+            self.__apply(open_positions, changes)
+            self.__change_dates.append(date)
+            self.__changes.append(changes)
+            if (len(self.__changes) - 1) % self.__keyframe_interval == 0:
+                self.__keyframes.append(open_positions)
+
+        self.__dates.append(date)
+        self.__prior = self.__latest
+        self.__latest = date, open_positions
+
+    def positions(self, date):
+        """
+        Return positions for the date passed in, if any; positions of the last two recorded dates
+        are shared with the book, so they must not be modified
+
+        :param date:    date of the positions
+        :return:        dict {(market ID, contract): number of positions}
+        """
+        if date == self.__latest[0]:
+            return self.__latest[1]
+        elif date == self.__prior[0]:
+            return self.__prior[1]
+        elif not self.__is_recorded(date):
+            return {}
+
+        return self.__positions_state(date)
+
+    def snapshots(self, dates):
+        """
+        Iterate over positions of the dates passed in, in order of the dates
+
+        :param dates:   sorted list of dates
+        :return:        generator of tuples(date, dict {(market ID, contract): number of positions})
+        """
+        state = self.__positions_state(dates[0]) if len(dates) else {}
+        change_index = bisect_right(self.__change_dates, dates[0]) if len(dates) else 0
+        for date in dates:
+            while change_index < len(self.__change_dates) and self.__change_dates[change_index] <= date:
+                self.__apply(state, self.__changes[change_index])
+                change_index += 1
+            yield date, dict(state) if self.__is_recorded(date) else {}
+
+    def __positions_state(self, date):
+        """
+        Restore open positions effective on the date passed in from the nearest keyframe and changes after it
+
+        :param date:    date of the positions
+        :return:        dict {(market ID, contract): number of positions}
+        """
+        change_index = bisect_right(self.__change_dates, date) - 1
+        if change_index < 0:
+            return {}
+
+        keyframe_index = change_index // self.__keyframe_interval
+        state = dict(self.__keyframes[keyframe_index])
+        for changes in self.__changes[keyframe_index * self.__keyframe_interval + 1:change_index + 1]:
+            self.__apply(state, changes)
+        return state
+
+    def __is_recorded(self, date):
+        """
+        Return flag indicating if positions were recorded on the date passed in
+
+        :param date:    date to check
+        :return:        boolean
+        """
+        index = bisect_left(self.__dates, date)
+        return index < len(self.__dates) and self.__dates[index] == date
+
+    def __apply(self, state, changes):
+        """
+        Apply changes to the open positions passed in
+
+        :param state:   dict of open positions to change
+        :param changes: dict of changed positions and their new number of positions (0 if closed)
+        """
+        for key, quantity in changes.items():
+            if quantity:
+                state[key] = quantity
+            else:
+                state.pop(key, None)
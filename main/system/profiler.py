@@ -0,0 +1,164 @@
+#!/usr/bin/python
+
+import time
+import cProfile
+from collections import defaultdict
+
+
+class Profiler(object):
+    """
+    Opt-in instrumentation of the simulation loop.
+
+    Instrumented methods are wrapped on their classes for the time the profiler runs, counting calls
+    and their time per method and per key (e.g. market code or event type). Time spent in instrumented
+    calls nested in each other is also kept as collapsed stacks ('outer;inner self-time') for flame graphs.
+    """
+
+    CPROFILE = 'cprofile'
+    COLLAPSED = 'collapsed'
+
+    def __init__(self, name, dump=None):
+        """
+        :param name:    name of the profiled run, used in names of the output files
+        :param dump:    optional type of extra dump -- 'cprofile' (pstats file) or 'collapsed' (collapsed stacks)
+        """
+        self.__name = name
+        self.__dump = dump
+        self.__originals = []
+        self.__calls = defaultdict(int)
+        self.__times = defaultdict(float)
+        self.__stack = []
+        self.__stacks = defaultdict(float)
+        self.__profile = cProfile.Profile() if dump == Profiler.CPROFILE else None
+        self.__start_time = None
+        self.__elapsed = 0.0
+
+    def instrument(self, cls, method_name, key=None):
+        """
+        Wrap method of the class passed in to count its calls and time
+
+        :param cls:         class which method to instrument
+        :param method_name: name of the method
+        :param key:         optional function receiving the call's arguments (including 'self')
+                            and returning key to count the call under (e.g. market code)
+        """
+        method = cls.__dict__.get(method_name)
+        if method is None:
+            return
+
+        name = '%s.%s' % (cls.__name__, method_name)
+        profiler = self
+
+        def timed(*args):
+            frame = (name, key(*args) if key else None)
+            return profiler.__call(frame, method, args)
+
+        self.__originals.append((cls, method_name, method))
+        setattr(cls, method_name, timed)
+
+    def record(self, name, key, calls, seconds):
+        """
+        Add calls and their time measured outside of the profiler (e.g. timed event listeners)
+
+        :param name:    name to count the calls under
+        :param key:     key to count the calls under (e.g. listener name)
+        :param calls:   number of calls
+        :param seconds: time of the calls in seconds
+        """
+        for frame in [(name, None), (name, key)]:
+            self.__calls[frame] += calls
+            self.__times[frame] += seconds
+
+    def start(self):
+        """
+        Start measuring
+        """
+        self.__start_time = time.time()
+        if self.__profile:
+            self.__profile.enable()
+
+    def stop(self):
+        """
+        Stop measuring and restore all instrumented methods
+        """
+        if self.__profile:
+            self.__profile.disable()
+        if self.__start_time is not None:
+            self.__elapsed += time.time() - self.__start_time
+            self.__start_time = None
+
+        for cls, method_name, method in reversed(self.__originals):
+            setattr(cls, method_name, method)
+        self.__originals = []
+
+    def summary(self):
+        """
+        Construct and return summary table of instrumented calls, sorted by their total time
+
+        :return:    list of strings
+        """
+        rows = [('%-60s %10s %12s %10s %7s' % ('Call', 'Count', 'Total (s)', 'Mean (ms)', '%'))]
+        elapsed = self.__elapsed or 1.0
+        names = sorted(set(frame[0] for frame in self.__calls), key=lambda n: -self.__times[(n, None)])
+        for name in names:
+            keys = sorted([f for f in self.__calls if f[0] == name and f[1] is not None], key=lambda f: -self.__times[f])
+            for frame in [(name, None)] + keys:
+                calls = self.__calls[frame]
+                seconds = self.__times[frame]
+                rows.append('%-60s %10d %12.3f %10.3f %7.2f' % (
+                    name if frame[1] is None else '    %s' % frame[1],
+                    calls,
+                    seconds,
+                    seconds / calls * 1000 if calls else 0.0,
+                    seconds / elapsed * 100
+                ))
+
+        rows.append('%-60s %10s %12.3f' % ('Total', '', self.__elapsed))
+        return rows
+
+    def write(self):
+        """
+        Print summary table, write it into file, and write the optional dump
+        """
+        summary = '\n'.join(self.summary())
+        print summary
+
+        f = open('profile_%s.txt' % self.__name, 'w')
+        f.write(summary + '\n')
+        f.close()
+
+        if self.__dump == Profiler.CPROFILE:
+            self.__profile.dump_stats('profile_%s.pstats' % self.__name)
+        elif self.__dump == Profiler.COLLAPSED:
+            f = open('profile_%s.collapsed' % self.__name, 'w')
+            f.write('\n'.join('%s %d' % (s, round(t * 1000000)) for s, t in sorted(self.__stacks.items())) + '\n')
+            f.close()
+
+    def __call(self, frame, method, args):
+        """
+        Call the method passed in, counting it under its name and key, and keeping its self-time in its stack
+
+        :param frame:   tuple(name of the method, key of the call or None)
+        :param method:  original method (function) to call
+        :param args:    arguments of the call, including 'self'
+        :return:        result of the call
+        """
+        self.__stack.append([frame, 0.0])
+        start = time.time()
+        try:
+            return method(*args)
+        finally:
+            seconds = time.time() - start
+            child_seconds = self.__stack.pop()[1]
+            if self.__stack:
+                self.__stack[-1][1] += seconds
+
+            self.__calls[(frame[0], None)] += 1
+            self.__times[(frame[0], None)] += seconds
+            if frame[1] is not None:
+                self.__calls[frame] += 1
+                self.__times[frame] += seconds
+
+            stack = ';'.join(n if k is None else '%s:%s' % (n, k) for (n, k), s in self.__stack)
+            label = frame[0] if frame[1] is None else '%s:%s' % frame
+            self.__stacks['%s;%s' % (stack, label) if stack else label] += seconds - child_seconds
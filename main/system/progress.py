@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+import sys
+import json
+import time
+
+
+class Progress(object):
+    """
+    Progress of a loop over items, reported at most once per time interval or percentage step,
+    instead of on every item. Reporting mode is shared by the whole process:
+    'console' keeps rewriting one console line, 'quiet' reports nothing (e.g. in sweep workers)
+    and 'machine' writes one JSON line per report, with throughput (items per second) and ETA.
+    """
+
+    CONSOLE = 'console'
+    QUIET = 'quiet'
+    MACHINE = 'machine'
+
+    mode = CONSOLE
+    interval = 1.0
+    step = 10.0
+
+    def __init__(self, message, length=0):
+        """
+        :param message: message describing the loop
+        :param length:  number of items in the loop
+        """
+        self.__message = message
+        self.__length = length
+        self.__start_time = time.time()
+        self.__reported_time = None
+        self.__reported_percent = 0.0
+
+    def update(self, index, item=''):
+        """
+        Report progress on the item at index passed in, if the time interval elapsed
+        or the progress advanced by the percentage step since the last report
+
+        :param index:   index of the item being processed
+        :param item:    optional label of the item (e.g. date or market code)
+        :return:        boolean True, so the update can be chained with other calls in expressions
+        """
+        if Progress.mode != Progress.QUIET:
+            now = time.time()
+            percent = float(index) / self.__length * 100 if self.__length else 0.0
+            if self.__reported_time is None or now - self.__reported_time >= Progress.interval \
+                    or percent - self.__reported_percent >= Progress.step:
+                self.__reported_time = now
+                self.__reported_percent = percent
+                self.__write(index, item, percent, now - self.__start_time)
+        return True
+
+    def complete(self):
+        """
+        Report the loop complete
+        """
+        if Progress.mode == Progress.MACHINE:
+            elapsed = time.time() - self.__start_time
+            self.__write_line({
+                'message': self.__message,
+                'complete': True,
+                'length': self.__length,
+                'elapsed': round(elapsed, 3),
+                'rate': round(self.__length / elapsed, 1) if elapsed else None
+            })
+        elif Progress.mode != Progress.QUIET:
+            sys.stdout.write('%s\r' % (' ' * 80))
+            sys.stdout.write('%s complete\r\n' % self.__message)
+            sys.stdout.flush()
+
+    def __write(self, index, item, percent, elapsed):
+        """
+        Write progress report
+
+        :param index:   index of the item being processed
+        :param item:    label of the item
+        :param percent: progress in percents
+        :param elapsed: seconds elapsed since the loop started
+        """
+        if Progress.mode == Progress.MACHINE:
+            rate = index / elapsed if elapsed else None
+            self.__write_line({
+                'message': self.__message,
+                'item': str(item),
+                'index': index,
+                'length': self.__length,
+                'percent': round(percent, 2),
+                'rate': round(rate, 1) if rate else None,
+                'eta': round((self.__length - index) / rate, 1) if rate else None
+            })
+        else:
+            sys.stdout.write('%s\r' % (' ' * 80))
+            sys.stdout.write('%s ... %s (%d of %d) [%d %%]\r' % (self.__message, item, index, self.__length, percent))
+            sys.stdout.flush()
+
+    @staticmethod
+    def __write_line(report):
+        """
+        Write report as one JSON line
+
+        :param report:  dict of the report values
+        """
+        sys.stdout.write('%s\n' % json.dumps(report, sort_keys=True))
+        sys.stdout.flush()
@@ -1,16 +1,21 @@
 #!/usr/bin/python
 
-import sys
 import datetime as dt
 from timer import Timer
+from progress import Progress
 from enum import TransactionType
 from enum import Interval
 
 
 class Report:
 
-    def __init__(self, account):
+    def __init__(self, account, trading_calendar=None):
+        """
+        :param account:             Account to report
+        :param trading_calendar:    optional TradingCalendar of the days in daily reports, defaults to all weekdays
+        """
         self.__account = account
+        self.__trading_calendar = trading_calendar
 
     def to_lists(self, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31), interval=None):
         balance_results, performance_results = self.__results(start_date, end_date, interval)
@@ -28,16 +33,16 @@ class Report:
         result = []
         date = dt.date(1900, 1, 1)
         transactions = self.__account.transactions(start_date, end_date)
-        length = float(len(transactions))
+        progress = Progress('Compiling stats', len(transactions))
         for i, t in enumerate(transactions):
-            self.__log(t.date(), i, length)
+            progress.update(i, t.date())
             if t.date() > date:
                 date = t.date()
                 result.append(buffer)
                 buffer = (' %s ' % date).center(80, '-') + '\n'
             buffer += str(t) + '\n'
         result.append(buffer)
-        self.__log(date, complete=True)
+        progress.complete()
         return result
 
     def __list_stats(self, balance_results, performance_results):
@@ -88,22 +93,23 @@ class Report:
         balance_results = []
         performance_results = []
         data = {
-            Interval.DAILY: Timer.daily_date_range(start_date, end_date),
+            Interval.DAILY: self.__trading_calendar.days(start_date, end_date) if self.__trading_calendar is not None
+            else Timer.daily_date_range(start_date, end_date),
             Interval.MONTHLY: Timer.monthly_date_range(start_date, end_date),
             Interval.YEARLY: Timer.yearly_date_range(start_date, end_date)
         }.get(interval, [])
-        length = float(len(data))
+        progress = Progress('Compiling stats', len(data))
 
-        if length:
+        if len(data):
             for i, d in enumerate(data):
-                self.__log(d, i, length)
+                progress.update(i, d)
                 balance_results += [self.__balance_results(self.__previous_date(d, interval), d)]
                 performance_results += [self.__performance_results(self.__previous_date(d, interval), d)]
         else:
             balance_results += [self.__balance_results(start_date, end_date)]
             performance_results += [self.__performance_results(start_date, end_date)]
 
-        self.__log(end_date, complete=True)
+        progress.complete()
 
         return (
             self.__returns(balance_results, self.__account.initial_balance(), self.__account.base_currency()),
@@ -140,15 +146,14 @@ class Report:
         :param end_date:    End date to include transactions until
         :return:            dict of dict of performance results
         """
-        fn = self.__account.aggregate
-        transactions = self.__account.transactions(start_date, end_date)
+        fn = self.__account.aggregate_range
         base_currency = self.__account.base_currency()
-        balance_interest = fn(transactions, [TransactionType.BALANCE_INTEREST])
+        balance_interest = fn(start_date, end_date, [TransactionType.BALANCE_INTEREST])
         return [
-            {'title': 'Mark-to-Market', 'results': fn(transactions, [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION])},
-            {'title': 'Commission', 'results': fn(transactions, [TransactionType.COMMISSION])},
-            {'title': 'Fx Translation', 'results': fn(transactions, [TransactionType.FX_BALANCE_TRANSLATION])},
-            {'title': 'Interest on Margin', 'results': fn(transactions, [TransactionType.MARGIN_INTEREST])},
+            {'title': 'Mark-to-Market', 'results': fn(start_date, end_date, [TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION])},
+            {'title': 'Commission', 'results': fn(start_date, end_date, [TransactionType.COMMISSION])},
+            {'title': 'Fx Translation', 'results': fn(start_date, end_date, [TransactionType.FX_BALANCE_TRANSLATION])},
+            {'title': 'Interest on Margin', 'results': fn(start_date, end_date, [TransactionType.MARGIN_INTEREST])},
             {'title': 'Interest on base Balance', 'results': {k: v for k, v in balance_interest.items() if k == base_currency}},
             {'title': 'Interest on non-base Balance', 'results': {k: v for k, v in balance_interest.items() if k != base_currency}}
         ]
@@ -209,24 +214,3 @@ class Report:
             Interval.MONTHLY: dt.date(date.year, date.month, 1),
             Interval.YEARLY: dt.date(date.year, 1, 1)
         }.get(interval, date)
-
-    def __log(self, day, index=0, length=0.0, complete=False):
-        """
-        Print message and percentage progress to console
-
-        :param index:       Index of the item being processed
-        :param length:      Length of the whole range
-        :param complete:    Flag indicating if the progress is complete
-        """
-        sys.stdout.write('%s\r' % (' ' * 80))
-        if complete:
-            sys.stdout.write('Compiling stats complete\r\n')
-        else:
-            sys.stdout.write('Compiling stats ... %s (%d of %d) [%s]\r' % (
-                day,
-                index,
-                length,
-                '{:.2%}'.format(index / length)
-            ))
-        sys.stdout.flush()
-        return True
@@ -1,16 +1,13 @@
 #!/usr/bin/python
 
-import json
-from math import log
+import numpy as np
 from math import sqrt
-from operator import mul
-from itertools import combinations
 from collections import defaultdict
+from collections import OrderedDict
 from enum import Study
 from enum import Table
 from enum import PositionSizing
 from enum import CapitalCorrection
-from decimal import Decimal
 
 
 class Risk(object):
@@ -23,7 +20,8 @@ class Risk(object):
                  use_group_correlation_weights,
                  capital_correction,
                  partial_compounding_factor,
-                 forecast_const):
+                 forecast_const,
+                 correlation_cache_size=256):
         self.__account = account
         self.__position_sizing = position_sizing
         self.__risk_factor = risk_factor
@@ -33,6 +31,10 @@ class Risk(object):
         self.__partial_compounding_factor = partial_compounding_factor
         self.__use_correlation_weights = False
         self.__forecast_const = forecast_const
+        self.__correlation_cache = OrderedDict()
+        self.__correlation_cache_size = correlation_cache_size
+        self.__correlation_cache_hits = 0
+        self.__correlation_cache_misses = 0
 
     def position_sizes(self, date, markets, forecasts):
         """
@@ -94,7 +96,7 @@ class Risk(object):
         risk = self.__risk_capital(date) * self.__risk_factor
 
         for key in forecasts.keys():
-            market_id = int(key.split('_')[0])
+            market_id = key[0]
             date = dates[market_id]
             market = markets[market_id]
             base_point_value = float(self.__account.base_value(market.point_value(), market.currency(), date))
@@ -106,7 +108,7 @@ class Risk(object):
         # Make sure correlation data is loaded
         if self.__use_correlation_weights:
             l = len(position_sizes)
-            correlations, market_weights = self.__correlation_weights(correlation_data, markets)
+            market_ids, correlations, market_weights = self.__correlation_weights(correlation_data, markets)
             position_sizes = {k: int(position_sizes[k] * l * market_weights[k]) for k in position_sizes.keys()}
 
         return position_sizes
@@ -127,7 +129,7 @@ class Risk(object):
         volatility, volatility_scalars = self.__volatility_scalars(date, dates, prices, correlation_data, vol_target, markets)
         market_forecasts = defaultdict(int)
         for key in forecasts.keys():
-            market_id = int(key.split('_')[0])
+            market_id = key[0]
             market_forecasts[market_id] += forecasts[key]
         # If sum of all forecast for a market will be zero,
         # there will be no position in the market and thus not included in the weight
@@ -135,7 +137,7 @@ class Risk(object):
         weight = 1.0 / length if length else 1.0
         position_sizes = {}
         for key in forecasts.keys():
-            volatility_scalar = volatility_scalars[int(key.split('_')[0])]
+            volatility_scalar = volatility_scalars[key[0]]
             position_sizes[key] = int((volatility_scalar * forecasts[key]) * weight / self.__forecast_const)
 
         return position_sizes
@@ -153,93 +155,143 @@ class Risk(object):
         :param dict forecasts:      signal forecast of each market
         :return:                    dict of position sizes and market IDs as keys
         """
-        correlations, market_weights = self.__correlation_weights(correlation_data, markets)
+        market_ids, correlations, market_weights = self.__correlation_weights(correlation_data, markets)
         volatility, volatility_scalars = self.__volatility_scalars(date, dates, prices, correlation_data, vol_target, markets)
         # Diversification multiplier
-        DM = self.__volatility_target / self.__optimal_volatility(volatility, correlations, market_weights)
+        DM = self.__volatility_target / self.__optimal_volatility(market_ids, volatility, correlations, market_weights)
         position_sizes = {}
         for key in forecasts.keys():
-            market_id = int(key.split('_')[0])
+            market_id = key[0]
             weight = market_weights[market_id] if market_id in market_weights else 1.0
-            volatility_scalar = volatility_scalars[int(key.split('_')[0])]
+            volatility_scalar = volatility_scalars[key[0]]
             position_sizes[key] = int(volatility_scalar * forecasts[key] * weight * DM / self.__forecast_const)
 
         return position_sizes
 
+    def correlation_cache_info(self):
+        """
+        Return statistics of the correlation weights cache
+
+        :return:    dict of number of cache hits, misses and cached entries
+        """
+        return {
+            'hits': self.__correlation_cache_hits,
+            'misses': self.__correlation_cache_misses,
+            'size': len(self.__correlation_cache)
+        }
+
     def __correlation_weights(self, correlation_data, markets):
+        """
+        Return correlations and weights of the markets passed in, cached by the set of markets
+        and dates of their correlation records (least recently used entries are evicted)
+
+        :param correlation_data:    dict of market ID as a key and its correlation record as a value
+        :param dict markets:        markets to use in calculation
+        :return tuple:              tuple of
+                                        list of market IDs in order of the correlation matrix,
+                                        symmetric matrix of market correlations (or None if there are less than 2 markets), and
+                                        dict of correlation weights for each market with market IDs as keys
+        """
+        key = (
+            frozenset((market_id, correlation_data[market_id][Table.MarketCorrelation.DATE]
+                       if correlation_data[market_id] else None) for market_id in markets.keys()),
+            self.__use_group_correlation_weights
+        )
+        if key in self.__correlation_cache:
+            self.__correlation_cache_hits += 1
+            weights = self.__correlation_cache.pop(key)
+        else:
+            self.__correlation_cache_misses += 1
+            weights = self.__calculate_correlation_weights(correlation_data, markets)
+            if len(self.__correlation_cache) >= self.__correlation_cache_size:
+                self.__correlation_cache.popitem(last=False)
+
+        self.__correlation_cache[key] = weights
+        return weights
+
+    def __calculate_correlation_weights(self, correlation_data, markets):
         """
         Calculate weights for each market based on correlations
         
-        1. For each market, sum correlations with every other market;
-        2. group market correlations and also sum these as 'group_weights';
+        1. For each market, multiply correlations with every other market;
+        2. group market correlations and also average these as 'group_weights';
         3. final weight for each market equals 'log(market correlations ^ group correlations) / sum of all correlations'
         
-        :param correlation_data:    correlation data of the markets
+        :param correlation_data:    dict of market ID as a key and its correlation record as a value
         :param dict markets:        markets to use in calculation
         :return tuple:              tuple of
-                                        dict of market correlations with market IDs as keys, and
+                                        list of market IDs in order of the correlation matrix,
+                                        symmetric matrix of market correlations (or None if there are less than 2 markets), and
                                         dict of correlation weights for each market with market IDs as keys
         """
         # TODO The 'Handcrafting' method assumes the assets have the same expected standard deviation of returns!
-        correlations = {}
+        correlations = None
         market_weights = {}
         market_ids = markets.keys()
         if len(market_ids) >= 2:
-            pairs = list(combinations(market_ids, 2))
-            market_correlations = defaultdict(list)
-            group_correlations = defaultdict(list)
-            fraction = .25
-            for pair in pairs:
-                pair_1_id = pair[0]
-                pair_2_id = pair[1]
-                correlation = json.loads(correlation_data[pair_1_id][Table.MarketCorrelation.CORRELATIONS])[str(pair_2_id)] \
-                    if correlation_data[pair_1_id] else 0.3
-                correlations[pair] = correlation
-                correlation = 1e-3 if correlation == 0.0 else abs(correlation)
-                market_correlations[pair_1_id].append(correlation)
-                market_correlations[pair_2_id].append(correlation)
-                rounded_correlation = (fraction * round(correlation / fraction)) if correlation else None
-                group_correlations[pair_1_id].append(rounded_correlation)
-                group_correlations[pair_2_id].append(rounded_correlation)
-
-            market_weights = self.__grouped_market_weights(market_correlations, group_correlations, market_ids) \
-                if self.__use_group_correlation_weights else self.__market_weights(market_correlations, market_ids)
-
-        return correlations, market_weights
-
-    def __market_weights(self, market_correlations, market_ids):
+            correlations = self.__correlation_matrix(correlation_data, markets, market_ids)
+            abs_correlations = np.abs(correlations)
+            abs_correlations[abs_correlations == 0.0] = 1e-3
+            np.fill_diagonal(abs_correlations, 1.0)
+            inner_correlation = abs_correlations.prod(axis=1)
+
+            if self.__use_group_correlation_weights:
+                fraction = .25
+                group_correlations = fraction * np.floor(abs_correlations / fraction + 0.5)
+                np.fill_diagonal(group_correlations, 0.0)
+                weights = self.__grouped_market_weights(inner_correlation, group_correlations)
+            else:
+                weights = self.__market_weights(inner_correlation)
+
+            market_weights = dict(zip(market_ids, weights.tolist()))
+
+        return market_ids, correlations, market_weights
+
+    def __correlation_matrix(self, correlation_data, markets, market_ids):
+        """
+        Build symmetric matrix of correlations among the markets passed in.
+        Correlation of each pair is taken from data of the market coming first in the market IDs;
+        markets without correlation data yet, and pairs the correlation data have no value for (NaN in the cube),
+        are assumed to be correlated by 0.3
+        
+        :param correlation_data:    dict of market ID as a key and its correlation record as a value
+        :param dict markets:        markets to use in calculation
+        :param market_ids:          list of market IDs in order of the matrix rows and columns
+        :return:                    numpy 2-D array
+        """
+        indexes = [markets[market_id].correlation_index() for market_id in market_ids]
+        matrix = np.array([correlation_data[market_id][Table.MarketCorrelation.CORRELATIONS][indexes]
+                           if correlation_data[market_id]
+                           else np.full(len(market_ids), 0.3) for market_id in market_ids], dtype=np.float64)
+        matrix[np.isnan(matrix)] = 0.3
+        upper = np.triu(matrix, 1)
+        return upper + upper.T
+
+    def __market_weights(self, inner_correlation):
         """
         Calculate market weights based on inter-market correlations
         
-        :param market_correlations:     dict{market ID: list of correlations with every other market}
-        :param market_ids:              list of market IDs
-        :return:                        dict of market position weights
+        :param inner_correlation:   array of products of each market's correlations with every other market
+        :return:                    array of market position weights
         """
-        inner_correlation = {market_id: reduce(mul, market_correlations[market_id]) for market_id in market_ids}
-        logs = sum(log(inner_correlation[market_id]) for market_id in market_ids)
-        return {market_id: log(inner_correlation[market_id]) / logs for market_id in market_ids}
+        logs = np.log(inner_correlation)
+        return logs / logs.sum()
 
-    def __grouped_market_weights(self, market_correlations, group_correlations, market_ids):
+    def __grouped_market_weights(self, inner_correlation, group_correlations):
         """
         Calculate market weights based on inter-market correlations and also 'grouped' inter-correlations
         
-        :param market_correlations:     dict{market ID: list of correlations with every other market}
-        :param market_ids:              list of market IDs
-        :return:                        dict of market position weights
+        :param inner_correlation:   array of products of each market's correlations with every other market
+        :param group_correlations:  matrix of market correlations rounded to groups, with zero diagonal
+        :return:                    array of market position weights
         """
-        group_logs = {}
-        for market_id in market_ids:
-            avg = sum(group_correlations[market_id]) / len(group_correlations[market_id])
-            ln = log(avg) if avg else log(1e-6)
-            ln = 1-1e-6 if avg == 1.0 else ln
-            group_logs[market_id] = ln
-
-        total_group_logs = sum(group_logs[market_id] for market_id in market_ids)
-        group_weights = {market_id: group_logs[market_id] / total_group_logs for market_id in market_ids}
+        averages = group_correlations.sum(axis=1) / (len(group_correlations) - 1)
+        group_logs = np.log(np.where(averages != 0.0, averages, 1e-6))
+        group_logs[averages == 1.0] = 1-1e-6
+        group_weights = group_logs / group_logs.sum()
 
-        inner_correlation = {market_id: reduce(mul, market_correlations[market_id]) for market_id in market_ids}
-        logs = sum(log(inner_correlation[market_id]**group_weights[market_id]) for market_id in market_ids)
-        return {market_id: log(inner_correlation[market_id]**group_weights[market_id]) / logs for market_id in market_ids}
+        logs = np.log(inner_correlation ** group_weights)
+        return logs / logs.sum()
 
     def __volatility_scalars(self, date, dates, prices, correlation_data, daily_cash_volatility_target, markets):
         """
@@ -272,30 +324,29 @@ class Risk(object):
 
         return volatility, scalars
 
-    def __optimal_volatility(self, volatility, correlations, market_weights):
+    def __optimal_volatility(self, market_ids, volatility, correlations, market_weights):
         """
         Calculate diversification multiplier based on markets volatility and correlations
         
+        Portfolio variance is summed over every market pair, so each market's own variance term
+        is counted once per pair it is part of.
+        
+        :param market_ids:      list of market IDs in order of the correlation matrix
         :param volatility:      dict of markets volatility
-        :param correlations:    dict of markets correlations
+        :param correlations:    symmetric matrix of markets correlations
         :param market_weights:  dict of market weights
         :return:                return diversification multiplier based on portfolio volatility and volatility target
         """
+        if correlations is None:
+            return self.__volatility_target
+
         daily_factor = 16  # sqrt(256 business days)
-        terms = []
-        for pair in correlations.keys():
-            pair_1_id = pair[0]
-            pair_2_id = pair[1]
-            market_1_vol = volatility[pair_1_id] * daily_factor
-            market_2_vol = volatility[pair_2_id] * daily_factor
-            market_1_weight = market_weights[pair_1_id]
-            market_2_weight = market_weights[pair_2_id]
-            correlation = correlations[pair] if correlations[pair] >= 0.0 else 0.0  # Cap to avoid very big numbers
-            terms.append(market_1_weight**2 * market_1_vol**2)
-            terms.append(market_2_weight**2 * market_2_vol**2)
-            terms.append(2 * market_1_weight * market_1_vol * market_2_weight * market_2_vol * correlation)
-
-        return sqrt(abs(sum(terms))) if len(terms) else self.__volatility_target
+        weighted_volatility = np.array([market_weights[m] * volatility[m] * daily_factor for m in market_ids])
+        capped_correlations = np.maximum(correlations, 0.0)  # Cap to avoid very big numbers
+        variance = (len(market_ids) - 1) * np.dot(weighted_volatility, weighted_volatility) \
+            + np.dot(weighted_volatility, np.dot(capped_correlations, weighted_volatility))
+
+        return sqrt(abs(variance))
 
     def __risk_capital(self, date):
         """
@@ -306,7 +357,7 @@ class Risk(object):
         """
         equity = self.__account.equity(date)
         initial_balance = self.__account.initial_balance()
-        partial_factor = Decimal(self.__partial_compounding_factor)
+        partial_factor = self.__account.number_type()(self.__partial_compounding_factor)
         capital = {
             CapitalCorrection.FIXED: initial_balance,
             CapitalCorrection.FULL_COMPOUNDING: equity,
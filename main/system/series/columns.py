@@ -0,0 +1,575 @@
+#!/usr/bin/python
+
+import os
+import numpy as np
+import datetime as dt
+import cPickle as pickle
+
+
+class DateColumns(object):
+    """
+    Base of array-backed series -- one contiguous array per column, with dates held as int day ordinals.
+    Dates and date ranges are resolved into row indexes by binary search over the date column.
+
+    Columns can be filled ahead (e.g. precomputed studies) and revealed with a cursor moving forward in time;
+    only rows before the cursor are visible to the lookups.
+
+    Columns can also be saved into '.npy' files and memory-mapped back read-only,
+    so all processes mapping the same files share one copy of the data.
+    """
+
+    def __init__(self, capacity=256):
+        self._size = 0
+        self._length = 0
+        self._dates = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self._length
+
+    def advance(self, date):
+        """
+        Move cursor forward to reveal all filled rows up to the date passed in (included)
+
+        :param date:    date to move the cursor to
+        """
+        self._length = max(self._length, int(np.searchsorted(self._dates[:self._size], date.toordinal(), 'right')))
+
+    def index(self, date):
+        """
+        Return index of the row recorded on the date passed in
+
+        :param date:    date of the row
+        :return:        int index of the row, or None if there is no row on the date
+        """
+        ordinal = date.toordinal()
+        index = int(np.searchsorted(self._dates[:self._length], ordinal))
+        return index if index < self._length and self._dates[index] == ordinal else None
+
+    def as_of_index(self, date):
+        """
+        Return index of the latest visible row dated on or before the date passed in
+
+        :param date:    date to resolve
+        :return:        int index of the row, or None if there is no row on or before the date
+        """
+        index = int(np.searchsorted(self._dates[:self._length], date.toordinal(), 'right')) - 1
+        return index if index > -1 else None
+
+    def range_indexes(self, start_date, end_date):
+        """
+        Return indexes of the first and past-the-last rows between the dates passed in (included)
+
+        :param start_date:  start date of the range
+        :param end_date:    end date of the range
+        :return:            tuple(start index, end index)
+        """
+        dates = self._dates[:self._length]
+        start = int(np.searchsorted(dates, start_date.toordinal(), 'left'))
+        end = int(np.searchsorted(dates, end_date.toordinal(), 'right'))
+        return start, max(start, end)
+
+    def date(self, index):
+        """
+        Return date of the row at index passed in
+
+        :param index:   index of the row
+        :return:        date
+        """
+        return dt.date.fromordinal(int(self._dates[self._position(index)]))
+
+    def save(self, path):
+        """
+        Save filled rows of all columns into '.npy' files in the directory passed in
+
+        :param path:    path to the directory
+        """
+        for name in self._column_names():
+            np.save(self.__file_name(path, name), getattr(self, name)[:self._size])
+
+    def mmap(self, path):
+        """
+        Replace all columns with read-only arrays memory-mapped from files saved in the directory passed in;
+        all the mapped rows are visible
+
+        :param path:    path to the directory
+        """
+        for name in self._column_names():
+            setattr(self, name, np.load(self.__file_name(path, name), mmap_mode='r'))
+        self._size = len(self._dates)
+        self._length = self._size
+
+    def _position(self, index):
+        """
+        Translate negative index, counted from the last row, into absolute row position
+
+        :param index:   index of the row
+        :return:        int
+        """
+        return index if index >= 0 else self._length + index
+
+    def _reserve(self, size):
+        """
+        Make sure all columns can hold at least number of rows passed in
+
+        :param size:    number of rows required
+        """
+        capacity = len(self._dates)
+        if size > capacity:
+            capacity = max(size, capacity * 2)
+            for name in self._column_names():
+                column = getattr(self, name)
+                resized = np.zeros(capacity, dtype=column.dtype)
+                resized[:self._size] = column[:self._size]
+                setattr(self, name, resized)
+
+    def _column_names(self):
+        """
+        Return attribute names of all array columns
+
+        :return:    list of strings
+        """
+        return ['_dates']
+
+    @staticmethod
+    def __file_name(path, name):
+        """
+        Return name of the file the column is saved in
+
+        :param path:    path to the directory
+        :param name:    attribute name of the column
+        :return:        string
+        """
+        return os.path.join(path, '%s.npy' % name.lstrip('_'))
+
+    @staticmethod
+    def _value(value):
+        """
+        Translate 'NaN' placeholder back to NoneType
+
+        :param value:   float value
+        :return:        float or None
+        """
+        return value if value == value else None
+
+
+class PriceColumns(DateColumns):
+    """
+    Market price history in columns: contract code ID, date, OHLC prices, volume and optionally last trading day.
+    Volumes are held as floats, so missing volumes can be kept as 'NaN'; rows return them as integers or None.
+    Rows are returned as tuples in order of 'Table.Market' enum.
+    """
+
+    def __init__(self, has_last_trading_day=False, capacity=256):
+        super(PriceColumns, self).__init__(capacity)
+        self.__has_last_trading_day = has_last_trading_day
+        self.__codes = []
+        self.__code_map = {}
+        self._code_ids = np.zeros(capacity, dtype=np.int16)
+        self._open = np.zeros(capacity, dtype=np.float64)
+        self._high = np.zeros(capacity, dtype=np.float64)
+        self._low = np.zeros(capacity, dtype=np.float64)
+        self._settle = np.zeros(capacity, dtype=np.float64)
+        self._volume = np.zeros(capacity, dtype=np.float64)
+        self._last_trading_day = np.zeros(capacity, dtype=np.int32)
+
+    def append(self, row):
+        """
+        Append one record to the columns
+
+        :param row: tuple(code, date, open, high, low, settle, volume[, last trading day])
+        """
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Append list of records to the columns
+
+        :param rows:    list of tuples(code, date, open, high, low, settle, volume[, last trading day])
+        """
+        length = len(rows)
+        if length:
+            columns = zip(*rows)
+            start = self._size
+            end = start + length
+            self._reserve(end)
+            self._code_ids[start:end] = [self.__code_id(c) for c in columns[0]]
+            self._dates[start:end] = [d.toordinal() for d in columns[1]]
+            self._open[start:end] = np.array(columns[2], dtype=np.float64)
+            self._high[start:end] = np.array(columns[3], dtype=np.float64)
+            self._low[start:end] = np.array(columns[4], dtype=np.float64)
+            self._settle[start:end] = np.array(columns[5], dtype=np.float64)
+            self._volume[start:end] = [v if v is not None else np.nan for v in columns[6]]
+            if self.__has_last_trading_day:
+                self._last_trading_day[start:end] = [d.toordinal() if d else 0 for d in columns[7]]
+            self._size = end
+            self._length = end
+
+    def adjust(self, offsets):
+        """
+        Subtract offsets (e.g. accumulated roll gaps of back-adjusted series) from OHLC prices of all rows
+
+        :param offsets: array of offsets, one for each row
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        for column in (self._open, self._high, self._low, self._settle):
+            column[:self._size] -= offsets
+
+    def row(self, index):
+        """
+        Return record at the index passed in
+
+        :param index:   index of the record
+        :return:        tuple representing one day record
+        """
+        index = self._position(index)
+        return self.rows(index, index + 1)[0]
+
+    def rows(self, start=0, end=None):
+        """
+        Return records in between the indexes passed in
+
+        :param start:   index of the first record
+        :param end:     index past the last record
+        :return:        list of tuples
+        """
+        end = self._length if end is None else min(end, self._length)
+        codes = self.__codes
+        value = self._value
+        columns = [
+            [codes[c] for c in self._code_ids[start:end].tolist()],
+            [dt.date.fromordinal(d) for d in self._dates[start:end].tolist()],
+            [value(v) for v in self._open[start:end].tolist()],
+            [value(v) for v in self._high[start:end].tolist()],
+            [value(v) for v in self._low[start:end].tolist()],
+            [value(v) for v in self._settle[start:end].tolist()],
+            [int(v) if v == v else None for v in self._volume[start:end].tolist()]
+        ]
+        if self.__has_last_trading_day:
+            columns.append([dt.date.fromordinal(d) if d else None for d in self._last_trading_day[start:end].tolist()])
+        return zip(*columns)
+
+    def range(self, start_date, end_date):
+        """
+        Return records between the start and end date passed in (included)
+
+        :param start_date:  start date of the records
+        :param end_date:    end date of the records
+        :return:            list of tuples
+        """
+        return self.rows(*self.range_indexes(start_date, end_date))
+
+    def code(self, index):
+        """
+        Return contract code of the record at index passed in
+
+        :param index:   index of the record
+        :return:        string
+        """
+        return self.__codes[self._code_ids[self._position(index)]]
+
+    def save(self, path):
+        """
+        Save filled rows of all columns and the contract codes into files in the directory passed in
+
+        :param path:    path to the directory
+        """
+        super(PriceColumns, self).save(path)
+
+        f = open(os.path.join(path, 'codes.pkl'), 'wb')
+        pickle.dump(self.__codes, f, pickle.HIGHEST_PROTOCOL)
+        f.close()
+
+    def mmap(self, path):
+        """
+        Replace all columns with read-only arrays memory-mapped from files saved in the directory passed in
+        and load the contract codes
+
+        :param path:    path to the directory
+        """
+        super(PriceColumns, self).mmap(path)
+
+        f = open(os.path.join(path, 'codes.pkl'), 'rb')
+        self.__codes = pickle.load(f)
+        f.close()
+
+        self.__code_map = {c: i for i, c in enumerate(self.__codes)}
+
+    def codes(self):
+        """
+        Return contract codes, indexed by their IDs
+
+        :return:    list of strings
+        """
+        return self.__codes
+
+    def settle_price(self, index):
+        """
+        Return settle price of the record at index passed in
+
+        :param index:   index of the record
+        :return:        float
+        """
+        return self._value(float(self._settle[self._position(index)]))
+
+    def date_ordinals(self):
+        """
+        Return view of visible dates as day ordinals
+
+        :return:    numpy array
+        """
+        return self._dates[:self._length]
+
+    def code_ids(self):
+        """
+        Return view of visible contract code IDs
+
+        :return:    numpy array
+        """
+        return self._code_ids[:self._length]
+
+    def high_prices(self):
+        """
+        Return view of visible high prices
+
+        :return:    numpy array
+        """
+        return self._high[:self._length]
+
+    def low_prices(self):
+        """
+        Return view of visible low prices
+
+        :return:    numpy array
+        """
+        return self._low[:self._length]
+
+    def settle_prices(self):
+        """
+        Return view of visible settle prices
+
+        :return:    numpy array
+        """
+        return self._settle[:self._length]
+
+    def volumes(self):
+        """
+        Return view of visible volumes, missing volumes are 'NaN'
+
+        :return:    numpy array
+        """
+        return self._volume[:self._length]
+
+    def _column_names(self):
+        """
+        Return attribute names of all array columns
+
+        :return:    list of strings
+        """
+        return super(PriceColumns, self)._column_names() + [
+            '_code_ids', '_open', '_high', '_low', '_settle', '_volume', '_last_trading_day'
+        ]
+
+    def __code_id(self, code):
+        """
+        Return integer ID of the contract code passed in, registering the code if not seen yet
+
+        :param code:    contract code
+        :return:        int
+        """
+        if code not in self.__code_map:
+            self.__code_map[code] = len(self.__codes)
+            self.__codes.append(code)
+        return self.__code_map[code]
+
+
+class StudyColumns(DateColumns):
+    """
+    Study history in columns: date, value and optionally second value (e.g. 'HHLL' lowest-low).
+    Integer studies (e.g. 'SMA' of volume) keep int64 values, so they are returned as Python integers.
+    Rows are returned as tuples in order of 'Table.Study' enum.
+    """
+
+    def __init__(self, has_second_value=False, dtype=np.float64, capacity=256):
+        super(StudyColumns, self).__init__(capacity)
+        self.__has_second_value = has_second_value
+        self._values = np.zeros(capacity, dtype=dtype)
+        self._values_2 = np.zeros(capacity, dtype=dtype)
+
+    def append(self, date, value, value_2=None):
+        """
+        Append one study record
+
+        :param date:    date of the record
+        :param value:   study value
+        :param value_2: optional second study value
+        """
+        index = self._size
+        self._reserve(index + 1)
+        self._dates[index] = date.toordinal()
+        self._values[index] = value
+        self._values_2[index] = value_2 if value_2 is not None else 0
+        self._size = index + 1
+        self._length = index + 1
+
+    def assign(self, dates, values, values_2=None):
+        """
+        Fill the columns with whole precomputed series, hidden until the cursor advances over them
+
+        :param dates:       array of date ordinals
+        :param values:      array of study values
+        :param values_2:    optional array of second study values
+        """
+        size = len(dates)
+        self._reserve(size)
+        self._dates[:size] = dates
+        self._values[:size] = values
+        self._values_2[:size] = values_2 if values_2 is not None else 0
+        self._size = size
+        self._length = 0
+
+    def row(self, index):
+        """
+        Return record at the index passed in
+
+        :param index:   index of the record
+        :return:        tuple(date, value[, value_2])
+        """
+        index = self._position(index)
+        return self.rows(index, index + 1)[0]
+
+    def rows(self, start=0, end=None):
+        """
+        Return records in between the indexes passed in
+
+        :param start:   index of the first record
+        :param end:     index past the last record
+        :return:        list of tuples
+        """
+        end = self._length if end is None else min(end, self._length)
+        columns = [
+            [dt.date.fromordinal(d) for d in self._dates[start:end].tolist()],
+            self._values[start:end].tolist()
+        ]
+        if self.__has_second_value:
+            columns.append(self._values_2[start:end].tolist())
+        return zip(*columns)
+
+    def range(self, start_date, end_date):
+        """
+        Return records between the start and end date passed in (included)
+
+        :param start_date:  start date of the records
+        :param end_date:    end date of the records
+        :return:            list of tuples
+        """
+        return self.rows(*self.range_indexes(start_date, end_date))
+
+    def _column_names(self):
+        """
+        Return attribute names of all array columns
+
+        :return:    list of strings
+        """
+        return super(StudyColumns, self)._column_names() + ['_values', '_values_2']
+
+
+class RateColumns(DateColumns):
+    """
+    Rate history in columns: date, rate and optionally second rate (e.g. interest rates of two maturities).
+    Missing rates are held as 'NaN' and returned as None.
+    Rows are returned as tuples in order of 'Table.CurrencyPair' or 'Table.InterestRate' enum.
+    """
+
+    def __init__(self, has_second_rate=False, capacity=256):
+        super(RateColumns, self).__init__(capacity)
+        self.__has_second_rate = has_second_rate
+        self._rates = np.zeros(capacity, dtype=np.float64)
+        self._rates_2 = np.zeros(capacity, dtype=np.float64)
+
+    def extend(self, rows):
+        """
+        Append list of records to the columns
+
+        :param rows:    list of tuples(date, rate[, second rate])
+        """
+        length = len(rows)
+        if length:
+            columns = zip(*rows)
+            start = self._size
+            end = start + length
+            self._reserve(end)
+            self._dates[start:end] = [d.toordinal() for d in columns[0]]
+            self._rates[start:end] = [r if r is not None else np.nan for r in columns[1]]
+            if self.__has_second_rate:
+                self._rates_2[start:end] = [r if r is not None else np.nan for r in columns[2]]
+            self._size = end
+            self._length = end
+
+    def rate(self, index):
+        """
+        Return rate of the record at index passed in
+
+        :param index:   index of the record
+        :return:        float, or None if the rate is missing
+        """
+        return self._value(float(self._rates[self._position(index)]))
+
+    def rows(self, start=0, end=None):
+        """
+        Return records in between the indexes passed in
+
+        :param start:   index of the first record
+        :param end:     index past the last record
+        :return:        list of tuples
+        """
+        end = self._length if end is None else min(end, self._length)
+        value = self._value
+        columns = [
+            [dt.date.fromordinal(d) for d in self._dates[start:end].tolist()],
+            [value(v) for v in self._rates[start:end].tolist()]
+        ]
+        if self.__has_second_rate:
+            columns.append([value(v) for v in self._rates_2[start:end].tolist()])
+        return zip(*columns)
+
+    def range(self, start_date, end_date):
+        """
+        Return records between the start and end date passed in (included)
+
+        :param start_date:  start date of the records
+        :param end_date:    end date of the records
+        :return:            list of tuples
+        """
+        return self.rows(*self.range_indexes(start_date, end_date))
+
+    def date_ordinals(self):
+        """
+        Return view of visible dates as day ordinals
+
+        :return:    numpy array
+        """
+        return self._dates[:self._length]
+
+    def rates(self):
+        """
+        Return view of visible rates, missing rates are 'NaN'
+
+        :return:    numpy array
+        """
+        return self._rates[:self._length]
+
+    def second_rates(self):
+        """
+        Return view of visible second rates, missing rates are 'NaN'
+
+        :return:    numpy array
+        """
+        return self._rates_2[:self._length]
+
+    def _column_names(self):
+        """
+        Return attribute names of all array columns
+
+        :return:    list of strings
+        """
+        return super(RateColumns, self)._column_names() + ['_rates', '_rates_2']
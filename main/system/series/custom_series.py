@@ -5,14 +5,26 @@ from enum import Table
 from enum import YieldCurve
 from enum import RollSchedule
 from enum import RollStrategyType
-from collections import defaultdict
+from timer import Timer
+from bisect import bisect_left, bisect_right
+from collections import deque
 from operator import itemgetter
+from series.columns import PriceColumns
 from series.market_series import MarketSeries
+from series.roll_calendar import RollCalendar
+from series.term_structure import TermStructure
+from series.series_cache import SeriesCache
 
 
 class CustomSeries(MarketSeries):
-
-    def __init__(self, start_data_date, study_parameters, roll_strategy, position_sizing, volatility_type, volatility_lookback, use_ew_correlation):
+    """
+    Continuous series spliced from individual contracts by the series roll strategy and back-adjusted by roll gaps.
+    The whole series is constructed once at load (or opened from optional SeriesCache, if the data didn't change)
+    and the simulation only replays its rolls, as they take effect. Prices of the contracts are kept in columns
+    (memory-mapped from the cache, if any), read by the term structure.
+    """
+
+    def __init__(self, start_data_date, study_parameters, roll_strategy, position_sizing, volatility_type, volatility_lookback, use_ew_correlation, cache=None):
         super(CustomSeries, self).__init__(
             start_data_date,
             study_parameters,
@@ -23,12 +35,15 @@ class CustomSeries(MarketSeries):
             use_ew_correlation
         )
 
-        self.__contracts = defaultdict(list)
+        self._prices = PriceColumns(has_last_trading_day=True)
+        self.__contract_prices = PriceColumns(has_last_trading_day=True)
+        self.__term_structure = TermStructure()
         self.__contract_keys = []
         self.__roll_schedule = []
-        self.__scheduled_rolls = []
+        self.__roll_calendar = RollCalendar()
         self.__rolls = []
-        self.__gaps = 0.0
+        self.__pending_rolls = deque()
+        self.__cache = cache
 
         self.__optimal_volume = self._roll_strategy[Table.RollStrategy.PARAMS].get('min_volume', 1000)
 
@@ -39,7 +54,7 @@ class CustomSeries(MarketSeries):
         :param date:    date by which find the contract
         :return:        contract symbol code
         """
-        return self._prices[self._price_indexes[date]][Table.Market.CODE]
+        return self._prices.code(self._prices.index(date))
 
     def previous_contract(self, contract):
         """
@@ -48,8 +63,8 @@ class CustomSeries(MarketSeries):
         :param string contract:     contract code to compare
         :return string:             contract code
         """
-        previous_keys = [k for k in self.__contract_keys if k < contract]
-        return previous_keys[-1] if len(previous_keys) else None
+        index = bisect_left(self.__contract_keys, contract)
+        return self.__contract_keys[index - 1] if index else None
 
     def next_contract(self, contract):
         """
@@ -58,8 +73,8 @@ class CustomSeries(MarketSeries):
         :param string contract:     contract code to compare
         :return string:             contract code
         """
-        next_keys = [k for k in self.__contract_keys if k > contract]
-        return next_keys[0] if len(next_keys) else None
+        index = bisect_right(self.__contract_keys, contract)
+        return self.__contract_keys[index] if index < len(self.__contract_keys) else None
 
     def contract_data(self, contract, date):
         """
@@ -67,8 +82,7 @@ class CustomSeries(MarketSeries):
         
         :return:    tuple representing one day record
         """
-        contract_data = [d for d in self.__contracts[contract] if d[Table.Market.PRICE_DATE] <= date]
-        return contract_data[-1] if len(contract_data) else None
+        return self.__term_structure.record(contract, date)
 
     def rolls(self):
         """
@@ -80,72 +94,119 @@ class CustomSeries(MarketSeries):
 
     def update_data(self, date):
         """
-        Update dynamic data
+        Update dynamic data -- take the constructed series' rolls effective on the date passed in
         
         :param date:    date of the data update
         """
-        scheduled_contract = self.scheduled_roll(date)[Table.ContractRoll.ROLL_IN_CONTRACT] \
-            if self._roll_strategy[Table.RollStrategy.TYPE] == RollStrategyType.STANDARD_ROLL \
-            else self.__optimal_contract(date)
-        contract_data = [d for d in self.__contracts[scheduled_contract] if d[Table.Market.PRICE_DATE] == date]
-
-        if len(contract_data):
-            self._prices.append(tuple(i[1] if i[0] else i[1][-5:] for i in enumerate(contract_data[-1])))
-            index = len(self._prices) - 1
-            self._price_indexes[date] = index
-
-            if self._prices[index][Table.Market.CODE] != self._prices[index-1][Table.Market.CODE]:
-                previous_contract = self._prices[index-1][Table.Market.CODE]
-                previous_data = [d for d in self.__contracts[previous_contract] if d[Table.Market.PRICE_DATE] <= date][-1]
-                gap = self._prices[index][Table.Market.SETTLE_PRICE] - previous_data[Table.Market.SETTLE_PRICE]
-                self.__rolls.append((date, gap, previous_contract, self._prices[index][Table.Market.CODE]))
-                self.__contracts.pop(previous_contract, None)
-                self.__gaps = sum(roll[1] for roll in self.__rolls)
-
-            self._prices[index] = tuple(d - self.__gaps if isinstance(d, float) else d for d in self._prices[index])
+        while len(self.__pending_rolls) and self.__pending_rolls[0][Table.ContractRoll.DATE] <= date:
+            roll = self.__pending_rolls.popleft()
+            self.__rolls.append(roll)
+            self.__term_structure.remove(roll[Table.ContractRoll.ROLL_OUT_CONTRACT])
 
-    def load(self, connection, end_date, delivery_months, market_id, market_code, roll_strategy_id):
+    def load(self, data_source, end_date, delivery_months, market_id, market_code, roll_strategy_id):
         """
         Load market's data
 
-        :param connection:          MySQLdb connection instance
+        :param data_source:         DataSource instance
         :param end_date:            Last date to fetch data to
         :param delivery_months:     list of delivery months [(code, short-month-name)]
         :param market_id:           ID of the series market
         :param market_code:         code symbol of the series market
         :param roll_strategy_id:    ID of the series roll strategy
         """
-        super(CustomSeries, self).load(connection, end_date, delivery_months, market_id, market_code, roll_strategy_id)
+        super(CustomSeries, self).load(data_source, end_date, delivery_months, market_id, market_code, roll_strategy_id)
+
+        self.__roll_schedule = data_source.roll_schedule(market_id)
+
+        source_version = data_source.version() if self.__cache else None
+        contracts = None if source_version \
+            else data_source.contract_prices(market_id, market_code, self._start_data_date, end_date)
+        version = SeriesCache.version(
+            self._roll_strategy,
+            self._start_data_date,
+            end_date,
+            sorted(delivery_months.items()),
+            self.__roll_schedule,
+            source_version or contracts
+        ) if self.__cache else None
+        rolls = self.__cache.open(market_id, roll_strategy_id, version, self._prices, self.__contract_prices) \
+            if self.__cache else None
+
+        if rolls is None:
+            contracts = contracts if contracts is not None \
+                else data_source.contract_prices(market_id, market_code, self._start_data_date, end_date)
+            self.__schedule_rolls(set(c[Table.Market.CODE][-5:].upper() for c in contracts))
+            self.__contract_prices.extend(self.__scheduled_contracts(contracts))
+            # Parsed records aren't needed anymore, only their columns
+            contracts = None
+
+            rows, gaps, rolls = self.__construct(end_date)
+            self._prices.extend(rows)
+            self._prices.adjust(gaps)
+
+            if self.__cache:
+                self.__cache.save(market_id, roll_strategy_id, version, self._prices, rolls, self.__contract_prices)
+                self.__cache.open(market_id, roll_strategy_id, version, self._prices, self.__contract_prices)
+        else:
+            self.__schedule_rolls(TermStructure(self.__contract_prices).contracts())
+
+        self._studies.compute(self._prices)
+        self.__pending_rolls = deque(rolls)
+
+        self.__term_structure = TermStructure(self.__contract_prices)
 
-        cursor = connection.cursor()
-        contracts_query = """
-            SELECT %s
-            FROM contract
-            WHERE market_id = '%s'
-            AND DATE(price_date) >= '%s'
-            AND DATE(price_date) <= '%s'
-            ORDER BY price_date;
+        return True
+
+    def __scheduled_contracts(self, contracts):
         """
-        cursor.execute(contracts_query % (
-            self._column_names() + ', last_trading_day',
-            market_id,
-            self._start_data_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        ))
-        for contract in [c for c in cursor.fetchall() if market_code == c[Table.Market.CODE][:-5]]:
-            self.__contracts[contract[Table.Market.CODE][-5:].upper()].append(contract)
+        Return records of the scheduled contracts, grouped by contract and sorted by date within each contract
 
-        roll_schedule_query = """
-            SELECT roll_out_month, roll_in_month, month, day
-            FROM standard_roll_schedule
-            WHERE market_id = '%s';
+        :param contracts:   list of tuples(code, date, open, high, low, settle, volume, last trading day)
+        :return:            list of tuples(code, date, open, high, low, settle, volume, last trading day)
         """
-        cursor.execute(roll_schedule_query % market_id)
-        self.__roll_schedule = cursor.fetchall()
+        contract_keys = set(self.__contract_keys)
+        key = lambda c: c[Table.Market.CODE][-5:].upper()
+        return sorted((c for c in contracts if key(c) in contract_keys), key=lambda c: (key(c), c[Table.Market.PRICE_DATE]))
 
-        self.__schedule_rolls()
+    def __construct(self, end_date):
+        """
+        Construct continuous series by splicing contracts scheduled on each day from the start data date
+        to the end date passed in, the same days the simulation goes through
 
-        return True
+        :param end_date:    last date of the series
+        :return:            tuple(list of unadjusted records, list of roll gaps accumulated by each of the records,
+                            list of tuples(date, gap, roll-out-contract, roll-in-contract))
+        """
+        term_structure = TermStructure(self.__contract_prices)
+        standard_roll = self._roll_strategy[Table.RollStrategy.TYPE] == RollStrategyType.STANDARD_ROLL
+        contract = self.__rolls[-1][Table.ContractRoll.ROLL_IN_CONTRACT]
+        previous_contract = None
+        gap_sum = 0.0
+        rows = []
+        gaps = []
+        rolls = []
+
+        for date in Timer.daily_date_range(self._start_data_date, end_date):
+            scheduled_contract = self.scheduled_roll(date)[Table.ContractRoll.ROLL_IN_CONTRACT] if standard_roll \
+                else self.__optimal_contract(date, contract, term_structure)
+            contract_data = term_structure.record(scheduled_contract, date)
+
+            if contract_data and contract_data[Table.Market.PRICE_DATE] == date:
+                code = contract_data[Table.Market.CODE][-5:]
+
+                if previous_contract is not None and code != previous_contract:
+                    previous_data = term_structure.record(previous_contract, date)
+                    gap = contract_data[Table.Market.SETTLE_PRICE] - previous_data[Table.Market.SETTLE_PRICE]
+                    rolls.append((date, gap, previous_contract, code))
+                    term_structure.remove(previous_contract)
+                    gap_sum += gap
+                    contract = code
+
+                rows.append((code,) + tuple(contract_data[1:]))
+                gaps.append(gap_sum)
+                previous_contract = code
+
+        return rows, gaps, rolls
 
     def margin(self, end_date, point_value):
         """
@@ -156,28 +217,27 @@ class CustomSeries(MarketSeries):
         :return:            number representing margin
         """
         contract = self.scheduled_roll(end_date)[Table.ContractRoll.ROLL_IN_CONTRACT]
-        contract_data = [d for d in self.__contracts[contract] if d[Table.Market.PRICE_DATE] <= end_date]
-        price = contract_data[-1][Table.Market.SETTLE_PRICE] if len(contract_data) else None
+        contract_data = self.__term_structure.record(contract, end_date)
+        price = contract_data[Table.Market.SETTLE_PRICE] if contract_data else None
         return price * point_value * 0.1
 
-    def __schedule_rolls(self):
+    def __schedule_rolls(self, contract_keys):
         """
-        Schedule rolls based on contracts available and roll schedule
+        Schedule rolls based on contracts available and roll schedule;
+        only the scheduled contracts are kept
+
+        :param contract_keys:   codes of the contracts available
         """
         scheduled_months = [r[RollSchedule.ROLL_OUT_MONTH] for r in self.__roll_schedule]
         scheduled_codes = [k for k in self._delivery_months.keys() if self._delivery_months[k][1] in scheduled_months]
-        contract_keys = sorted(self.__contracts.keys())
-        contract_codes = [c for c in [k for k in contract_keys] if c[-1] in scheduled_codes]
+        contract_codes = [c for c in sorted(contract_keys) if c[-1] in scheduled_codes]
 
-        self.__scheduled_rolls = [(self.__scheduled_roll_date(r[0], self._delivery_months), 0, r[0], r[1])
-                                  for r in zip(contract_codes, contract_codes[1:])]
+        self.__roll_calendar = RollCalendar((self.__scheduled_roll_date(r[0], self._delivery_months), 0, r[0], r[1])
+                                            for r in zip(contract_codes, contract_codes[1:]))
 
         self.__rolls.append(self.scheduled_roll(self._start_data_date))
 
-        for key in contract_keys:
-            key not in contract_codes and self.__contracts.pop(key, None)
-
-        self.__contract_keys = sorted(self.__contracts.keys())
+        self.__contract_keys = contract_codes
 
     def scheduled_roll(self, date):
         """
@@ -186,12 +246,17 @@ class CustomSeries(MarketSeries):
         :param date:    date of the scheduled roll
         :return:        scheduled roll (date, gap, roll-out-contract, roll-in-contract)
         """
-        contract_rolls = [r for r in zip(self.__scheduled_rolls, self.__scheduled_rolls[1:])
-                          if r[0][Table.ContractRoll.DATE] <= date < r[1][Table.ContractRoll.DATE]]
-        contract_roll = contract_rolls[0][0] if len(contract_rolls) == 1 \
-            else (self.__scheduled_rolls[0] if date < self.__scheduled_rolls[0][Table.ContractRoll.DATE] else self.__scheduled_rolls[-1])
+        return self.__roll_calendar.roll(date)
 
-        return contract_roll
+    def next_scheduled_roll(self, date, days):
+        """
+        Return the first scheduled roll after the date passed in, if it is due within the number of days
+
+        :param date:    date to look from
+        :param days:    number of days to look ahead
+        :return:        scheduled roll (date, gap, roll-out-contract, roll-in-contract), or None
+        """
+        return self.__roll_calendar.next_roll(date, days)
 
     def __scheduled_roll_date(self, contract, delivery_months):
         """
@@ -211,46 +276,33 @@ class CustomSeries(MarketSeries):
         roll_year = contract_year if contract_month_index - roll_month_index > -1 else contract_year - 1
         return dt.date(roll_year, roll_month_index, int(roll_schedule[RollSchedule.DAY]))
 
-    def __optimal_contract(self, date):
+    def __optimal_contract(self, date, last_contract, term_structure):
         """
         Return optimal contract to roll into
         
-        :param date:    date of the contract
-        :return:        string symbol representing contract code
+        :param date:            date of the contract
+        :param last_contract:   code of the latest rolled-in contract
+        :param term_structure:  TermStructure of the contracts not rolled out of yet
+        :return:                string symbol representing contract code
         """
-        last_contract = self.__rolls[-1][Table.ContractRoll.ROLL_IN_CONTRACT]
-        contract_rolls = [r for r in self.__scheduled_rolls if r[Table.ContractRoll.ROLL_OUT_CONTRACT] == last_contract]
+        contract_roll = self.__roll_calendar.roll_out(last_contract)
         optimal_contracts = []
 
-        if len(contract_rolls) and contract_rolls[-1][Table.ContractRoll.DATE] <= date:
-            yield_curve = self.__yield_curve(date, last_contract)
+        if contract_roll and contract_roll[Table.ContractRoll.DATE] <= date:
+            yield_curve = self.__yield_curve(date, last_contract, term_structure)
             optimal_contracts = [c for c in yield_curve if c[YieldCurve.VOLUME] >= self.__optimal_volume]
             optimal_contracts = optimal_contracts if len(optimal_contracts) else sorted(yield_curve, key=itemgetter(2))
 
         return optimal_contracts[-1][YieldCurve.CODE] if len(optimal_contracts) else last_contract
 
-    def __yield_curve(self, date, contract_code):
+    def __yield_curve(self, date, contract_code, term_structure):
         """
         Calculate yield curve relative to the date passed in
 
         :param contract_code:   code of current code
         :param date:            date to which relate the yield curve
+        :param term_structure:  TermStructure of the contracts not rolled out of yet
         :return:                list of tuples(code, price, volume, yield, relative-price-difference, days))
         """
-        contract_data = [c for c in self.__contracts[contract_code] if c[Table.Market.PRICE_DATE] <= date][-1]
-        contract_codes = [k for k in self.__contract_keys if k > contract_code]
-        previous_price = contract_data[Table.Market.SETTLE_PRICE] if contract_data else 0
-        curve = []
-
-        for code in contract_codes:
-            next_contract_data = [c for c in self.__contracts[code] if c[Table.Market.PRICE_DATE] <= date]
-            if len(next_contract_data) and next_contract_data[-1][Table.Market.LAST_TRADING_DAY] > date:
-                next_contract = next_contract_data[-1]
-                days = (next_contract[Table.Market.LAST_TRADING_DAY] - date).days
-                price = next_contract[Table.Market.SETTLE_PRICE]
-                implied_yield = (price / contract_data[Table.Market.SETTLE_PRICE]) ** (365. / days) - 1
-                price_difference = price - previous_price
-                previous_price = price
-                curve.append((code, price, next_contract[Table.Market.VOLUME], implied_yield, price_difference, days))
-
-        return curve
+        contract_codes = self.__contract_keys[bisect_right(self.__contract_keys, contract_code):]
+        return term_structure.curve(date, contract_code, contract_codes)
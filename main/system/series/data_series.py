@@ -1,25 +1,41 @@
 #!/usr/bin/python
 
-import sys
 import json
 import datetime as dt
 from enum import Table
 from currency_pair import CurrencyPair
 from interest_rate import InterestRate
 from market import Market
+from trading_calendar import TradingCalendar
+from progress import Progress
 from series.norgate_series import NorgateSeries
 from series.custom_series import CustomSeries
+from series.series_cache import SeriesCache
+from data.bulk_data_source import BulkDataSource
 
 
 class DataSeries:
 
-    def __init__(self, investment_universe, connection, study_parameters):
+    def __init__(self, investment_universe, data_source, study_parameters, bulk=True, cache_path=None):
+        """
+        :param investment_universe: InvestmentUniverse of the markets
+        :param data_source:         DataSource to load the data from
+        :param study_parameters:    list of dicts with studies' parameters
+        :param bulk:                flag indicating if series of all markets, currency pairs and interest rates
+                                    should be loaded in bulk, instead of item by item
+        :param cache_path:          optional path to directory caching constructed continuous series of the markets,
+                                    currency and interest rates
+        """
         self.__investment_universe = investment_universe
-        self.__connection = connection
+        self.__data_source = data_source
+        self.__bulk = bulk
+        self.__cache = SeriesCache(cache_path) if cache_path else None
         self.__futures = None
         self.__currency_pairs = None
         self.__interest_rates = None
+        self.__trading_calendar = None
         self.__study_parameters = study_parameters
+        self.__loaded = False
 
     def start_date(self):
         """
@@ -41,19 +57,6 @@ class DataSeries:
         :return:                    list of Market objects
         """
         if self.__futures is None:
-            cursor = self.__connection.cursor()
-            market_query = """
-                SELECT
-                  name,
-                  code,
-                  data_codes,
-                  currency,
-                  tick_value,
-                  point_value,
-                  overnight_initial_margin
-                FROM market 
-                WHERE id = '%s';
-            """
             start_data_date = self.__investment_universe.start_data_date()
             self.__futures = []
 
@@ -66,10 +69,11 @@ class DataSeries:
                 if roll_strategy[Table.RollStrategy.PARAMS] else None,
             )
 
-            for market_id in self.__investment_universe.market_ids():
+            market_ids = self.__investment_universe.market_ids()
+            markets = self.__data_source.markets(market_ids) if self.__bulk else {}
+            for market_id in market_ids:
             # for market_id in [10, 15, 74, 94]:  # 10=CC, 13=KC, 15=LCC, 74=LES, 94=SI, 96=YI, 26=LWB
             # for market_id in [15, 74]:  # 10=CC, 13=KC, 15=LCC, 74=LES, 94=SI, 96=YI, 26=LWB
-                cursor.execute(market_query % market_id)
                 self.__futures.append(Market(
                     int(market_id),
                     slippage_map,
@@ -80,9 +84,10 @@ class DataSeries:
                         position_sizing,
                         volatility_type,
                         volatility_lookback,
-                        use_ew_correlation
+                        use_ew_correlation,
+                        self.__cache
                     ),
-                    *cursor.fetchone())
+                    *markets.get(int(market_id)) or self.__data_source.market(market_id))
                 )
 
         return self.__futures
@@ -96,17 +101,11 @@ class DataSeries:
         :return:                    list of CurrencyPair objects
         """
         if self.__currency_pairs is None:
-            cursor = self.__connection.cursor()
-            cursor.execute("""
-                SELECT c.id, c.code, c.name, c.first_data_date
-                FROM currency_pairs as c INNER JOIN `group` as g ON c.group_id = g.id
-                WHERE g.name = 'Primary';
-            """)
             start_data_date = self.__investment_universe.start_data_date()
             futures_currencies = list(set([f.currency() for f in self.__futures] + [base_currency, commission_currency]))
             futures_currency_pairs = ['%s%s' % (base_currency, c) for c in futures_currencies if c != base_currency]
-            futures_currency_data = [c for c in cursor.fetchall() if c[1] in futures_currency_pairs]
-            self.__currency_pairs = [CurrencyPair(start_data_date, *c) for c in futures_currency_data]
+            futures_currency_data = [c for c in self.__data_source.currency_pairs() if c[1] in futures_currency_pairs]
+            self.__currency_pairs = [CurrencyPair(start_data_date, *c, cache=self.__cache) for c in futures_currency_data]
 
         return self.__currency_pairs
 
@@ -119,26 +118,28 @@ class DataSeries:
         :return:                    list of InterestDate objects
         """
         if self.__interest_rates is None:
-            cursor = self.__connection.cursor()
-            cursor.execute("""
-                SELECT c.id, c.code
-                FROM `currencies` as c INNER JOIN `group` as g ON c.group_id = g.id
-                WHERE g.name = 'Majors'
-            """)
             start_data_date = self.__investment_universe.start_data_date()
             futures_currencies = list(set([f.currency() for f in self.__futures] + [base_currency, commission_currency]))
-            futures_currency_data = [c for c in cursor.fetchall() if c[1] in futures_currencies]
-            self.__interest_rates = [InterestRate(start_data_date, *r) for r in futures_currency_data]
+            futures_currency_data = [c for c in self.__data_source.currencies() if c[1] in futures_currencies]
+            self.__interest_rates = [InterestRate(start_data_date, *r, cache=self.__cache) for r in futures_currency_data]
 
         return self.__interest_rates
 
+    def trading_calendar(self):
+        """
+        Return trading calendar of the loaded futures
+
+        :return:    TradingCalendar, or None if the data are not loaded yet
+        """
+        return self.__trading_calendar
+
     def update_futures_data(self, date):
         """
-        Update futures data and their studies
+        Update data of futures trading on the date passed in
         
         :param date:    date of the data to update
         """
-        map(lambda f: f.update_data(date), self.__futures)
+        map(lambda f: f.update_data(date), self.__trading_futures(date))
 
     def update_futures_studies(self, date):
         """
@@ -146,36 +147,50 @@ class DataSeries:
         
         :param date:    date of the data to update
         """
-        map(lambda f: f.update_studies(date), self.__futures)
+        map(lambda f: f.update_studies(date), self.__trading_futures(date))
 
     def load(self, end_date, roll_strategy_id):
         """
-        Load data and calculate studies
+        Load data and calculate studies, unless already loaded
 
         :param end_date:            last date to load data
         :param roll_strategy_id:    ID of the series roll strategy
         """
-        cursor = self.__connection.cursor()
-        cursor.execute("SELECT code, short_name FROM `delivery_month`;")
-        delivery_months = {i[1][0]: (i[0] + 1, i[1][1]) for i in enumerate(cursor.fetchall())}
+        if self.__loaded:
+            return
+
+        delivery_months = {i[1][0]: (i[0] + 1, i[1][1]) for i in enumerate(self.__data_source.delivery_months())}
+        data_source = BulkDataSource(
+            self.__data_source,
+            [(f.id(), f.code()) for f in self.__futures],
+            [c.id() for c in self.__currency_pairs],
+            [r.id() for r in self.__interest_rates]
+        ) if self.__bulk else self.__data_source
 
-        message = 'Loading Futures data ...'
-        length = float(len(self.__futures))
-        map(lambda i: self.__log(message, i[1].code(), i[0], length)
-                      and i[1].load_data(self.__connection, end_date, delivery_months, roll_strategy_id), enumerate(self.__futures))
-        self.__log(message, complete=True)
+        progress = Progress('Loading Futures data', len(self.__futures))
+        map(lambda i: progress.update(i[0], i[1].code())
+                      and i[1].load_data(data_source, end_date, delivery_months, roll_strategy_id), enumerate(self.__futures))
+        progress.complete()
 
-        message = 'Loading currency pairs data ...'
-        length = float(len(self.__currency_pairs))
-        map(lambda i: self.__log(message, i[1].code(), i[0], length) and i[1].load_data(self.__connection, end_date),
+        progress = Progress('Loading currency pairs data', len(self.__currency_pairs))
+        map(lambda i: progress.update(i[0], i[1].code()) and i[1].load_data(data_source, end_date),
             enumerate(self.__currency_pairs))
-        self.__log(message, complete=True)
+        progress.complete()
 
-        message = 'Loading interest rates data ...'
-        length = float(len(self.__interest_rates))
-        map(lambda i: self.__log(message, i[1].code(), i[0], length) and i[1].load_data(self.__connection, end_date),
+        progress = Progress('Loading interest rates data', len(self.__interest_rates))
+        map(lambda i: progress.update(i[0], i[1].code()) and i[1].load_data(data_source, end_date),
             enumerate(self.__interest_rates))
-        self.__log(message, complete=True)
+        progress.complete()
+
+        start_date = self.__investment_universe.start_data_date()
+        self.__trading_calendar = TradingCalendar(
+            start_date,
+            end_date,
+            {f.id(): f.date_ordinals() for f in self.__futures},
+            data_source.holidays([f.id() for f in self.__futures], start_date, end_date)
+        )
+
+        self.__loaded = True
 
     def study_parameters(self):
         """
@@ -184,20 +199,11 @@ class DataSeries:
         """
         return self.__study_parameters
 
-    def __log(self, message, code='', index=0, length=0.0, complete=False):
+    def __trading_futures(self, date):
         """
-        Print message and percentage progress to console
+        Return futures trading on the date passed in
 
-        :param message:     Message to print
-        :param index:       Index of the item being processed
-        :param length:      Length of the whole range
-        :param complete:    Flag indicating if the progress is complete
-        :return:            boolean
+        :param date:    date of the trading
+        :return:        list of Market objects
         """
-        sys.stdout.write('%s\r' % (' ' * 80))
-        if complete:
-            sys.stdout.write('%s complete\r\n' % message)
-        else:
-            sys.stdout.write('%s %s (%d of %d) [%d %%]\r' % (message, code, index, length, index / length * 100))
-        sys.stdout.flush()
-        return True
+        return [f for f in self.__futures if self.__trading_calendar.is_trading(f.id(), date)]
@@ -2,12 +2,10 @@
 
 import json
 import datetime as dt
-from enum import Table
 from enum import PositionSizing
-from operator import itemgetter
-from collections import deque
-from collections import defaultdict
 from data.market_correlation import MarketCorrelationProxy
+from series.columns import PriceColumns
+from series.study_engine import StudyEngine
 from abc import ABCMeta, abstractmethod
 
 
@@ -23,17 +21,12 @@ class MarketSeries(object):
         self.__volatility_lookback = volatility_lookback
         self.__use_ew_correlation = use_ew_correlation
 
-        self._prices = []
-        self._price_indexes = {}
+        self._prices = PriceColumns()
 
-        self._correlations = []
-        self._correlation_indexes = {}
+        self._market_id = None
+        self._correlations = None
 
-        self.__study_parameters = study_parameters
-        self.__studies = defaultdict(list)
-        self.__study_data = {}
-        self.__study_indexes = defaultdict(dict)
-        self.__has_study_data = False
+        self._studies = StudyEngine(study_parameters)
 
         self._delivery_months = {}
 
@@ -44,8 +37,16 @@ class MarketSeries(object):
         :param date:    date of the required data
         :return:        tuple representing one day record
         """
-        index = self._price_indexes[date] if date in self._price_indexes else None
-        return (self._prices[index], self._prices[index-1]) if index else (None, None)
+        index = self._prices.index(date)
+        return (self._prices.row(index), self._prices.row(index-1)) if index else (None, None)
+
+    def date_ordinals(self):
+        """
+        Return dates of the series' price records as day ordinals
+
+        :return:    numpy array
+        """
+        return self._prices.date_ordinals()
 
     def data_range(self, start_date, end_date):
         """
@@ -55,19 +56,25 @@ class MarketSeries(object):
         :param end_date:    end date of the data
         :return:            list of data
         """
-        return [d for d in self._prices if start_date <= d[Table.Market.PRICE_DATE] <= end_date]
+        return self._prices.range(start_date, end_date)
 
     def correlation(self, date):
         """
-        Find and return series volatility to the date and correlation with the other market, which ID is passed in
+        Find and return series volatility and correlations with other markets effective on the date passed in
         
         :param date:        date of the correlation record
-        :return:            tuple(date, volatility number, and JSON(correlation dict))
+        :return:            tuple(date, volatility number, and array of correlations indexed by 'correlation_index'
+                            of the other markets), or None
+        """
+        return self._correlations.record(self._market_id, date, self._start_data_date) if self._correlations is not None else None
+
+    def correlation_index(self):
         """
-        index = self._correlation_indexes[date] if date in self._correlation_indexes else None
-        return self._correlations[index] if index \
-            else ([c for c in self._correlations if c[Table.MarketCorrelation.DATE] <= date][-1]
-                  if len(self._correlations) and self._correlations[0][Table.MarketCorrelation.DATE] <= date else None)
+        Return index of the series market in correlations of other markets
+
+        :return:    int
+        """
+        return self._correlations.market_index(self._market_id) if self._correlations is not None else None
 
     def study(self, study_name, date=None):
         """
@@ -77,9 +84,9 @@ class MarketSeries(object):
         :param date:        last date of data required
         :return:            List of tuples - records of study specified
         """
-        index = (self.__study_indexes[study_name][date] if date in self.__study_indexes[study_name] else None) \
-            if date else len(self.__study_indexes[study_name]) - 1
-        return self.__studies[study_name][index] if index > -1 else None
+        study = self._studies.study(study_name)
+        index = (study.index(date) if date else len(study) - 1) if study is not None else None
+        return study.row(index) if index is not None and index > -1 else None
 
     def study_range(self, study_name, start_date, end_date):
         """
@@ -90,7 +97,8 @@ class MarketSeries(object):
         :param end_date:    end date of the data range
         :return:            list of tuple(date, value, value_2)
         """
-        return [s for s in self.__studies[study_name] if start_date <= s[Table.Study.DATE] <= end_date]
+        study = self._studies.study(study_name)
+        return study.range(start_date, end_date) if study is not None else []
 
     @abstractmethod
     def update_data(self, date):
@@ -107,46 +115,7 @@ class MarketSeries(object):
         
         :param date:    date of the update
         """
-        if date in self._price_indexes:
-            index = self._price_indexes[date]
-            market_data = self._prices[index]
-            settle_price = market_data[Table.Market.SETTLE_PRICE]
-            previous_settle = self._prices[index-1][Table.Market.SETTLE_PRICE] if index else settle_price
-            volume = market_data[Table.Market.VOLUME]
-            tr = max(market_data[Table.Market.HIGH_PRICE], previous_settle) - min(market_data[Table.Market.LOW_PRICE], previous_settle)
-            ret_sq = (settle_price - previous_settle) ** 2 if index else None
-            study_data_keys = set('%s:%s' % (self.__study_column(p['name'], p['columns'][-1]), p['window']) for p in self.__study_parameters)
-            l = locals()
-            for key in study_data_keys:
-                column, window = key.split(':')
-                l[column] is not None and self.__study_data['%s_%s' % (column, window)].append(l[column])
-
-            has_study = []
-            for params in self.__study_parameters:
-                window = params['window']
-                study_type = params['study']
-                study_name = params['name']
-                study = self.__studies[study_name]
-                data_columns = params['columns'][1:]
-                column = self.__study_column(study_name, data_columns[-1])
-                study_data = self.__study_data['%s_%s' % (column, window)]
-
-                if study_type == 'SMA':
-                    study.append((date, sum(study_data) / len(study_data)))
-
-                if l[column] is not None and study_type == 'EMA' or study_type == 'ATR':
-                    c = 2.0 / (window + 1)
-                    ma = study[-1][1] if len(study) else (sum(study_data) / len(study_data))
-                    study.append((date, (c * l[column]) + (1 - c) * ma))
-
-                if study_type == 'HHLL':
-                    study.append((date, max(study_data), min(study_data)))
-
-                self.__study_indexes[study_name][date] = len(study) - 1
-
-                has_study.append(len(study) >= window)
-
-            self.__has_study_data = all(has_study)
+        self._studies.update(date, self._prices)
 
     def has_study_data(self):
         """
@@ -154,13 +123,13 @@ class MarketSeries(object):
         
         :return:    boolean
         """
-        return self.__has_study_data
+        return self._studies.has_data()
 
-    def load(self, connection, end_date, delivery_months, market_id, market_code, roll_strategy_id):
+    def load(self, data_source, end_date, delivery_months, market_id, market_code, roll_strategy_id):
         """
         Load series data
 
-        :param connection:          MySQLdb connection instance
+        :param data_source:         DataSource instance
         :param end_date:            Last date to fetch data to
         :param delivery_months:     list of delivery months [(code, short-month-name)]
         :param market_id:           ID of the series market
@@ -168,30 +137,21 @@ class MarketSeries(object):
         :param roll_strategy_id:    ID of the series roll strategy
         """
         self._delivery_months = delivery_months
+        self._market_id = market_id
 
-        study_data_keys = set('%s:%s' % (self.__study_column(p['name'], p['columns'][-1]), p['window']) for p in self.__study_parameters)
-        for key in study_data_keys:
-            column, window = key.split(':')
-            self.__study_data['%s_%s' % (column, window)] = deque([], int(window))
+        self._studies.reset()
 
         if self.__position_sizing != PositionSizing.RISK_FACTOR:
-            # self._correlations, self._correlation_indexes = MarketCorrelationProxy.from_db(
-            #     connection,
-            #     market_id,
-            #     market_code,
-            #     self._start_data_date,
-            #     end_date,
-            #     self.__volatility_type,
-            #     self.__volatility_lookback,
-            #     self.__use_ew_correlation
-            # )
-            self._correlations, self._correlation_indexes = MarketCorrelationProxy.from_files(
-                market_code,
+            self._correlations = MarketCorrelationProxy.from_cube(
                 self.__volatility_lookback,
-                self._start_data_date,
-                end_date
+                self.__volatility_type,
+                self.__use_ew_correlation
             )
-            # MarketCorrelationProxy.dump(market_code, self.__volatility_lookback, self._correlations)
+            if self._correlations.market_index(market_id) is None:
+                raise KeyError("Market '%s' (ID %s) is missing in the correlation cube of lookback %s (%s%s)" % (
+                    market_code, market_id, self.__volatility_lookback,
+                    self.__volatility_type, ', EW' if self.__use_ew_correlation else ''
+                ))
 
     def contract_distance(self, contract, next_contract):
         """
@@ -260,6 +220,17 @@ class MarketSeries(object):
         """
         raise NotImplementedError("Should implement 'scheduled_roll()'")
 
+    @abstractmethod
+    def next_scheduled_roll(self, date, days):
+        """
+        Return the first scheduled roll after the date passed in, if it is due within the number of days
+
+        :param date:    date to look from
+        :param days:    number of days to look ahead
+        :return:        scheduled roll (date, gap, roll-out-contract, roll-in-contract), or None
+        """
+        raise NotImplementedError("Should implement 'next_scheduled_roll()'")
+
     @abstractmethod
     def margin(self, end_date, point_value):
         """
@@ -270,30 +241,3 @@ class MarketSeries(object):
         :return:            number representing margin
         """
         raise NotImplementedError("Should implement 'margin(end_date, point_value)'")
-
-    def _column_names(self):
-        """
-        Construct and return column names sorted by their index in ENUM
-
-        :return:    string
-        """
-        columns = {
-            'code': Table.Market.CODE,
-            'price_date': Table.Market.PRICE_DATE,
-            'open_price': Table.Market.OPEN_PRICE,
-            'high_price': Table.Market.HIGH_PRICE,
-            'low_price': Table.Market.LOW_PRICE,
-            'settle_price': Table.Market.SETTLE_PRICE,
-            'volume': Table.Market.VOLUME
-        }
-        return ', '.join([i[0] for i in sorted(columns.items(), key=itemgetter(1))])
-
-    def __study_column(self, study_name, default_column):
-        """
-        Find and return column name based on study name, otherwise return default column name
-        
-        :param study_name:      name of a study
-        :param default_column:  name of default columns
-        :return:                string representing column name
-        """
-        return {'atr_long': 'tr', 'atr_short': 'tr', 'variance_price': 'ret_sq'}.get(study_name, default_column)
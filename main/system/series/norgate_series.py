@@ -2,11 +2,12 @@
 
 from enum import Table
 from series.market_series import MarketSeries
+from series.series_cache import SeriesCache
 
 
 class NorgateSeries(MarketSeries):
 
-    def __init__(self, start_data_date, study_parameters, roll_strategy, position_sizing, volatility_type, volatility_lookback, use_ew_correlation):
+    def __init__(self, start_data_date, study_parameters, roll_strategy, position_sizing, volatility_type, volatility_lookback, use_ew_correlation, cache=None):
         super(NorgateSeries, self).__init__(
             start_data_date,
             study_parameters,
@@ -17,49 +18,56 @@ class NorgateSeries(MarketSeries):
             use_ew_correlation
         )
 
+        self.__cache = cache
+
     def update_data(self, date):
         pass
 
-    def load(self, connection, end_date, delivery_months, market_id, market_code, roll_strategy_id):
+    def load(self, data_source, end_date, delivery_months, market_id, market_code, roll_strategy_id):
         """
         Load market's data
 
-        :param connection:          MySQLdb connection instance
+        :param data_source:         DataSource instance
         :param end_date:            Last date to fetch data to
         :param delivery_months:     list of delivery months [(code, short-month-name)]
         :param market_id:           ID of the series market
         :param market_code:         code symbol of the series market
         :param roll_strategy_id:    ID of the series roll strategy
         """
-        super(NorgateSeries, self).load(connection, end_date, delivery_months, market_id, market_code, roll_strategy_id)
-
-        cursor = connection.cursor()
-        continuous_query = """
-            SELECT %s
-            FROM %s
-            WHERE market_id = '%s'
-            AND code = '%s'
-            AND roll_strategy_id = '%s'
-            AND DATE(price_date) >= '%s'
-            AND DATE(price_date) <= '%s'
-            ORDER BY price_date;
-        """
-        cursor.execute(continuous_query % (
-            self._column_names(),
-            'continuous_adjusted',
-            market_id,
-            market_code,
-            roll_strategy_id,
-            self._start_data_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        ))
+        super(NorgateSeries, self).load(data_source, end_date, delivery_months, market_id, market_code, roll_strategy_id)
+
+        source_version = data_source.version() if self.__cache else None
+        prices = None if source_version else self.__continuous_prices(data_source, end_date, market_id, market_code, roll_strategy_id)
+        version = SeriesCache.version(self._start_data_date, end_date, source_version or prices) if self.__cache else None
+
+        if not self.__cache or self.__cache.open(market_id, roll_strategy_id, version, self._prices) is None:
+            self._prices.extend(prices if prices is not None
+                                else self.__continuous_prices(data_source, end_date, market_id, market_code, roll_strategy_id))
+
+            if self.__cache:
+                self.__cache.save(market_id, roll_strategy_id, version, self._prices)
+                self.__cache.open(market_id, roll_strategy_id, version, self._prices)
+
+        self._studies.compute(self._prices)
+
+        return True
+
+    def __continuous_prices(self, data_source, end_date, market_id, market_code, roll_strategy_id):
+        """
+        Fetch market's continuous prices on workdays
+
+        :param data_source:         DataSource instance
+        :param end_date:            Last date to fetch data to
+        :param market_id:           ID of the series market
+        :param market_code:         code symbol of the series market
+        :param roll_strategy_id:    ID of the series roll strategy
+        :return:                    list of tuples(code, date, open, high, low, settle, volume)
+        """
+        prices = data_source.continuous_prices(market_id, market_code, roll_strategy_id, self._start_data_date, end_date)
         # This may cut 'weekend' dates, but those may be legit in markets in different time-zones (Asia, etc.)
         # TODO implement trading-hours to check properly
         workdays = range(1, 6)
-        self._prices = [p for p in cursor.fetchall() if p[Table.Market.PRICE_DATE].isoweekday() in workdays]
-        self._price_indexes = {i[1][Table.Market.PRICE_DATE]: i[0] for i in enumerate(self._prices)}
-
-        return True
+        return [p for p in prices if p[Table.Market.PRICE_DATE].isoweekday() in workdays]
 
     # TODO actually implement margin multiplier, but with contract data?
     def margin(self, end_date, point_value):
@@ -70,7 +78,7 @@ class NorgateSeries(MarketSeries):
         :param point_value: point value of the market instrument
         :return:            number representing margin
         """
-        return self._prices[-1][Table.Market.SETTLE_PRICE] * point_value * 0.1
+        return self._prices.settle_price(-1) * point_value * 0.1
 
     def contract(self, date):
         """
@@ -121,3 +129,13 @@ class NorgateSeries(MarketSeries):
         :return string: contract symbol
         """
         return None
+
+    def next_scheduled_roll(self, date, days):
+        """
+        Return 'None' since the continuous series doesn't have scheduled rolls
+
+        :param date:    date to look from
+        :param days:    number of days to look ahead
+        :return:        None
+        """
+        return None
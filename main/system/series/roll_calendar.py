@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+from enum import Table
+from bisect import bisect_right
+
+
+class RollCalendar(object):
+    """
+    Scheduled contract rolls compiled into sorted roll dates, with the matching roll-out and roll-in contracts.
+    A roll is in effect from its date until the date of the next roll; dates before the first roll resolve
+    into the first roll and dates after the last roll into the last one.
+    """
+
+    def __init__(self, rolls=()):
+        """
+        :param rolls:   list of tuples(date, gap, roll-out-contract, roll-in-contract), in contract order
+        """
+        self.__rolls = list(rolls)
+        self.__dates = [r[Table.ContractRoll.DATE] for r in self.__rolls]
+        self.__sorted = self.__dates == sorted(self.__dates)
+        self.__roll_outs = {r[Table.ContractRoll.ROLL_OUT_CONTRACT]: r for r in self.__rolls}
+
+    def __len__(self):
+        return len(self.__rolls)
+
+    def rolls(self):
+        """
+        Return all scheduled rolls
+
+        :return:    list of tuples(date, gap, roll-out-contract, roll-in-contract)
+        """
+        return self.__rolls
+
+    def roll(self, date):
+        """
+        Return scheduled roll in effect on the date passed in
+
+        :param date:    date to resolve
+        :return:        tuple(date, gap, roll-out-contract, roll-in-contract)
+        """
+        if not self.__sorted:
+            return self.__scan(date)
+
+        index = bisect_right(self.__dates, date) - 1
+        return self.__rolls[index if index > -1 else 0]
+
+    def next_roll(self, date, days):
+        """
+        Return the first scheduled roll dated after the date passed in, within number of days passed in
+
+        :param date:    date to look from
+        :param days:    number of days to look ahead
+        :return:        tuple(date, gap, roll-out-contract, roll-in-contract), or None if no roll is due
+        """
+        rolls = self.__rolls[bisect_right(self.__dates, date):] if self.__sorted \
+            else sorted([r for r in self.__rolls if r[Table.ContractRoll.DATE] > date], key=lambda r: r[Table.ContractRoll.DATE])
+        return rolls[0] if len(rolls) and (rolls[0][Table.ContractRoll.DATE] - date).days <= days else None
+
+    def roll_out(self, contract):
+        """
+        Return the scheduled roll out of the contract passed in
+
+        :param contract:    code of the contract
+        :return:            tuple(date, gap, roll-out-contract, roll-in-contract), or None if there is no such roll
+        """
+        return self.__roll_outs.get(contract)
+
+    def __scan(self, date):
+        """
+        Find scheduled roll in effect on the date passed in by scanning all rolls,
+        used when the roll dates are out of order and can't be bisected
+
+        :param date:    date to resolve
+        :return:        tuple(date, gap, roll-out-contract, roll-in-contract)
+        """
+        contract_rolls = [r for r in zip(self.__rolls, self.__rolls[1:])
+                          if r[0][Table.ContractRoll.DATE] <= date < r[1][Table.ContractRoll.DATE]]
+        return contract_rolls[0][0] if len(contract_rolls) == 1 \
+            else (self.__rolls[0] if date < self.__rolls[0][Table.ContractRoll.DATE] else self.__rolls[-1])
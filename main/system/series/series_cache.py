@@ -0,0 +1,147 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import hashlib
+import cPickle as pickle
+
+
+class SeriesCache(object):
+    """
+    Constructed series saved in directories of a cache directory, keyed by market, roll strategy
+    and version of the data they were constructed from -- a change in the data makes a new version.
+    Currency and interest rates are cached the same way, keyed by their name and version.
+
+    Price columns of the series, and optionally of the contracts it was constructed from, and rate columns
+    are saved as '.npy' files and memory-mapped when opened, so all simulation processes opening the same series
+    share one copy of them in OS page cache.
+    """
+
+    # Layout of the cached files, part of every version -- a change in the layout makes new versions
+    FORMAT = 2
+
+    def __init__(self, path):
+        """
+        :param path:    path to the cache directory, created if it doesn't exist
+        """
+        self.__path = path
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @staticmethod
+    def version(*data):
+        """
+        Return version (digest) of the data passed in
+
+        :param data:    any data with deterministic representation (tuples, lists, dicts, dates, numbers, strings)
+        :return:        string
+        """
+        return hashlib.sha1(repr((SeriesCache.FORMAT,) + data)).hexdigest()
+
+    def open(self, market_id, roll_strategy_id, version, prices, contracts=None):
+        """
+        Memory-map price columns of the cached series into the PriceColumns passed in
+
+        :param market_id:           ID of the series market
+        :param roll_strategy_id:    ID of the series roll strategy
+        :param version:             version of the data the series was constructed from
+        :param prices:              PriceColumns to map the cached columns into
+        :param contracts:           optional PriceColumns to map the cached contract columns into
+        :return:                    other data cached with the series (e.g. rolls), or None if there is no such series
+        """
+        directory = self.__directory(market_id, roll_strategy_id, version)
+        if not os.path.isdir(directory):
+            return None
+
+        prices.mmap(directory)
+        if contracts is not None:
+            contracts.mmap(os.path.join(directory, 'contracts'))
+
+        f = open(os.path.join(directory, 'data.pkl'), 'rb')
+        data = pickle.load(f)
+        f.close()
+
+        return data
+
+    def save(self, market_id, roll_strategy_id, version, prices, data=(), contracts=None):
+        """
+        Save series into the cache; written into temporary directory first,
+        so concurrent processes never open partially written series
+
+        :param market_id:           ID of the series market
+        :param roll_strategy_id:    ID of the series roll strategy
+        :param version:             version of the data the series was constructed from
+        :param prices:              PriceColumns of the series
+        :param data:                other data of the series to cache (e.g. rolls)
+        :param contracts:           optional PriceColumns of the contracts the series was constructed from
+        """
+        directory = self.__directory(market_id, roll_strategy_id, version)
+        temp_directory = '%s.%s' % (directory, os.getpid())
+        os.makedirs(temp_directory)
+
+        prices.save(temp_directory)
+        if contracts is not None:
+            os.makedirs(os.path.join(temp_directory, 'contracts'))
+            contracts.save(os.path.join(temp_directory, 'contracts'))
+
+        f = open(os.path.join(temp_directory, 'data.pkl'), 'wb')
+        pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        f.close()
+
+        self.__commit(temp_directory, directory)
+
+    def open_rates(self, name, version, rates):
+        """
+        Memory-map cached rate columns (of currency pair or interest rate) into the RateColumns passed in
+
+        :param name:    name of the rates (e.g. 'currency_pair_1')
+        :param version: version of the data the rates were loaded from
+        :param rates:   RateColumns to map the cached columns into
+        :return:        boolean flag indicating if the rates are cached
+        """
+        directory = os.path.join(self.__path, '%s_%s' % (name, version))
+        if not os.path.isdir(directory):
+            return False
+
+        rates.mmap(directory)
+        return True
+
+    def save_rates(self, name, version, rates):
+        """
+        Save rate columns into the cache
+
+        :param name:    name of the rates (e.g. 'currency_pair_1')
+        :param version: version of the data the rates were loaded from
+        :param rates:   RateColumns to save
+        """
+        directory = os.path.join(self.__path, '%s_%s' % (name, version))
+        temp_directory = '%s.%s' % (directory, os.getpid())
+        os.makedirs(temp_directory)
+
+        rates.save(temp_directory)
+        self.__commit(temp_directory, directory)
+
+    def __commit(self, temp_directory, directory):
+        """
+        Rename fully written temporary directory to its final name
+
+        :param temp_directory:  path of the written directory
+        :param directory:       path of the cached data
+        """
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:
+            # Other process saved the same data first
+            shutil.rmtree(temp_directory)
+
+    def __directory(self, market_id, roll_strategy_id, version):
+        """
+        Return name of the directory the series is cached in
+
+        :param market_id:           ID of the series market
+        :param roll_strategy_id:    ID of the series roll strategy
+        :param version:             version of the data the series was constructed from
+        :return:                    string
+        """
+        return os.path.join(self.__path, '%s_%s_%s' % (market_id, roll_strategy_id, version))
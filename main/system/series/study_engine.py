@@ -0,0 +1,237 @@
+#!/usr/bin/python
+
+import numpy as np
+from enum import Table
+from collections import deque
+from series.columns import StudyColumns
+
+
+class StudyEngine(object):
+    """
+    Calculate market studies -- 'SMA', 'EMA', 'ATR', 'HHLL', price variance and volume 'SMA'.
+
+    If whole price history is known at load, every study is computed once as whole-series arrays
+    and the simulation only moves their cursors forward. Otherwise studies are updated incrementally
+    from each new price record. Both ways produce identical values; missing values (e.g. volume)
+    are left out of the study windows.
+    """
+
+    def __init__(self, study_parameters):
+        self.__parameters = [(
+            p['name'],
+            p['study'],
+            int(p['window']),
+            self.__column(p['name'], p['columns'][-1])
+        ) for p in study_parameters]
+        self.__studies = {}
+        self.__windows = {}
+        self.__precomputed = False
+        self.__has_data = False
+
+    def reset(self):
+        """
+        Create empty studies and their data windows
+        """
+        self.__studies = {name: StudyColumns(study_type == 'HHLL', self.__dtype(study_type, column))
+                          for name, study_type, window, column in self.__parameters}
+        self.__windows = {(column, window): deque([], window) for name, study_type, window, column in self.__parameters}
+        self.__precomputed = False
+        self.__has_data = False
+
+    def study(self, study_name):
+        """
+        Return study columns by name passed in
+
+        :param study_name:  name of the study
+        :return:            StudyColumns or None if the study is not configured
+        """
+        return self.__studies.get(study_name)
+
+    def has_data(self):
+        """
+        Return flag indicating if all studies have at least their window-length of data
+
+        :return:    boolean
+        """
+        return self.__has_data
+
+    def compute(self, prices):
+        """
+        Compute all studies over the whole price history passed in
+
+        :param PriceColumns prices: price history
+        """
+        dates = prices.date_ordinals()
+        settle_prices = prices.settle_prices()
+        previous_settle_prices = np.concatenate((settle_prices[:1], settle_prices[:-1]))
+        true_ranges = np.maximum(prices.high_prices(), previous_settle_prices) \
+            - np.minimum(prices.low_prices(), previous_settle_prices)
+        series = {
+            'settle_price': (dates, settle_prices),
+            'volume': (dates, prices.volumes()),
+            'tr': (dates, true_ranges),
+            'ret_sq': (dates[1:], np.square(settle_prices[1:] - previous_settle_prices[1:]))
+        }
+
+        for name, study_type, window, column in self.__parameters:
+            study_dates, values = series[column]
+            present = values == values
+            values = values[present].astype(self.__dtype(study_type, column))
+            if len(values):
+                study = self.__studies[name]
+                if study_type == 'EMA' or study_type == 'ATR':
+                    study.assign(study_dates[present], ewm(values, window))
+                else:
+                    # Missing values are skipped -- records on their dates repeat the latest window
+                    positions = np.cumsum(present) - 1
+                    study_dates = study_dates[positions > -1]
+                    positions = positions[positions > -1]
+                    if study_type == 'SMA':
+                        study.assign(study_dates, rolling_mean(values, window)[positions])
+                    elif study_type == 'HHLL':
+                        study.assign(study_dates, rolling_max(values, window)[positions], rolling_min(values, window)[positions])
+
+        self.__precomputed = True
+
+    def update(self, date, prices):
+        """
+        Advance precomputed studies to the date passed in, or calculate the date's study values incrementally
+
+        :param date:                date of the update
+        :param PriceColumns prices: price history
+        """
+        index = prices.index(date)
+        if index is not None:
+            if self.__precomputed:
+                for study in self.__studies.values():
+                    study.advance(date)
+            else:
+                self.__append(date, index, prices)
+
+            self.__has_data = all(len(self.__studies[name]) >= window for name, study_type, window, column in self.__parameters)
+
+    def __append(self, date, index, prices):
+        """
+        Calculate and append study values from price record at index passed in
+
+        :param date:                date of the record
+        :param index:               index of the record
+        :param PriceColumns prices: price history
+        """
+        market_data = prices.row(index)
+        settle_price = market_data[Table.Market.SETTLE_PRICE]
+        previous_settle = prices.settle_price(index-1) if index else settle_price
+        values = {
+            'settle_price': settle_price,
+            'volume': market_data[Table.Market.VOLUME],
+            'tr': max(market_data[Table.Market.HIGH_PRICE], previous_settle) - min(market_data[Table.Market.LOW_PRICE], previous_settle),
+            'ret_sq': (settle_price - previous_settle) ** 2 if index else None
+        }
+        for key, window_data in self.__windows.items():
+            values[key[0]] is not None and window_data.append(values[key[0]])
+
+        for name, study_type, window, column in self.__parameters:
+            study = self.__studies[name]
+            study_data = self.__windows[(column, window)]
+            value = values[column]
+
+            if study_type == 'SMA' and len(study_data):
+                study.append(date, sum(study_data) / len(study_data))
+
+            if value is not None and study_type == 'EMA' or study_type == 'ATR':
+                c = 2.0 / (window + 1)
+                ma = study.row(-1)[Table.Study.VALUE] if len(study) else (sum(study_data) / len(study_data))
+                study.append(date, (c * value) + (1 - c) * ma)
+
+            if study_type == 'HHLL' and len(study_data):
+                study.append(date, max(study_data), min(study_data))
+
+    def __dtype(self, study_type, column):
+        """
+        Return type of study values -- volume averages and extremes stay integers
+
+        :param study_type:  type of the study
+        :param column:      name of the study source column
+        :return:            numpy dtype
+        """
+        return np.int64 if column == 'volume' and study_type in ('SMA', 'HHLL') else np.float64
+
+    def __column(self, study_name, default_column):
+        """
+        Find and return column name based on study name, otherwise return default column name
+
+        :param study_name:      name of a study
+        :param default_column:  name of default columns
+        :return:                string representing column name
+        """
+        return {'atr_long': 'tr', 'atr_short': 'tr', 'variance_price': 'ret_sq'}.get(study_name, default_column)
+
+
+def rolling_mean(values, window):
+    """
+    Calculate mean of trailing window (shorter at the start of the series) for each value.
+    Window values are summed oldest-first, the same order as built-in 'sum' over the data window,
+    and integer values are floor-divided, the same as in the incremental calculation.
+
+    :param values:  numpy array of values
+    :param window:  length of the window
+    :return:        numpy array of means
+    """
+    length = len(values)
+    padded = np.concatenate((np.zeros(window - 1, dtype=values.dtype), values))
+    total = np.zeros(length, dtype=values.dtype)
+    for i in xrange(window):
+        total += padded[i:i + length]
+    counts = np.minimum(np.arange(1, length + 1), window)
+    return total // counts if np.issubdtype(values.dtype, np.integer) else total / counts
+
+
+def rolling_max(values, window):
+    """
+    Calculate maximum of trailing window (shorter at the start of the series) for each value
+
+    :param values:  numpy array of values
+    :param window:  length of the window
+    :return:        numpy array of maximums
+    """
+    length = len(values)
+    padded = np.concatenate((np.repeat(values[:1], window - 1), values))
+    result = values.copy()
+    for i in xrange(window - 1):
+        np.maximum(result, padded[i:i + length], result)
+    return result
+
+
+def rolling_min(values, window):
+    """
+    Calculate minimum of trailing window (shorter at the start of the series) for each value
+
+    :param values:  numpy array of values
+    :param window:  length of the window
+    :return:        numpy array of minimums
+    """
+    length = len(values)
+    padded = np.concatenate((np.repeat(values[:1], window - 1), values))
+    result = values.copy()
+    for i in xrange(window - 1):
+        np.minimum(result, padded[i:i + length], result)
+    return result
+
+
+def ewm(values, window):
+    """
+    Calculate exponentially-weighted moving average with smoothing constant '2 / (window + 1)',
+    seeded with the first value. The recursion is sequential, so it runs over plain floats
+    to keep exactly the same rounding as the incremental calculation.
+
+    :param values:  numpy array of values
+    :param window:  length of the window
+    :return:        numpy array of averages
+    """
+    c = 2.0 / (window + 1)
+    result = []
+    ma = None
+    for value in values.tolist():
+        ma = (c * value) + (1 - c) * (value if ma is None else ma)
+        result.append(ma)
+    return np.array(result, dtype=np.float64)
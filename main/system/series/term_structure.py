@@ -0,0 +1,144 @@
+#!/usr/bin/python
+
+import numpy as np
+from enum import Table
+
+
+class TermStructure(object):
+    """
+    Records of listed contracts of a market, held in price columns grouped by contract and sorted by date
+    (e.g. memory-mapped from SeriesCache), resolving each contract's latest record effective on a date.
+    Every contract keeps a cursor at its last resolved row, so as the simulation moves forward day by day
+    the lookups only step the cursors (O(1)); any other date is resolved by bisection of the contract's rows.
+    """
+
+    def __init__(self, contracts=None):
+        """
+        :param contracts:   PriceColumns of the contracts' records with last trading day, grouped by contract
+                            (last five characters of the code, upper-cased) and sorted by date within each contract
+        """
+        self.__contracts = contracts
+        self.__dates = contracts.date_ordinals() if contracts is not None else None
+        self.__ranges = TermStructure.ranges(contracts) if contracts is not None else {}
+        self.__cursors = {k: r[0] - 1 for k, r in self.__ranges.items()}
+        self.__records = {}
+        self.__curve_key = None
+        self.__curve = []
+
+    @staticmethod
+    def ranges(contracts):
+        """
+        Find rows of each contract in the columns passed in
+
+        :param contracts:   PriceColumns grouped by contract
+        :return:            dict of contract code and tuple(index of the first row, index past the last row)
+        """
+        keys = [c[-5:].upper() for c in contracts.codes()]
+        contract_keys = sorted(set(keys))
+        key_ids = {k: i for i, k in enumerate(contract_keys)}
+        row_keys = np.array([key_ids[k] for k in keys], dtype=np.int32)[contracts.code_ids()] \
+            if len(keys) else np.zeros(0, dtype=np.int32)
+        starts = [0] + (np.flatnonzero(row_keys[1:] != row_keys[:-1]) + 1).tolist()
+        ends = starts[1:] + [len(row_keys)]
+        return {contract_keys[row_keys[s]]: (s, e) for s, e in zip(starts, ends) if s < e}
+
+    def contracts(self):
+        """
+        Return codes of the contracts in the structure
+
+        :return:    sorted list of strings
+        """
+        return sorted(self.__ranges)
+
+    def remove(self, contract):
+        """
+        Remove contract from the structure (e.g. once rolled out of)
+
+        :param contract:    code of the contract
+        """
+        self.__ranges.pop(contract, None)
+        self.__cursors.pop(contract, None)
+        self.__records.pop(contract, None)
+        self.__curve_key = None
+
+    def record(self, contract, date):
+        """
+        Return the contract's latest record dated on or before the date passed in
+
+        :param contract:    code of the contract
+        :param date:        date to resolve
+        :return:            tuple representing one day record, or None if there is no such record
+        """
+        rows = self.__ranges.get(contract)
+        if rows is None:
+            return None
+
+        ordinal = date.toordinal()
+        cursor = self.__cursors[contract]
+        if not self.__current(rows, cursor, ordinal):
+            cursor = cursor + 1 if self.__current(rows, cursor + 1, ordinal) else self.__index(rows, ordinal)
+            self.__cursors[contract] = cursor
+
+        if cursor < rows[0]:
+            return None
+
+        record = self.__records.get(contract)
+        if record is None or record[0] != cursor:
+            record = cursor, self.__contracts.row(cursor)
+            self.__records[contract] = record
+        return record[1]
+
+    def curve(self, date, contract, codes):
+        """
+        Return yield curve of the contracts passed in, relative to the contract and date passed in.
+        Only contracts still trading after the date are on the curve.
+
+        :param date:        date to which relate the yield curve
+        :param contract:    code of the current contract
+        :param codes:       sorted list of codes of the contracts following the current one
+        :return:            list of tuples(code, price, volume, yield, relative-price-difference, days)
+        """
+        if self.__curve_key == (date, contract):
+            return self.__curve
+
+        contract_data = self.record(contract, date)
+        previous_price = contract_data[Table.Market.SETTLE_PRICE] if contract_data else 0
+        curve = []
+
+        for code in codes:
+            next_contract = self.record(code, date)
+            if next_contract and next_contract[Table.Market.LAST_TRADING_DAY] > date:
+                days = (next_contract[Table.Market.LAST_TRADING_DAY] - date).days
+                price = next_contract[Table.Market.SETTLE_PRICE]
+                implied_yield = (price / contract_data[Table.Market.SETTLE_PRICE]) ** (365. / days) - 1
+                price_difference = price - previous_price
+                previous_price = price
+                curve.append((code, price, next_contract[Table.Market.VOLUME], implied_yield, price_difference, days))
+
+        self.__curve_key = (date, contract)
+        self.__curve = curve
+        return curve
+
+    def __current(self, rows, cursor, ordinal):
+        """
+        Check if the cursor points at the latest row effective on the date passed in
+
+        :param rows:        tuple(index of the contract's first row, index past its last row)
+        :param cursor:      index of the row
+        :param ordinal:     day ordinal of the date to check
+        :return:            boolean
+        """
+        start, end = rows
+        return start <= cursor < end and self.__dates[cursor] <= ordinal \
+            and (cursor + 1 == end or self.__dates[cursor + 1] > ordinal)
+
+    def __index(self, rows, ordinal):
+        """
+        Find index of the contract's latest row effective on the date passed in by bisection
+
+        :param rows:        tuple(index of the contract's first row, index past its last row)
+        :param ordinal:     day ordinal of the date to resolve
+        :return:            int index, the first row's index less one if there is no row on or before the date
+        """
+        start, end = rows
+        return start + int(np.searchsorted(self.__dates[start:end], ordinal, 'right')) - 1
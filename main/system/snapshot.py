@@ -0,0 +1,18 @@
+#!/usr/bin/python
+
+import sys
+from fnmatch import fnmatch
+from operations.initialize import Initialize
+from data.file_data_source import FileDataSource
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3:
+        data_source = Initialize.data_source()
+        FileDataSource.export(
+            data_source,
+            sys.argv[1],
+            [n for n in data_source.simulation_names() if any(fnmatch(n, p) for p in sys.argv[2:])]
+        )
+    else:
+        print 'Expected path of the snapshot file to create and names or patterns of the simulations to export ' \
+              '(e.g. "snapshot.db ewmac_*")'
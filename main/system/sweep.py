@@ -0,0 +1,24 @@
+#!/usr/bin/python
+
+import sys
+from operations.sweep import Sweep
+from progress import Progress
+from options import option
+from options import date_option
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2:
+        args = sys.argv[1:]
+        processes = option('processes', args)
+        Progress.mode = option('progress', args, Progress.CONSOLE)
+        Sweep(
+            [a for a in args if not a.startswith('--')],
+            int(processes) if processes else None,
+            option('data', args),
+            option('cache', args),
+            date_option('end', args)
+        )
+    else:
+        print 'Expected names or patterns of the simulations (e.g. "ewmac_*"), ' \
+              'optionally --end=YYYY-MM-DD, --processes=N, --data=<snapshot file>, --cache=<series cache directory> ' \
+              'and --progress=quiet|machine (progress of loading the data; simulations run quietly)'
@@ -0,0 +1,72 @@
+#!/usr/bin/python
+
+from data.data_source import DataSource
+
+
+class SyntheticDataSource(DataSource):
+    """
+    Simulation data served from synthetic universe instead of MySQL DB
+    """
+
+    def __init__(self, universe, simulations, roll_strategies):
+        """
+        :param SyntheticUniverse universe:  synthetic universe data
+        :param simulations:                 list of tuples representing simulation records
+        :param roll_strategies:             list of tuples representing roll strategy records
+        """
+        self.__universe = universe
+        self.__simulations = {s[1]: s for s in simulations}
+        self.__roll_strategies = {r[0]: r for r in roll_strategies}
+
+    def simulation_names(self):
+        return sorted(self.__simulations)
+
+    def simulation(self, name):
+        return self.__simulations.get(name)
+
+    def roll_strategy(self, roll_strategy_id):
+        return self.__roll_strategies[int(roll_strategy_id)]
+
+    def investment_universe(self, name):
+        start_date = self.__universe.start_date()
+        return start_date, start_date, ','.join(str(i) for i in self.__universe.market_ids())
+
+    def market(self, market_id):
+        return self.__universe.market(int(market_id))
+
+    def delivery_months(self):
+        return self.__universe.delivery_months()
+
+    def currency_pairs(self):
+        return self.__universe.currency_pairs()
+
+    def currencies(self):
+        return self.__universe.currencies()
+
+    def continuous_prices(self, market_id, market_code, roll_strategy_id, start_date, end_date):
+        return self.__range(self.__universe.continuous(int(market_id)), 1, start_date, end_date)
+
+    def contract_prices(self, market_id, market_code, start_date, end_date):
+        contracts = self.__universe.contracts(int(market_id))
+        return self.__range([c for c in contracts if c[0][:-5] == market_code], 1, start_date, end_date)
+
+    def roll_schedule(self, market_id):
+        return self.__universe.roll_schedule(int(market_id))
+
+    def currency_rates(self, currency_pair_id, start_date, end_date):
+        return self.__range(self.__universe.currency_rates(int(currency_pair_id)), 0, start_date, end_date)
+
+    def interest_rates(self, currency_id, start_date, end_date):
+        return self.__range(self.__universe.interest_rates(int(currency_id)), 0, start_date, end_date)
+
+    def __range(self, records, date_index, start_date, end_date):
+        """
+        Filter records dated within the date range passed in
+
+        :param records:     list of tuples
+        :param date_index:  index of the date in record
+        :param start_date:  date of the range start
+        :param end_date:    date of the range end
+        :return:            tuple of tuples
+        """
+        return tuple(r for r in records if start_date <= r[date_index] <= end_date)
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+
+import json
+from enum import PositionSizing
+from enum import CapitalCorrection
+from enum import SweepFxRule
+
+ROLL_STRATEGIES = [
+    (1, 'norgate', 'standard_roll', None),
+    (2, 'standard_roll_1', 'standard_roll', json.dumps({})),
+    (3, 'optimal_roll_1', 'optimal_roll', json.dumps({'min_volume': 1000}))
+]
+
+ATR = ['price_date', 'high_price', 'low_price', 'settle_price']
+SETTLE = ['price_date', 'settle_price']
+VOLUME = ['price_date', 'volume']
+
+TRADING_MODELS = {
+    'breakout_with_MA_filter_and_ATR_stop': (
+        {'stop_multiple': 3},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 50, ATR), ('ma_long', 'SMA', 100, SETTLE),
+         ('ma_short', 'SMA', 50, SETTLE), ('vol_short', 'SMA', 50, VOLUME), ('hhll_short', 'HHLL', 50, SETTLE)]
+    ),
+    'plunge_with_ATR_stop_and_profit': (
+        {'stop_type': 'trailing_stop', 'enter_multiple': 3, 'stop_multiple': 2, 'profit_multiple': 4, 'stop_time': 30},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 20, ATR), ('ma_long', 'EMA', 100, SETTLE),
+         ('ma_short', 'EMA', 50, SETTLE), ('vol_short', 'SMA', 50, VOLUME), ('hhll_short', 'HHLL', 20, SETTLE)]
+    ),
+    'bollinger_bands': (
+        {},
+        [('atr_long', 'ATR', 25, ATR), ('atr_short', 'ATR', 25, ATR), ('ma_long', 'EMA', 100, SETTLE),
+         ('ma_short', 'EMA', 25, SETTLE), ('vol_short', 'SMA', 25, VOLUME)]
+    ),
+    'ma_trend_on_pullback': (
+        {'stop_multiple': 3},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 50, ATR), ('ma_long', 'SMA', 100, SETTLE),
+         ('ma_short', 'SMA', 50, SETTLE), ('vol_short', 'SMA', 50, VOLUME)]
+    ),
+    'buy_and_hold': (
+        {},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 50, ATR), ('vol_short', 'SMA', 50, VOLUME)]
+    ),
+    'ewmac': (
+        {'forecast_scalar': 1.87, 'forecast_cap': 20.0, 'forecast_const': 10.0},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 50, ATR), ('ma_long', 'EMA', 256, SETTLE),
+         ('ma_short', 'EMA', 64, SETTLE), ('variance_price', 'EMA', 36, SETTLE), ('vol_short', 'SMA', 50, VOLUME)]
+    ),
+    'carry': (
+        {'forecast_scalar': 30.0, 'forecast_cap': 20.0, 'forecast_const': 10.0},
+        [('atr_long', 'ATR', 100, ATR), ('atr_short', 'ATR', 50, ATR), ('variance_price', 'EMA', 36, SETTLE),
+         ('vol_short', 'SMA', 50, VOLUME)]
+    )
+}
+
+# Volatility-target position sizing needs price variance study, added to models not using it themselves
+PRICE_VARIANCE = ('variance_price', 'EMA', 36, SETTLE)
+
+POSITION_SIZINGS = [PositionSizing.RISK_FACTOR, PositionSizing.EQUAL_WEIGHTS, PositionSizing.CORRELATION_WEIGHTS]
+
+
+def params(position_sizing, numeric_mode=None):
+    """
+    Construct and return simulation params for the position sizing passed in
+
+    :param position_sizing: position sizing method
+    :param numeric_mode:    optional type of account amounts, defaults to the simulation's default
+    :return:                dict
+    """
+    simulation_params = {
+        'initial_balance': 1e6,
+        'base_currency': 'EUR',
+        'position_sizing': position_sizing,
+        'commission': 10.0,
+        'commission_currency': 'USD',
+        'interest_minimums': {'AUD': 14000, 'CAD': 14000, 'CHF': 100000, 'EUR': 100000, 'GBP': 8000, 'JPY': 11000000, 'USD': 10000},
+        'slippage_map': [
+            {'atr': 2, 'min': 0, 'max': 100},
+            {'atr': 1, 'min': 100, 'max': 1000},
+            {'atr': 0.25, 'min': 1000, 'max': 10000},
+            {'atr': 0.1, 'min': 10000, 'max': 50000},
+            {'atr': 0.05, 'min': 50000, 'max': 200000},
+            {'atr': 0.01, 'min': 200000, 'max': 1e9}
+        ],
+        'sweep_fx_rule': SweepFxRule.NO_POSITIONS,
+        'capital_correction': CapitalCorrection.FULL_COMPOUNDING,
+        'risk_factor': 0.002,
+        'volatility_target': 0.2,
+        'volatility_lookback': 25,
+        'volatility_type': 'movement',
+        'use_ew_correlation': True,
+        'use_group_correlation_weights': False,
+        'position_inertia': 0.1 if position_sizing == PositionSizing.RISK_FACTOR else 0.25,
+        'use_position_inertia': position_sizing != PositionSizing.RISK_FACTOR,
+        'rebalance_interval': None
+    }
+    if numeric_mode:
+        simulation_params['numeric_mode'] = numeric_mode
+    return simulation_params
+
+
+def simulations(roll_strategy_id, trading_models=None, position_sizings=None, numeric_modes=None):
+    """
+    Construct and return simulation records of every trading model and position sizing passed in,
+    and if numeric modes are passed in, of every numeric mode too (named with the mode's suffix)
+
+    :param roll_strategy_id:    ID of the roll strategy to use
+    :param trading_models:      list of trading model names, defaults to all models
+    :param position_sizings:    list of position sizing methods, defaults to all methods
+    :param numeric_modes:       optional list of numeric modes of account amounts
+    :return:                    list of tuples representing simulation records
+    """
+    records = []
+    for trading_model in sorted(trading_models or TRADING_MODELS):
+        # Carry compares individual contracts, which continuous 'norgate' series don't have
+        if trading_model == 'carry' and roll_strategy_id == ROLL_STRATEGIES[0][0]:
+            continue
+
+        trading_params, studies = TRADING_MODELS[trading_model]
+        for position_sizing in position_sizings or POSITION_SIZINGS:
+            if position_sizing != PositionSizing.RISK_FACTOR and PRICE_VARIANCE[0] not in [s[0] for s in studies]:
+                studies = studies + [PRICE_VARIANCE]
+            for numeric_mode in numeric_modes or [None]:
+                records.append((
+                    len(records) + 1,
+                    '%s_%s%s' % (trading_model, position_sizing, '_%s' % numeric_mode if numeric_mode else ''),
+                    json.dumps(params(position_sizing, numeric_mode)),
+                    trading_model,
+                    json.dumps(trading_params),
+                    json.dumps([{'name': s[0], 'study': s[1], 'window': s[2], 'columns': s[3]} for s in studies]),
+                    roll_strategy_id,
+                    'synthetic'
+                ))
+    return records
@@ -0,0 +1,308 @@
+#!/usr/bin/python
+
+import os
+import random
+import numpy as np
+import datetime as dt
+from bisect import bisect_left
+from bisect import bisect_right
+from timer import Timer
+from data.market_correlation import MarketCorrelationProxy
+
+
+class SyntheticUniverse(object):
+    """
+    Randomly generated, but reproducible (seeded) futures universe --
+    markets with quarterly contracts, back-adjusted continuous series, roll schedules,
+    currency pairs, interest rates and weekly market volatility and correlations.
+    Records have the same shape as rows of their DB tables.
+    """
+
+    MONTH_CODES = 'FGHJKMNQUVXZ'
+    MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    DELIVERY_MONTHS = [3, 6, 9, 12]
+    CURRENCIES = ['USD', 'EUR', 'JPY', 'GBP', 'CHF', 'CAD', 'AUD']
+    MARKET_CURRENCIES = ['USD', 'USD', 'EUR', 'JPY', 'USD', 'GBP', 'CHF', 'AUD', 'CAD']
+    BASE_CURRENCY = 'EUR'
+
+    def __init__(self, markets=10, years=5, start_date=dt.date(1990, 1, 1), seed=7):
+        """
+        :param markets:     number of markets to generate
+        :param years:       number of years of data
+        :param start_date:  date of the first data
+        :param seed:        seed of the random generator
+        """
+        self.__random = random.Random(seed)
+        self.__start_date = start_date
+        self.__end_date = dt.date(start_date.year + years, start_date.month, start_date.day) - dt.timedelta(days=1)
+        self.__days = Timer.daily_date_range(start_date, self.__end_date)
+        self.__markets = {}
+        self.__contracts = {}
+        self.__continuous = {}
+        self.__roll_schedules = {}
+
+        for market_id in range(1, markets + 1):
+            self.__generate_market(market_id)
+
+        self.__currency_pairs = [(i + 1, '%s%s' % (SyntheticUniverse.BASE_CURRENCY, c), '%s/%s' % (SyntheticUniverse.BASE_CURRENCY, c), start_date)
+                                 for i, c in enumerate(c for c in SyntheticUniverse.CURRENCIES if c != SyntheticUniverse.BASE_CURRENCY)]
+        self.__currency_rates = {p[0]: self.__currency_rates_data(self.__random.uniform(0.5, 150.0)) for p in self.__currency_pairs}
+        self.__currencies = [(i + 1, c) for i, c in enumerate(SyntheticUniverse.CURRENCIES)]
+        self.__interest_rates = {c[0]: self.__interest_rates_data(self.__random.uniform(0.5, 8.0)) for c in self.__currencies}
+
+    def start_date(self):
+        """
+        Return date of the first data
+
+        :return:    date
+        """
+        return self.__start_date
+
+    def end_date(self):
+        """
+        Return date of the last data
+
+        :return:    date
+        """
+        return self.__end_date
+
+    def days(self):
+        """
+        Return number of data days (workdays)
+
+        :return:    int
+        """
+        return len(self.__days)
+
+    def market_ids(self):
+        """
+        Return sorted list of market IDs
+
+        :return:    list of int
+        """
+        return sorted(self.__markets)
+
+    def market(self, market_id):
+        """
+        Return market record -- name, code, data codes, currency, tick value, point value and initial margin
+
+        :param market_id:   ID of the market
+        :return:            tuple
+        """
+        return self.__markets[market_id]
+
+    def contracts(self, market_id):
+        """
+        Return contract price records of the market, sorted by date
+
+        :param market_id:   ID of the market
+        :return:            list of tuples(code, date, open, high, low, settle, volume, last trading day)
+        """
+        return self.__contracts[market_id]
+
+    def continuous(self, market_id):
+        """
+        Return back-adjusted continuous price records of the market, sorted by date
+
+        :param market_id:   ID of the market
+        :return:            list of tuples(code, date, open, high, low, settle, volume)
+        """
+        return self.__continuous[market_id]
+
+    def roll_schedule(self, market_id):
+        """
+        Return standard roll schedule of the market
+
+        :param market_id:   ID of the market
+        :return:            list of tuples(roll-out month, roll-in month, month, day)
+        """
+        return self.__roll_schedules[market_id]
+
+    def delivery_months(self):
+        """
+        Return delivery month records
+
+        :return:    list of tuples(code, short name)
+        """
+        return zip(SyntheticUniverse.MONTH_CODES, SyntheticUniverse.MONTHS)
+
+    def currency_pairs(self):
+        """
+        Return currency pair records
+
+        :return:    list of tuples(ID, code, name, first data date)
+        """
+        return self.__currency_pairs
+
+    def currency_rates(self, currency_pair_id):
+        """
+        Return rates of the currency pair
+
+        :param currency_pair_id:    ID of the currency pair
+        :return:                    list of tuples(date, rate)
+        """
+        return self.__currency_rates[currency_pair_id]
+
+    def currencies(self):
+        """
+        Return currency records
+
+        :return:    list of tuples(ID, code)
+        """
+        return self.__currencies
+
+    def interest_rates(self, currency_id):
+        """
+        Return interest rates of the currency
+
+        :param currency_id: ID of the currency
+        :return:            list of tuples(date, immediate rate, three-months rate)
+        """
+        return self.__interest_rates[currency_id]
+
+    def write_correlations(self, lookback, directory='.'):
+        """
+        Generate weekly market volatility and correlations,
+        and write them in correlation cube files read by 'MarketCorrelationProxy'
+        (the same values for every volatility type and EW variant)
+
+        :param lookback:    lookback of the volatility and correlations
+        :param directory:   root directory of the 'db' directory
+        """
+        market_ids = self.market_ids()
+        dates = [d for d in self.__days if d.isoweekday() == 3]
+        length = len(market_ids)
+        rnd = np.random.RandomState(self.__random.randint(0, 2 ** 31))
+
+        base = np.triu(rnd.uniform(-0.4, 0.9, (length, length)), 1)
+        noise = rnd.normal(0, 0.05, (len(dates), length, length))
+        correlations = np.clip(base + base.T + noise, -1.0, 1.0).astype(np.float32)
+        correlations[:, np.arange(length), np.arange(length)] = np.nan
+        volatilities = rnd.uniform(0.005, 0.03, (len(dates), length)).astype(np.float32)
+
+        ordinals = np.array([d.toordinal() for d in dates], dtype=np.int32)
+        for volatility_type in ['movement', 'dev']:
+            for use_ew_correlation in [False, True]:
+                path = MarketCorrelationProxy.cube_path(lookback, volatility_type, use_ew_correlation, directory)
+                if not os.path.exists(path):
+                    os.makedirs(path)
+                np.save('%s/market_ids.npy' % path, np.array(market_ids, dtype=np.int32))
+                np.save('%s/dates.npy' % path, ordinals)
+                np.save('%s/row_dates.npy' % path, np.repeat(ordinals[:, np.newaxis], length, axis=1))
+                np.save('%s/volatilities.npy' % path, volatilities)
+                np.save('%s/correlations.npy' % path, correlations)
+
+    def __generate_market(self, market_id):
+        """
+        Generate market, its contracts, continuous series and roll schedule
+
+        :param market_id:   ID of the market
+        """
+        rnd = self.__random
+        code = 'S%03d' % market_id
+        currency = SyntheticUniverse.MARKET_CURRENCIES[(market_id - 1) % len(SyntheticUniverse.MARKET_CURRENCIES)]
+        months = SyntheticUniverse.DELIVERY_MONTHS
+        self.__markets[market_id] = (
+            'Synthetic %s' % code,
+            code,
+            'I',
+            currency,
+            10.0,
+            10000.0 if currency == 'JPY' else 100.0,
+            0
+        )
+        self.__roll_schedules[market_id] = [(
+            SyntheticUniverse.MONTHS[m - 1],
+            SyntheticUniverse.MONTHS[months[(i + 1) % len(months)] - 1],
+            SyntheticUniverse.MONTHS[m - 1],
+            8
+        ) for i, m in enumerate(months)]
+
+        # Spot price random walk, contracts priced from the spot with constant carry
+        spot = {}
+        price = rnd.uniform(20.0, 500.0)
+        for day in self.__days:
+            price *= 1 + rnd.gauss(0.0002, 0.012)
+            spot[day] = price
+        carry = rnd.uniform(-0.05, 0.05)
+
+        contracts = []
+        for year in range(self.__start_date.year, self.__end_date.year + 2):
+            for month in months:
+                last_trading_day = dt.date(year, month, 15)
+                while last_trading_day.isoweekday() > 5:
+                    last_trading_day -= dt.timedelta(days=1)
+                first_day = last_trading_day - dt.timedelta(days=400)
+                contract_code = '%s%d%s' % (code, year, SyntheticUniverse.MONTH_CODES[month - 1])
+                for day in self.__days[bisect_left(self.__days, first_day):bisect_right(self.__days, last_trading_day)]:
+                    if rnd.random() > 0.01:
+                        years_to_expiry = (last_trading_day - day).days / 365.0
+                        settle = spot[day] * (1 + carry * years_to_expiry)
+                        high = settle * (1 + abs(rnd.gauss(0, 0.006)))
+                        low = settle * (1 - abs(rnd.gauss(0, 0.006)))
+                        volume = int(20000 * (1 - min(years_to_expiry, 1.0)) ** 3) + rnd.randint(1, 500)
+                        contracts.append((contract_code, day, low + (high - low) * rnd.random(), high, low, settle, volume, last_trading_day))
+
+        contracts.sort(key=lambda c: c[1])
+        self.__contracts[market_id] = contracts
+        self.__continuous[market_id] = self.__continuous_data(code, contracts)
+
+    def __continuous_data(self, code, contracts):
+        """
+        Construct front-contract series, rolled ten days before last trading day
+        and back-adjusted by the price gap on each roll
+
+        :param code:        code of the market
+        :param contracts:   list of contract price records sorted by date
+        :return:            list of tuples(code, date, open, high, low, settle, volume)
+        """
+        contracts_by_date = {}
+        for contract in contracts:
+            contracts_by_date.setdefault(contract[1], {})[contract[0]] = contract
+
+        front = []
+        for day in self.__days:
+            live = [c for c in contracts_by_date.get(day, {}).values() if (c[7] - day).days > 10]
+            if live:
+                front.append(min(live, key=lambda c: c[7]))
+
+        continuous = []
+        gap = 0.0
+        for i in reversed(xrange(len(front))):
+            contract = front[i]
+            if i < len(front) - 1 and front[i + 1][0] != contract[0]:
+                roll_in = contracts_by_date[front[i + 1][1]]
+                if contract[0] in roll_in:
+                    gap += roll_in[front[i + 1][0]][5] - roll_in[contract[0]][5]
+            continuous.append((code, contract[1], contract[2] + gap, contract[3] + gap, contract[4] + gap, contract[5] + gap, contract[6]))
+
+        continuous.reverse()
+        return continuous
+
+    def __currency_rates_data(self, rate):
+        """
+        Generate daily currency rates, with occasional missing days
+
+        :param rate:    initial rate
+        :return:        list of tuples(date, rate)
+        """
+        rates = []
+        for day in self.__days:
+            rate *= 1 + self.__random.gauss(0, 0.004)
+            if self.__random.random() > 0.02:
+                rates.append((day, rate))
+        return rates
+
+    def __interest_rates_data(self, rate):
+        """
+        Generate monthly interest rates, with occasional missing immediate rate
+
+        :param rate:    initial rate
+        :return:        list of tuples(date, immediate rate, three-months rate)
+        """
+        rates = []
+        for day in self.__days:
+            if day.day <= 7 and day.isoweekday() == 1:
+                rate = max(0.0, rate + self.__random.gauss(0, 0.2))
+                rates.append((day, None if self.__random.random() < 0.1 else rate, rate + 0.25))
+        return rates
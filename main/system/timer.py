@@ -1,10 +1,10 @@
 #!/usr/bin/python
 
-import sys
 import calendar
 import datetime as dt
 from enum import EventType
 from event_dispatcher import EventDispatcher
+from progress import Progress
 
 
 class Timer(EventDispatcher):
@@ -12,26 +12,28 @@ class Timer(EventDispatcher):
     def __init__(self):
         super(Timer, self).__init__()
 
-    def start(self, start_date=dt.date(1990, 1, 1), end_date=dt.date(9999, 12, 31)):
+    def start(self, start_date=dt.date(1990, 1, 1), end_date=dt.date(9999, 12, 31), previous_date=None, trading_calendar=None):
         """
         Start the strategy and iterates through the day range, notifying subscribers
 
-        :param start_date:  Start date of the strategy
-        :param end_date:    End date of the strategy
+        :param start_date:          Start date of the strategy
+        :param end_date:            End date of the strategy
+        :param previous_date:       Last date already processed (when continuing), defaults to start date
+        :param trading_calendar:    optional TradingCalendar of the days to iterate through, defaults to all weekdays
         """
         day = start_date
-        previous_day = start_date
-        days = Timer.daily_date_range(start_date, end_date)
-        length = len(days)
-        # TODO filter by major holidays in major exchanges
+        previous_day = previous_date or start_date
+        days = trading_calendar.days(start_date, end_date) if trading_calendar is not None \
+            else Timer.daily_date_range(start_date, end_date)
+        progress = Progress('Strategy progress', len(days))
         for i, day in enumerate(days):
-            self.__log(day, i, length)
+            progress.update(i, day)
             self.dispatch(EventType.MARKET_OPEN, day, previous_day)  # execute orders
             self.dispatch(EventType.MARKET_CLOSE, day, previous_day)  # accounting
             self.dispatch(EventType.EOD_DATA, day, previous_day)  # calculate studies and signals
             previous_day = day
 
-        self.__log(day, complete=True)
+        progress.complete()
         self.dispatch(EventType.COMPLETE, day)
 
     @staticmethod
@@ -74,23 +76,3 @@ class Timer(EventDispatcher):
         :return:            list of date objects
         """
         return [dt.date(year, 12, calendar.monthrange(year, 12)[1]) for year in range(start_date.year, end_date.year + 1)]
-
-    def __log(self, day, index=0, length=0.0, complete=False):
-        """
-        Print message and percentage progress to console
-
-        :param index:       Index of the item being processed
-        :param length:      Length of the whole range
-        :param complete:    Flag indicating if the progress is complete
-        """
-        sys.stdout.write('%s\r' % (' ' * 80))
-        if complete:
-            sys.stdout.write('Strategy progress complete\r\n')
-        else:
-            sys.stdout.write('Strategy progress ... %s (%d of %d) [%d %%]\r' % (
-                day,
-                index,
-                length,
-                float(index) / length * 100
-            ))
-        sys.stdout.flush()
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import numpy as np
+import datetime as dt
+
+
+class TradingCalendar(object):
+    """
+    Trading days of the loaded markets -- weekdays, except days none of the markets traded on
+    and every market with data around the day had a holiday of its exchange.
+    Every market has bitmap of the calendar days it traded on.
+
+    Weekdays without any price data which are not holidays of the markets stay in the calendar,
+    as they can't be told from gaps in the data, and interest and FX translation of the account
+    keep accruing over them as they did when the simulation ran on every weekday.
+    """
+
+    def __init__(self, start_date, end_date, market_dates, holidays=None):
+        """
+        :param start_date:      first date of the calendar
+        :param end_date:        last date of the calendar
+        :param market_dates:    dict of market ID and array of ordinals of the market's price dates
+        :param holidays:        optional dict of market ID and list of holiday dates of the market's exchange
+        """
+        start = start_date.toordinal()
+        weekdays = np.array([d for d in xrange(start, end_date.toordinal() + 1)
+                             if dt.date.fromordinal(d).isoweekday() < 6], dtype=np.int32)
+        market_ids = sorted(market_dates.keys())
+        shape = len(market_ids), len(weekdays)
+        trading = np.array([np.in1d(weekdays, market_dates[i]) for i in market_ids], dtype=np.bool_).reshape(shape)
+        on_holiday = np.array([np.in1d(weekdays, [d.toordinal() for d in (holidays or {}).get(i, [])])
+                               for i in market_ids], dtype=np.bool_).reshape(shape)
+        # Markets count in from their first to their last price date
+        active = np.array([(weekdays >= market_dates[i][0]) & (weekdays <= market_dates[i][-1])
+                           if len(market_dates[i]) else np.zeros(len(weekdays), dtype=np.bool_)
+                           for i in market_ids], dtype=np.bool_).reshape(shape)
+        idle = ~trading.any(axis=0) & (on_holiday & active).any(axis=0) & (on_holiday | ~active).all(axis=0)
+
+        self.__ordinals = weekdays[~idle]
+        self.__days = [dt.date.fromordinal(d) for d in self.__ordinals.tolist()]
+        self.__day_indexes = {d: i for i, d in enumerate(self.__ordinals.tolist())}
+        self.__market_indexes = {m: i for i, m in enumerate(market_ids)}
+        self.__trading = trading[:, ~idle]
+
+    def __len__(self):
+        return len(self.__days)
+
+    def days(self, start_date=dt.date(1900, 1, 1), end_date=dt.date(9999, 12, 31)):
+        """
+        Return trading days in between the start and end date passed in, included
+
+        :param start_date:  start date of range
+        :param end_date:    end date of range
+        :return:            list of date objects
+        """
+        start = int(np.searchsorted(self.__ordinals, start_date.toordinal(), 'left'))
+        end = int(np.searchsorted(self.__ordinals, end_date.toordinal(), 'right'))
+        return self.__days[start:end]
+
+    def is_trading(self, market_id, date):
+        """
+        Return flag indicating if the market traded on the date passed in
+
+        :param market_id:   ID of the market
+        :param date:        date to check
+        :return:            boolean
+        """
+        day_index = self.__day_indexes.get(date.toordinal())
+        market_index = self.__market_indexes.get(market_id)
+        return day_index is not None and market_index is not None and bool(self.__trading[market_index, day_index])
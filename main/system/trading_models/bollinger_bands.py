@@ -35,8 +35,8 @@ class BollingerBands(TradingModel, BinaryTradingModel):
             market_data, previous_data = market.data(date)
 
             if market.has_study_data() and market_data:
-                market_id = str(market.id())
-                market_positions = {k.split('_')[1]: positions[k] for k in positions.keys() if k.split('_')[0] == market_id}
+                market_id = market.id()
+                market_positions = {k[1]: positions[k] for k in positions.keys() if k[0] == market_id}
                 market_position = market_positions.items()[0] if len(market_positions) else None
 
                 price = market_data[Table.Market.SETTLE_PRICE]
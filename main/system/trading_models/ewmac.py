@@ -34,8 +34,8 @@ class EWMAC(TradingModel):
             market_data, previous_data = market.data(date)
 
             if market_data and market.has_study_data():
-                market_id = str(market.id())
-                market_positions = {k.split('_')[1]: positions[k] for k in positions.keys() if k.split('_')[0] == market_id}
+                market_id = market.id()
+                market_positions = {k[1]: positions[k] for k in positions.keys() if k[0] == market_id}
                 market_position = market_positions.items()[0] if len(market_positions) else None
                 forecast = self.__forecast(date, market, market_data)
                 contract = market.contract(date)
@@ -41,8 +41,8 @@ class MATrendOnPullback(TradingModel, BinaryTradingModel):
             market_data, previous_data = market.data(date)
 
             if market.has_study_data() and market_data:
-                market_id = str(market.id())
-                market_positions = {k.split('_')[1]: positions[k] for k in positions.keys() if k.split('_')[0] == market_id}
+                market_id = market.id()
+                market_positions = {k[1]: positions[k] for k in positions.keys() if k[0] == market_id}
                 market_position = market_positions.items()[0] if len(market_positions) else None
                 previous_date = previous_data[Table.Market.PRICE_DATE]
                 settle_price = market_data[Table.Market.SETTLE_PRICE]
@@ -103,9 +103,9 @@ class MATrendOnPullback(TradingModel, BinaryTradingModel):
         Update dict with market IDs and their respective position enter dates
         
         :param date:        current date
-        :param positions:   dict of positions(market_id_market_contract: quantity)
+        :param positions:   dict of positions((market ID, contract): quantity)
         """
-        position_ids = [k.split('_')[0] for k in positions.keys()]
+        position_ids = [k[0] for k in positions.keys()]
         for market_id in position_ids:
             if market_id not in self.__positions_enter_dates:
                 self.__positions_enter_dates[market_id] = date
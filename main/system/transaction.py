@@ -6,6 +6,14 @@ from enum import AccountAction
 
 
 class Transaction(object):
+    """
+    One account transaction; instances are kept for every transaction of the simulation,
+    so they have no per-instance dict
+    """
+
+    __slots__ = ('__type', '__account_action', '__date', '__amount', '__currency', '__context_data')
+
+    __market_types = (TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION, TransactionType.COMMISSION)
 
     def __init__(self, transaction_type, date, amount, currency, context_data=None):
         self.__type = transaction_type
@@ -33,9 +41,28 @@ class Transaction(object):
     def context(self):
         return self.__context_data
 
+    def market(self):
+        """
+        Return market the transaction relates to (MTM and commission transactions)
+
+        :return:    Market or None
+        """
+        return self.__context_data[0] if self.__context_data and self.__type in Transaction.__market_types else None
+
+    def contract(self):
+        """
+        Return contract the transaction relates to (MTM and commission transactions)
+
+        :return:    string or None
+        """
+        if self.__type == TransactionType.COMMISSION:
+            return self.__context_data[1].order().contract()
+        return self.__context_data[1] if self.__context_data and self.__type in Transaction.__market_types else None
+
     def context_json(self):
         context_data = {}
-        if self.__type == TransactionType.MTM_TRANSACTION or self.__type == TransactionType.MTM_POSITION:
+        if (self.__type == TransactionType.MTM_TRANSACTION or self.__type == TransactionType.MTM_POSITION) \
+                and self.__context_data:
             context_data = {
                 'market_id': self.__context_data[0].id(),
                 'contract': self.__context_data[1],
@@ -76,7 +103,15 @@ class Transaction(object):
 
     def __str__(self):
         result = 'Transaction: '
-        if self.__type == TransactionType.MTM_TRANSACTION or self.__type == TransactionType.MTM_POSITION:
+        if (self.__type == TransactionType.MTM_TRANSACTION or self.__type == TransactionType.MTM_POSITION) \
+                and not self.__context_data:
+            result += '%s, %s of %.2f(%s) (all markets).' % (
+                self.__type,
+                self.__account_action,
+                self.__amount,
+                self.__currency
+            )
+        elif self.__type == TransactionType.MTM_TRANSACTION or self.__type == TransactionType.MTM_POSITION:
             result += '%s, %s of %.2f(%s) at %.4f (%d x %s%s).' % (
                 self.__type,
                 self.__account_action,
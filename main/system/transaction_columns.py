@@ -0,0 +1,246 @@
+#!/usr/bin/python
+
+import numpy as np
+import datetime as dt
+from enum import AccountAction
+from enum import TransactionType
+from collections import defaultdict
+from transaction import Transaction
+from fixed_point import FixedPoint
+from series.columns import DateColumns
+
+
+class TransactionColumns(DateColumns):
+    """
+    Account transactions ordered by date, in columns: date, type, sign of the account action, currency,
+    amount, market ID, contract, price and quantity of the transaction. Types, currencies and contracts
+    are held as small integer codes; amounts as floats if the account's amounts are floats, as integer units
+    if they are FixedPoint numbers (objects if the units don't fit into 64 bits), and as Decimal objects otherwise.
+    Float amounts of FixedPoint accounts (margin loans) are held as units too, so they come back as FixedPoint.
+
+    Transactions of any date range are resolved into row range by binary search over the date column,
+    and then filtered by type, currency or market on the columns at once. Matching rows are returned
+    as Transaction objects built on request, or summed by currency (and market) right on the columns.
+
+    Context of MTM transactions (market, contract, price and quantity) is rebuilt from the columns
+    when the Transaction is built; other contexts (order results, balances and rates) are kept as objects,
+    as their transactions are printed and persisted with them.
+    """
+
+    __mtm_types = (TransactionType.MTM_TRANSACTION, TransactionType.MTM_POSITION)
+
+    def __init__(self, number_type=float, capacity=256):
+        super(TransactionColumns, self).__init__(capacity)
+        self.__number_type = number_type
+        self.__codes = {}
+        self.__values = {}
+        self._types = np.zeros(capacity, dtype=np.int8)
+        self._signs = np.zeros(capacity, dtype=np.int8)
+        self._currencies = np.zeros(capacity, dtype=np.int16)
+        self._amounts = np.zeros(capacity, dtype=np.float64 if number_type is float
+                                 else np.int64 if number_type is FixedPoint else object)
+        self._market_ids = np.zeros(capacity, dtype=np.int32)
+        self._contracts = np.zeros(capacity, dtype=np.int16)
+        self._prices = np.zeros(capacity, dtype=np.float64)
+        self._quantities = np.zeros(capacity, dtype=np.int64)
+        self._contexts = np.zeros(capacity, dtype=object)
+        self.__markets = {}
+
+    def insert(self, transaction):
+        """
+        Insert transaction after all transactions of the same or earlier date
+
+        :param transaction: Transaction object
+        """
+        ordinal = transaction.date().toordinal()
+        size = self._size
+        index = size if not size or self._dates[size - 1] <= ordinal \
+            else int(np.searchsorted(self._dates[:size], ordinal, 'right'))
+        market = transaction.market()
+        context = transaction.context()
+        amount = transaction.amount()
+        if self.__number_type is FixedPoint:
+            amount = FixedPoint(amount)._units
+            if self._amounts.dtype != object and amount > np.iinfo(np.int64).max:
+                self._amounts = self._amounts.astype(object)
+
+        self._reserve(size + 1)
+        if index < size:
+            for name in self._column_names():
+                column = getattr(self, name)
+                column[index + 1:size + 1] = column[index:size]
+
+        self._dates[index] = ordinal
+        self._types[index] = self.__code('type', transaction.type())
+        self._signs[index] = 1 if transaction.account_action() == AccountAction.CREDIT else -1
+        self._currencies[index] = self.__code('currency', transaction.currency())
+        self._amounts[index] = amount
+        self._market_ids[index] = market.id() if market else -1
+        if market and transaction.type() in TransactionColumns.__mtm_types:
+            self.__markets[market.id()] = market
+            self._contracts[index] = self.__code('contract', context[1])
+            self._prices[index] = context[2]
+            self._quantities[index] = context[3]
+            self._contexts[index] = None
+        else:
+            self._contexts[index] = context
+        self._size = size + 1
+        self._length = size + 1
+
+    def select(self, start_date, end_date, strict=False, transaction_types=None, currencies=None, market_id=None):
+        """
+        Find and return transactions within the dates (included), optionally only of the types,
+        currencies and market passed in
+
+        :param start_date:          Start date to search from
+        :param end_date:            End date to search until
+        :param strict:              Boolean flag indicating 'strict' mode -- if there are no transactions
+                                    on the start and end dates, return empty list
+        :param transaction_types:   optional list of transaction types
+        :param currencies:          optional list of currency symbols
+        :param market_id:           optional ID of the market
+        :return:                    list of Transaction objects
+        """
+        start, end = self.range_indexes(start_date, end_date)
+        if strict and (start == end
+                       or self._dates[start] != start_date.toordinal()
+                       or self._dates[end - 1] != end_date.toordinal()):
+            return []
+
+        mask = self.__mask(start, end, transaction_types, currencies, market_id)
+        return self.__transactions(slice(start, end) if mask is None else np.flatnonzero(mask) + start)
+
+    def aggregate(self, start_date, end_date, transaction_types):
+        """
+        Sum amounts of transactions of the types passed in within the dates (included) by currency,
+        in order of the transactions
+
+        :param start_date:          Start date of the period
+        :param end_date:            End date of the period
+        :param transaction_types:   list of transaction types
+        :return:                    dict(currency: amount)
+        """
+        start, end = self.range_indexes(start_date, end_date)
+        return self.__sums(start, end, self.__mask(start, end, transaction_types))
+
+    def market_aggregates(self, start_date, end_date, transaction_types):
+        """
+        Sum amounts of transactions of the types passed in within the dates (included) by market and currency,
+        in order of the transactions; transactions not related to any market are left out
+
+        :param start_date:          Start date of the period
+        :param end_date:            End date of the period
+        :param transaction_types:   list of transaction types
+        :return:                    dict(market ID: dict(currency: amount))
+        """
+        start, end = self.range_indexes(start_date, end_date)
+        mask = self.__mask(start, end, transaction_types)
+        market_ids = self._market_ids[start:end]
+        return {market_id: self.__sums(start, end, mask & (market_ids == market_id))
+                for market_id in np.unique(market_ids[mask]).tolist() if market_id >= 0}
+
+    def _column_names(self):
+        """
+        Return attribute names of all array columns
+
+        :return:    list of strings
+        """
+        return super(TransactionColumns, self)._column_names() + [
+            '_types', '_signs', '_currencies', '_amounts', '_market_ids', '_contracts', '_prices', '_quantities', '_contexts'
+        ]
+
+    def __mask(self, start, end, transaction_types=None, currencies=None, market_id=None):
+        """
+        Return mask of rows in between the indexes passed in, which are of the types, currencies and market passed in
+
+        :param start:               index of the first row
+        :param end:                 index past the last row
+        :param transaction_types:   optional list of transaction types
+        :param currencies:          optional list of currency symbols
+        :param market_id:           optional ID of the market
+        :return:                    boolean numpy array, or None if there's nothing to filter by
+        """
+        mask = None
+        for name, values in (('_types', self.__codes_of('type', transaction_types)),
+                             ('_currencies', self.__codes_of('currency', currencies)),
+                             ('_market_ids', [market_id] if market_id is not None else None)):
+            if values is not None:
+                matches = np.in1d(getattr(self, name)[start:end], values)
+                mask = matches if mask is None else mask & matches
+        return mask
+
+    def __transactions(self, rows):
+        """
+        Build Transaction objects of the rows passed in
+
+        :param rows:    slice or array of row indexes
+        :return:        list of Transaction objects
+        """
+        types = self.__values.get('type', [])
+        currencies = self.__values.get('currency', [])
+        contracts = self.__values.get('contract', [])
+        amounts = self._amounts[rows].tolist()
+        if self.__number_type is FixedPoint:
+            amounts = [FixedPoint.from_units(a) for a in amounts]
+        columns = zip(
+            self._dates[rows].tolist(),
+            self._types[rows].tolist(),
+            self._signs[rows].tolist(),
+            self._currencies[rows].tolist(),
+            amounts,
+            self._market_ids[rows].tolist(),
+            self._contracts[rows].tolist(),
+            self._prices[rows].tolist(),
+            self._quantities[rows].tolist(),
+            self._contexts[rows].tolist()
+        )
+        return [Transaction(types[t], dt.date.fromordinal(d), a if s > 0 else -a, currencies[c],
+                            (self.__markets[m], contracts[k], p, q) if types[t] in TransactionColumns.__mtm_types
+                            and m in self.__markets else x)
+                for d, t, s, c, a, m, k, p, q, x in columns]
+
+    def __sums(self, start, end, mask):
+        """
+        Sum signed amounts of the masked rows in between the indexes passed in by currency, in order of the rows
+
+        :param start:   index of the first row
+        :param end:     index past the last row
+        :param mask:    boolean numpy array of the rows to sum
+        :return:        dict(currency: amount)
+        """
+        signs = self._signs[start:end][mask]
+        amounts = self._amounts[start:end][mask] * (signs if self._amounts.dtype != object else signs.astype(object))
+        currencies = self._currencies[start:end][mask]
+        result = defaultdict(self.__number_type)
+        for code in np.unique(currencies).tolist():
+            if self.__number_type is FixedPoint:
+                # Sum of the units as Python ints, which don't overflow
+                result[self.__values['currency'][code]] = FixedPoint.from_units(sum(amounts[currencies == code].tolist()))
+            else:
+                result[self.__values['currency'][code]] = sum(amounts[currencies == code].tolist(), self.__number_type())
+        return result
+
+    def __code(self, name, value):
+        """
+        Return integer code of the value in the named code list, registering the value if not seen yet
+
+        :param name:    name of the code list ('type', 'currency' or 'contract')
+        :param value:   value to encode
+        :return:        int
+        """
+        codes = self.__codes.setdefault(name, {})
+        if value not in codes:
+            codes[value] = len(codes)
+            self.__values.setdefault(name, []).append(value)
+        return codes[value]
+
+    def __codes_of(self, name, values):
+        """
+        Return integer codes of the values passed in, which were seen already
+
+        :param name:    name of the code list ('type' or 'currency')
+        :param values:  list of values to encode, or None
+        :return:        list of ints, or None if no values were passed in
+        """
+        codes = self.__codes.get(name, {})
+        return [codes[v] for v in values if v in codes] if values is not None else None